@@ -2,6 +2,7 @@
 
 import streamlit as st
 from pathlib import Path
+import logging
 import sys
 import os
 
@@ -13,10 +14,28 @@ os.environ["OPENBLAS_NUM_THREADS"] = "1"
 
 sys.path.insert(0, "src")
 
-from docvision import LegalGPT
+from docvision import CollectionManager, LegalGPT
+from docvision.config import settings
+from docvision.ingestion.pdf_loader import write_if_changed
+from docvision.retrieval import SearchFilter
+
+logging.basicConfig(level=logging.INFO, format="%(asctime)s %(name)s %(message)s")
 
 st.set_page_config(page_title="LegalGPT", page_icon="⚖️", layout="wide")
 
+
+@st.cache_resource
+def get_embedding_model():
+    """One embedding model for every session and collection."""
+    return LegalGPT.make_embedding_model()
+
+
+@st.cache_resource
+def get_collections(use_hybrid: bool) -> CollectionManager:
+    """Collections shared across sessions; each loads on first use."""
+    return CollectionManager(use_hybrid=use_hybrid, model=get_embedding_model())
+
+
 # Session state
 if "pipeline" not in st.session_state:
     st.session_state.pipeline = None
@@ -30,30 +49,63 @@ st.markdown("*AI-powered legal document assistant*")
 with st.sidebar:
     st.header("📄 Documents")
 
-    files = st.file_uploader("Upload PDFs", type=["pdf"], accept_multiple_files=True)
+    collection = st.text_input("Collection", value="default").strip().lower()
     use_hybrid = st.checkbox("Use Hybrid Search", value=False)
+    collections = get_collections(use_hybrid)
+    files = st.file_uploader("Upload PDFs", type=["pdf"], accept_multiple_files=True)
+
+    if st.session_state.get("collection") != collection:
+        # Never show one collection's conversation in another
+        st.session_state.collection = collection
+        st.session_state.chat_history = []
+        st.session_state.pipeline = None
+
+    try:
+        if files and st.button("Process"):
+            upload_dir = Path(settings.uploads_path) / collection
+            collections.get(collection, create=True)  # validates the name
+            upload_dir.mkdir(parents=True, exist_ok=True)
 
-    if files and st.button("Process"):
-        upload_dir = Path("data/uploads")
-        upload_dir.mkdir(parents=True, exist_ok=True)
+            for f in files:
+                write_if_changed(upload_dir / f.name, f.getvalue())
 
-        for f in files:
-            (upload_dir / f.name).write_bytes(f.read())
+            with st.spinner("Processing..."):
+                # Only new or changed PDFs are re-embedded
+                collections.sync_directory(collection, str(upload_dir))
 
-        with st.spinner("Processing..."):
-            st.session_state.pipeline = LegalGPT(use_hybrid=use_hybrid)
-            st.session_state.pipeline.ingest_documents(str(upload_dir))
+            st.success(f"✓ Processed {len(files)} documents!")
 
-        st.success(f"✓ Processed {len(files)} documents!")
+        if collection in collections.names():
+            with st.spinner("Loading collection..."):
+                st.session_state.pipeline = collections.get(collection)
+    except ValueError as e:
+        st.error(str(e))
 
     if st.session_state.pipeline and st.session_state.pipeline.is_ready:
-        st.success("✓ Ready to answer questions")
+        st.success(f"✓ Ready to answer questions about {collection}")
     else:
         st.info("👆 Upload documents to start")
 
     st.header("⚙️ Settings")
     top_k = st.slider("Chunks to retrieve", 3, 10, 5)
 
+    search_filter = None
+    if st.session_state.pipeline and st.session_state.pipeline.is_ready:
+        documents = sorted(st.session_state.pipeline.documents)
+        sources = st.multiselect("Only search in", documents)
+        page_min, page_max = st.columns(2)
+        first = page_min.number_input("From page", min_value=1, value=None, step=1)
+        last = page_max.number_input("To page", min_value=1, value=None, step=1)
+        try:
+            if sources or first or last:
+                search_filter = SearchFilter(
+                    sources or None,
+                    int(first) if first else None,
+                    int(last) if last else None,
+                )
+        except ValueError as e:
+            st.error(str(e))
+
 # Main chat
 if not (st.session_state.pipeline and st.session_state.pipeline.is_ready):
     st.info("👈 Upload and process documents to begin")
@@ -75,19 +127,27 @@ else:
             st.markdown(question)
 
         with st.chat_message("assistant"):
-            with st.spinner("Thinking..."):
-                result = st.session_state.pipeline.query(question, top_k)
-
-                st.markdown(result["answer"])
-
-                with st.expander("📚 Sources"):
-                    for src in result["sources"]:
-                        st.write(f"- {src['document']}, Page {src['page']}")
-
-                st.session_state.chat_history.append(
-                    {
-                        "role": "assistant",
-                        "content": result["answer"],
-                        "sources": result["sources"],
-                    }
+            with st.spinner("Searching..."):
+                result = st.session_state.pipeline.query(
+                    question, top_k, stream=True, search_filter=search_filter
                 )
+
+            # Render tokens as they arrive instead of waiting for the full answer
+            placeholder = st.empty()
+            answer = ""
+            for delta in result["answer_stream"]:
+                answer += delta
+                placeholder.markdown(answer + "▌")
+            placeholder.markdown(answer)
+
+            with st.expander("📚 Sources"):
+                for src in result["sources"]:
+                    st.write(f"- {src['document']}, Page {src['page']}")
+
+            st.session_state.chat_history.append(
+                {
+                    "role": "assistant",
+                    "content": answer,
+                    "sources": result["sources"],
+                }
+            )
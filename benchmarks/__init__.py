@@ -0,0 +1,4 @@
+"""Reproducible ingestion and retrieval benchmarks.
+
+Run ``python -m benchmarks.run --help`` for options.
+"""
@@ -0,0 +1,193 @@
+"""Load-test one shared pipeline with concurrent query clients, emitting JSON.
+
+Each client count runs in a fresh process: N threads share one LegalGPT
+(one embedding model, one index) over synthetic contracts and ask questions
+for ``--duration`` seconds. Answers come from a local StubLLMServer, so the
+numbers cover retrieval, context packing and the HTTP round trip rather
+than a real model::
+
+    python -m benchmarks.load --clients 1 4 16 --duration 10
+    python -m benchmarks.load --clients 8 --ingest-interval 0.5 --hybrid
+
+With ``--ingest-interval`` a writer keeps adding documents while the
+clients query, so the report also shows whether queries fail or stall
+while the index is being swapped.
+"""
+
+from typing import List, Dict, Optional
+import argparse
+import itertools
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+
+# Settings are validated on import; keep the run self-contained and uncached
+os.environ.setdefault("GROQ_API_KEY", "benchmark")
+os.environ.setdefault("EMBEDDING_CACHE_PATH", "")
+os.environ.setdefault("EXTRACTION_CACHE_PATH", "")
+os.environ.setdefault("KEYWORD_BACKEND", "bm25")
+
+from benchmarks.run import (  # noqa: E402
+    environment,
+    latency_summary,
+    peak_rss_mb,
+    run_isolated,
+)
+from benchmarks.synthetic import (  # noqa: E402
+    HashingEmbedder,
+    generate_chunks,
+    generate_pdfs,
+    generate_queries,
+)
+
+
+def run_load(clients: int, config: Dict) -> Dict:
+    """Drive ``clients`` query threads against one pipeline for a while."""
+    from docvision.core.pipeline import LegalGPT
+    from docvision.generation import LLMClient
+    from docvision.generation.stub_server import StubLLMServer
+
+    stub = StubLLMServer(token_delay=config["token_delay"]).start()
+    llm_client = LLMClient(
+        "unused", "stub-model", base_url=stub.base_url, max_concurrency=clients
+    )
+    questions = [
+        question
+        for question, _ in generate_queries(
+            generate_chunks(500, seed=config["seed"]), 200, seed=config["seed"] + 1
+        )
+    ]
+
+    with tempfile.TemporaryDirectory() as directory:
+        paths = generate_pdfs(
+            directory,
+            config["docs"] + config["ingest_docs"],
+            config["pages_per_doc"],
+            seed=config["seed"],
+        )
+        pipeline = LegalGPT(
+            use_hybrid=config["hybrid"],
+            index_path=os.path.join(directory, "index"),
+            model=HashingEmbedder(),
+            llm_client=llm_client,
+        )
+        if not config["answer_cache"]:
+            # Repeated questions would otherwise be served from the cache
+            pipeline.answer_cache = None
+        pipeline.add_documents(paths[: config["docs"]])
+
+        start = threading.Barrier(clients + 1)
+        stop = threading.Event()
+        latencies: List[List[float]] = [[] for _ in range(clients)]
+        errors: List[str] = []
+        ingested: List[float] = []
+
+        def client(number: int):
+            asked = itertools.islice(itertools.cycle(questions), number, None, clients)
+            start.wait()
+            for question in asked:
+                if stop.is_set():
+                    return
+                started = time.perf_counter()
+                try:
+                    pipeline.query(question, top_k=config["top_k"])
+                except Exception as e:
+                    errors.append(f"{type(e).__name__}: {e}")
+                    continue
+                latencies[number].append((time.perf_counter() - started) * 1000)
+
+        def writer():
+            for path in paths[config["docs"] :]:
+                if stop.wait(config["ingest_interval"]):
+                    return
+                started = time.perf_counter()
+                try:
+                    pipeline.add_documents([path])
+                except Exception as e:
+                    errors.append(f"ingest {type(e).__name__}: {e}")
+                    continue
+                ingested.append(time.perf_counter() - started)
+
+        threads = [threading.Thread(target=client, args=(n,)) for n in range(clients)]
+        if config["ingest_interval"]:
+            threads.append(threading.Thread(target=writer))
+        for thread in threads:
+            thread.start()
+
+        start.wait()
+        began = time.perf_counter()
+        time.sleep(config["duration"])
+        stop.set()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - began
+
+    stub.stop()
+    all_latencies = [ms for per_client in latencies for ms in per_client]
+    report = {
+        "clients": clients,
+        "hybrid": config["hybrid"],
+        "seconds": round(elapsed, 3),
+        "queries": len(all_latencies),
+        "errors": len(errors),
+        "throughput_qps": round(len(all_latencies) / elapsed, 1),
+        "llm_max_concurrent": stub.max_active,
+        "ingests": len(ingested),
+        "peak_rss_mb": peak_rss_mb(),
+    }
+    if all_latencies:
+        report["latency"] = latency_summary(all_latencies)
+        report["latency"]["max_ms"] = round(max(all_latencies), 3)
+    if ingested:
+        report["ingest_mean_seconds"] = round(sum(ingested) / len(ingested), 3)
+    if errors:
+        report["first_error"] = errors[0]
+    return report
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--clients", type=int, nargs="+", default=[1, 4, 16])
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument("--hybrid", action="store_true")
+    parser.add_argument("--top-k", type=int, default=5)
+    parser.add_argument("--docs", type=int, default=20)
+    parser.add_argument("--pages-per-doc", type=int, default=10)
+    parser.add_argument(
+        "--ingest-interval",
+        type=float,
+        default=0.0,
+        help="seconds between documents added during the run; 0 disables",
+    )
+    parser.add_argument("--ingest-docs", type=int, default=20)
+    parser.add_argument(
+        "--token-delay", type=float, default=0.0, help="stub LLM seconds per token"
+    )
+    parser.add_argument("--answer-cache", action="store_true")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="write JSON results here")
+    args = parser.parse_args(argv)
+
+    config = vars(args).copy()
+    if not args.ingest_interval:
+        config["ingest_docs"] = 0
+    results = {"environment": environment(), "config": config, "load": []}
+    for clients in args.clients:
+        case = run_isolated(run_load, clients, config)
+        results["load"].append(case)
+        print(json.dumps(case), file=sys.stderr)
+
+    output = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output + "\n")
+    else:
+        print(output)
+    return 1 if any(case["errors"] for case in results["load"]) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
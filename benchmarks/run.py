@@ -0,0 +1,372 @@
+"""Benchmark ingestion and retrieval, emitting JSON.
+
+Each (store, corpus size) case runs in a fresh process so its peak RSS is
+its own::
+
+    python -m benchmarks.run --sizes 1000 10000 100000 --output results.json
+    python -m benchmarks.run --sizes 10000 --compare results.json
+
+Keyword and hybrid cases use the in-process BM25 index unless
+``--keyword-backend elasticsearch`` is given. Index settings (``INDEX_TYPE``,
+``IVF_NPROBE``, ...) are read from the environment like the app does.
+``--model hashing`` (the default) swaps the sentence-transformer for a
+bag-of-words embedder so index and search cost are not drowned out by model
+inference; pass a model name to include it, and ``--embedding-backend onnx``
+to time it on ONNX Runtime.
+"""
+
+from typing import List, Dict, Optional
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+import argparse
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+import numpy as np
+
+# Settings are validated on import; the API key is never used here
+os.environ.setdefault("GROQ_API_KEY", "benchmark")
+
+from benchmarks.synthetic import (  # noqa: E402
+    HashingEmbedder,
+    generate_chunks,
+    generate_pdfs,
+    generate_queries,
+)
+
+STORES = ("vector", "keyword", "hybrid")
+
+
+def latency_summary(latencies_ms: List[float]) -> Dict[str, float]:
+    """p50/p95/p99/mean of per-query latencies in milliseconds."""
+    p50, p95, p99 = np.percentile(latencies_ms, [50, 95, 99])
+    return {
+        "p50_ms": round(float(p50), 3),
+        "p95_ms": round(float(p95), 3),
+        "p99_ms": round(float(p99), 3),
+        "mean_ms": round(float(np.mean(latencies_ms)), 3),
+    }
+
+
+def peak_rss_mb() -> float:
+    """Peak resident set size of this process."""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports KiB, macOS bytes
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+def make_vector_store(config: Dict):
+    from docvision.config import settings
+    from docvision.retrieval import VectorStore
+
+    from docvision.core import LegalGPT
+
+    model = HashingEmbedder() if config["model"] == "hashing" else None
+    return VectorStore(
+        config["model"],
+        model=model,
+        backend=config.get("embedding_backend") or settings.embedding_backend,
+        backend_options=LegalGPT.embedding_backend_options(),
+        index_type=config["index_type"] or settings.index_type,
+        vector_dtype=config.get("vector_dtype") or settings.vector_dtype,
+        index_params={
+            "nlist": settings.ivf_nlist,
+            "nprobe": settings.ivf_nprobe,
+            "pq_m": settings.pq_m,
+            "pq_nbits": settings.pq_nbits,
+            "hnsw_m": settings.hnsw_m,
+            "ef_search": settings.hnsw_ef_search,
+            "train_size": settings.index_train_size,
+        },
+    )
+
+
+def make_keyword_store(config: Dict, size: int):
+    from docvision.retrieval import BM25Store, KeywordStore
+
+    if config["keyword_backend"] == "bm25":
+        return BM25Store()
+    store = KeywordStore(config["es_host"], f"docvision-benchmark-{size}")
+    store.create_index()
+    return store
+
+
+def keyword_backend_error(config: Dict) -> Optional[str]:
+    """Why the keyword store cannot be benchmarked, or None if it can."""
+    from elasticsearch import Elasticsearch
+
+    if config["keyword_backend"] == "bm25":
+        return None
+
+    try:
+        if Elasticsearch(hosts=[config["es_host"]]).ping():
+            return None
+    except Exception:
+        pass
+    return f"Elasticsearch not reachable at {config['es_host']}"
+
+
+def bench_search(store_name: str, size: int, config: Dict) -> Dict:
+    """Build one store over a synthetic corpus and time its queries."""
+    from docvision.retrieval import HybridSearch
+
+    top_k = config["top_k"]
+    chunks = generate_chunks(size, seed=config["seed"])
+    queries = generate_queries(chunks, config["num_queries"], seed=config["seed"] + 1)
+    rss_before = peak_rss_mb()
+
+    started = time.perf_counter()
+    vector_store = keyword_store = None
+    if store_name in ("vector", "hybrid"):
+        vector_store = make_vector_store(config)
+        ids = vector_store.index_chunks(chunks)
+    else:
+        ids = np.arange(len(chunks))
+    if store_name in ("keyword", "hybrid"):
+        keyword_store = make_keyword_store(config, size)
+        keyword_store.index_chunks(chunks, ids)
+    build_seconds = time.perf_counter() - started
+
+    if store_name == "vector":
+        store = vector_store
+    elif store_name == "keyword":
+        store = keyword_store
+    else:
+        store = HybridSearch(vector_store, keyword_store, leg_timeout=None)
+
+    texts = [query for query, _ in queries]
+    for query in texts[:10]:  # warm-up
+        store.search(query, top_k)
+
+    latencies = []
+    for query in texts:
+        started = time.perf_counter()
+        store.search(query, top_k)
+        latencies.append((time.perf_counter() - started) * 1000)
+
+    results = []
+    started = time.perf_counter()
+    for offset in range(0, len(texts), config["batch_size"]):
+        batch = texts[offset : offset + config["batch_size"]]
+        results.extend(store.search_many(batch, top_k))
+    batched_seconds = time.perf_counter() - started
+
+    hits = 0
+    for (_, target), found in zip(queries, results):
+        expected = (chunks[target]["source"], chunks[target]["chunk_id"])
+        hits += any((r["source"], r["chunk_id"]) == expected for r in found)
+
+    report = {
+        "store": store_name,
+        "chunks": size,
+        "queries": len(texts),
+        "build_seconds": round(build_seconds, 3),
+        "build_chunks_per_second": round(size / build_seconds, 1),
+        "latency": latency_summary(latencies),
+        "qps": round(len(texts) / (sum(latencies) / 1000), 1),
+        "qps_batched": round(len(texts) / batched_seconds, 1),
+        f"recall@{top_k}": round(hits / len(texts), 4),
+        "peak_rss_mb": peak_rss_mb(),
+        "rss_growth_mb": round(peak_rss_mb() - rss_before, 1),
+    }
+    if vector_store is not None:
+        report["index_type"] = vector_store.index_type
+        report["vector_dtype"] = vector_store.vector_dtype
+        report["bytes_per_chunk"] = round(vector_store.memory_bytes() / size, 1)
+        if vector_store.index_type != "flat" or vector_store.compact:
+            report[f"ann_recall@{top_k}"] = round(
+                vector_store.evaluate_recall(texts, top_k), 4
+            )
+    if store_name == "hybrid":
+        store.close()
+    if keyword_store is not None:
+        report["keyword_backend"] = config["keyword_backend"]
+        if config["keyword_backend"] == "elasticsearch":
+            keyword_store.client.indices.delete(index=keyword_store.index_name)
+    return report
+
+
+def bench_ingest(num_docs: int, config: Dict) -> Dict:
+    """Time PDF -> chunks -> vectors end to end and per stage."""
+    from docvision.config import settings
+    from docvision.core.pipeline import LegalGPT
+    from docvision.ingestion import PDFLoader
+    from docvision.observability import instrumentation
+
+    with tempfile.TemporaryDirectory() as directory:
+        paths = generate_pdfs(
+            directory, num_docs, config["pages_per_doc"], seed=config["seed"]
+        )
+        loader = PDFLoader(workers=config["workers"])
+        vector_store = make_vector_store(config)
+        chunker = LegalGPT._make_chunker(vector_store.model)
+        instrumentation.histogram.reset()
+
+        started = time.perf_counter()
+        num_chunks = 0
+        chunks = chunker.iter_chunks(loader.iter_documents(paths))
+        for batch, _ in vector_store.add_chunk_stream(
+            chunks, settings.embedding_batch_size
+        ):
+            num_chunks += len(batch)
+        seconds = time.perf_counter() - started
+        loader.close()
+
+    stages = {
+        name: {
+            "calls": stats["count"],
+            "total_seconds": round(stats["count"] * stats["mean_ms"] / 1000, 3),
+            "p95_ms": round(stats["p95_ms"], 3),
+        }
+        for name, stats in instrumentation.histogram.summary().items()
+        if name.startswith("ingest.")
+    }
+    pages = num_docs * config["pages_per_doc"]
+    return {
+        "documents": num_docs,
+        "pages": pages,
+        "chunks": num_chunks,
+        "seconds": round(seconds, 3),
+        "pages_per_second": round(pages / seconds, 1),
+        "chunks_per_second": round(num_chunks / seconds, 1),
+        "stages": stages,
+        "peak_rss_mb": peak_rss_mb(),
+    }
+
+
+def run_isolated(fn, *args) -> Dict:
+    """Run a benchmark case in a fresh interpreter."""
+    with ProcessPoolExecutor(max_workers=1, mp_context=get_context("spawn")) as pool:
+        return pool.submit(fn, *args).result()
+
+
+def environment() -> Dict:
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        "commit": commit,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+    }
+
+
+def compare(baseline: Dict, current: Dict, tolerance: float = 0.1) -> List[str]:
+    """Regressions of ``current`` against ``baseline``, as readable lines.
+
+    Latency and RSS may grow and throughput may shrink by ``tolerance``
+    (a fraction); recall may not drop by more than 0.01.
+    """
+    previous = {(c["store"], c["chunks"]): c for c in baseline.get("search", [])}
+    regressions = []
+    for case in current.get("search", []):
+        old = previous.get((case["store"], case["chunks"]))
+        if old is None or "skipped" in case or "skipped" in old:
+            continue
+        label = f"{case['store']}@{case['chunks']}"
+        checks = [
+            ("p95_ms", old["latency"]["p95_ms"], case["latency"]["p95_ms"], 1),
+            ("p99_ms", old["latency"]["p99_ms"], case["latency"]["p99_ms"], 1),
+            ("qps_batched", old["qps_batched"], case["qps_batched"], -1),
+            ("peak_rss_mb", old["peak_rss_mb"], case["peak_rss_mb"], 1),
+        ]
+        for metric, before, after, direction in checks:
+            if direction * (after - before) > tolerance * before:
+                regressions.append(f"{label} {metric}: {before} -> {after}")
+        for metric in case:
+            if "recall@" in metric and metric in old:
+                if case[metric] < old[metric] - 0.01:
+                    regressions.append(
+                        f"{label} {metric}: {old[metric]} -> {case[metric]}"
+                    )
+    return regressions
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1_000, 10_000])
+    parser.add_argument("--stores", nargs="+", choices=STORES, default=list(STORES))
+    parser.add_argument("--queries", type=int, default=200, dest="num_queries")
+    parser.add_argument("--top-k", type=int, default=10)
+    parser.add_argument("--batch-size", type=int, default=64)
+    parser.add_argument("--model", default="hashing")
+    parser.add_argument(
+        "--embedding-backend",
+        choices=("torch", "onnx"),
+        default=None,
+        help="override EMBEDDING_BACKEND for real models",
+    )
+    parser.add_argument("--index-type", default=None, help="override INDEX_TYPE")
+    parser.add_argument(
+        "--vector-dtype",
+        choices=("float32", "float16", "int8"),
+        default=None,
+        help="override VECTOR_DTYPE",
+    )
+    parser.add_argument(
+        "--keyword-backend", choices=("bm25", "elasticsearch"), default="bm25"
+    )
+    parser.add_argument("--es-host", default=None, help="override ELASTICSEARCH_HOST")
+    parser.add_argument("--ingest-docs", type=int, default=20, help="0 skips ingest")
+    parser.add_argument("--pages-per-doc", type=int, default=10)
+    parser.add_argument("--workers", type=int, default=0)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="write JSON results here")
+    parser.add_argument("--compare", help="baseline JSON to check for regressions")
+    parser.add_argument("--tolerance", type=float, default=0.1)
+    args = parser.parse_args(argv)
+
+    from docvision.config import settings
+
+    config = vars(args).copy()
+    config["es_host"] = args.es_host or settings.elasticsearch_host
+    results = {"environment": environment(), "config": config, "search": []}
+
+    if args.ingest_docs:
+        results["ingest"] = run_isolated(bench_ingest, args.ingest_docs, config)
+        print(json.dumps({"ingest": results["ingest"]}), file=sys.stderr)
+
+    keyword_error = None
+    if {"keyword", "hybrid"} & set(args.stores):
+        keyword_error = keyword_backend_error(config)
+
+    for size in args.sizes:
+        for store_name in args.stores:
+            if store_name != "vector" and keyword_error:
+                case = {"store": store_name, "chunks": size, "skipped": keyword_error}
+            else:
+                case = run_isolated(bench_search, store_name, size, config)
+            results["search"].append(case)
+            print(json.dumps(case), file=sys.stderr)
+
+    output = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output + "\n")
+    else:
+        print(output)
+
+    if args.compare:
+        with open(args.compare) as f:
+            regressions = compare(json.load(f), results, args.tolerance)
+        for line in regressions:
+            print(f"REGRESSION {line}", file=sys.stderr)
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
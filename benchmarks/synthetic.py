@@ -0,0 +1,224 @@
+"""Synthetic legal-style corpora with known answers.
+
+Every chunk mixes boilerplate contract language with a handful of rare
+defined terms. Each benchmark query is drawn from the rare terms of one
+chunk, which becomes its ground truth for recall@k.
+"""
+
+from typing import List, Dict, Tuple
+from pathlib import Path
+import zlib
+import numpy as np
+
+PARTIES = [
+    "the Licensor",
+    "the Licensee",
+    "the Supplier",
+    "the Customer",
+    "the Employer",
+    "the Contractor",
+    "the Landlord",
+    "the Tenant",
+]
+VERBS = [
+    "shall deliver",
+    "shall indemnify",
+    "may terminate",
+    "shall notify",
+    "shall not assign",
+    "shall maintain",
+    "may audit",
+    "shall pay",
+]
+OBJECTS = [
+    "the Services",
+    "all Confidential Information",
+    "the Premises",
+    "any Deliverables",
+    "the Purchase Price",
+    "the Insurance Policy",
+    "the Intellectual Property",
+    "the Escrow Amount",
+]
+EVENTS = [
+    "the Effective Date",
+    "written notice",
+    "a Change of Control",
+    "the Closing",
+    "any material breach",
+    "the Renewal Term",
+    "receipt of an invoice",
+    "a Force Majeure Event",
+]
+SYLLABLES = (
+    "ar bel cor dan el fen gra hol is jor kal lum mor nex or pra quin ros sal tor "
+    "ul ven wex xan yor zel"
+).split()
+
+
+def make_vocabulary(size: int, seed: int = 0) -> List[str]:
+    """Distinct pseudo-words used as rare defined terms."""
+    rng = np.random.default_rng(seed)
+    words = set()
+    while len(words) < size:
+        parts = rng.choice(SYLLABLES, size=rng.integers(2, 5))
+        words.add("".join(parts))
+    return sorted(words)
+
+
+def make_clause(rng: np.random.Generator, number: int) -> str:
+    """One boilerplate contract sentence."""
+    return (
+        f"{number}. {str(rng.choice(PARTIES)).capitalize()} {rng.choice(VERBS)} "
+        f"{rng.choice(OBJECTS)} within {int(rng.integers(5, 120))} days of "
+        f"{rng.choice(EVENTS)}."
+    )
+
+
+def generate_chunks(
+    num_chunks: int,
+    seed: int = 0,
+    terms_per_chunk: int = 8,
+    clauses_per_chunk: int = 4,
+    chunks_per_source: int = 200,
+) -> List[Dict]:
+    """Chunk dicts shaped like TextChunker output."""
+    rng = np.random.default_rng(seed)
+    vocabulary = np.array(make_vocabulary(max(2000, num_chunks // 4), seed))
+    # Zipf-like term frequencies so some defined terms recur across chunks
+    weights = 1.0 / np.arange(1, len(vocabulary) + 1) ** 0.8
+    weights /= weights.sum()
+
+    chunks = []
+    for i in range(num_chunks):
+        terms = rng.choice(vocabulary, size=terms_per_chunk, p=weights)
+        clauses = [make_clause(rng, n + 1) for n in range(clauses_per_chunk)]
+        defined = " ".join(f"{term.capitalize()}" for term in terms)
+        chunks.append(
+            {
+                "text": f"{' '.join(clauses)} Defined terms: {defined}.",
+                "source": f"contract_{i // chunks_per_source:05d}.pdf",
+                "page": (i % chunks_per_source) // 4 + 1,
+                "chunk_id": i % chunks_per_source,
+            }
+        )
+    return chunks
+
+
+def generate_queries(
+    chunks: List[Dict], num_queries: int, seed: int = 1, terms_per_query: int = 4
+) -> List[Tuple[str, int]]:
+    """(query, ground-truth chunk position) pairs.
+
+    A query is the rarest defined terms of its target chunk plus a bit of
+    boilerplate, so lexical and semantic retrieval both have a fair shot.
+    """
+    rng = np.random.default_rng(seed)
+    document_frequency: Dict[str, int] = {}
+    for chunk in chunks:
+        for term in set(_defined_terms(chunk["text"])):
+            document_frequency[term] = document_frequency.get(term, 0) + 1
+
+    queries = []
+    targets = rng.choice(len(chunks), size=min(num_queries, len(chunks)), replace=False)
+    for target in targets:
+        terms = sorted(
+            set(_defined_terms(chunks[target]["text"])),
+            key=lambda term: (document_frequency[term], term),
+        )[:terms_per_query]
+        queries.append((f"Which clause covers {' '.join(terms)}?", int(target)))
+    return queries
+
+
+def _defined_terms(text: str) -> List[str]:
+    return text.rsplit("Defined terms: ", 1)[-1].rstrip(".").split()
+
+
+def generate_pdfs(
+    directory: str, num_docs: int, pages_per_doc: int = 10, seed: int = 0
+) -> List[Path]:
+    """Write synthetic contracts, about 40 lines of clauses per page."""
+    rng = np.random.default_rng(seed)
+    directory = Path(directory)
+    directory.mkdir(parents=True, exist_ok=True)
+    paths = []
+    for doc in range(num_docs):
+        pages, number = [], 1
+        for _ in range(pages_per_doc):
+            lines = []
+            for _ in range(40):
+                lines.append(make_clause(rng, number))
+                number += 1
+            pages.append("\n".join(lines))
+        path = directory / f"contract_{doc:05d}.pdf"
+        write_pdf(path, pages)
+        paths.append(path)
+    return paths
+
+
+def write_pdf(path, pages: List[str]):
+    """Write a minimal single-font PDF; newlines in a page start new lines."""
+    objects = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        None,  # Pages, filled in once the page objects are known
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>",
+    ]
+    kids = []
+    for text in pages:
+        lines = []
+        for line in text.split("\n"):
+            escaped = line.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+            lines.append(f"({escaped}) Tj")
+        stream = f"BT /F1 12 Tf 14 TL 72 720 Td {' T* '.join(lines)} ET".encode(
+            "latin-1"
+        )
+        objects.append(
+            b"<< /Length %d >>\nstream\n%s\nendstream" % (len(stream), stream)
+        )
+        objects.append(
+            b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] "
+            b"/Resources << /Font << /F1 3 0 R >> >> /Contents %d 0 R >>" % len(objects)
+        )
+        kids.append(b"%d 0 R" % len(objects))
+    objects[1] = b"<< /Type /Pages /Kids [%s] /Count %d >>" % (
+        b" ".join(kids),
+        len(kids),
+    )
+
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, 1):
+        offsets.append(len(out))
+        out += b"%d 0 obj\n%s\nendobj\n" % (number, body)
+    xref = len(out)
+    out += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    for offset in offsets:
+        out += b"%010d 00000 n \n" % offset
+    out += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (
+        len(objects) + 1,
+        xref,
+    )
+    Path(path).write_bytes(bytes(out))
+
+
+class HashingEmbedder:
+    """Fast deterministic bag-of-words embedder.
+
+    Stands in for SentenceTransformer when measuring index and search cost
+    without model inference dominating the numbers.
+    """
+
+    def __init__(self, dimension: int = 384):
+        self.dimension = dimension
+
+    def get_sentence_embedding_dimension(self) -> int:
+        return self.dimension
+
+    def encode(self, texts: List[str], **kwargs) -> np.ndarray:
+        vectors = np.zeros((len(texts), self.dimension), dtype="float32")
+        for row, text in enumerate(texts):
+            for word in text.lower().split():
+                word = word.strip(".,?")
+                vectors[row, zlib.crc32(word.encode()) % self.dimension] += 1.0
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        return vectors / np.maximum(norms, 1e-12)
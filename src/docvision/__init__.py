@@ -1,7 +1,19 @@
 """LegalGPT: RAG-based legal document assistant."""
 
+from typing import TYPE_CHECKING
+
+from docvision._lazy import lazy_exports
+
 __version__ = "0.1.0"
 
-from docvision.core.pipeline import LegalGPT
+__getattr__, __dir__, __all__ = lazy_exports(
+    __name__,
+    {
+        "LegalGPT": "docvision.core.pipeline",
+        "CollectionManager": "docvision.core.collections",
+    },
+)
 
-__all__ = ["LegalGPT"]
+if TYPE_CHECKING:
+    from docvision.core.pipeline import LegalGPT
+    from docvision.core.collections import CollectionManager
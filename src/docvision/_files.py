@@ -0,0 +1,40 @@
+"""Crash- and mmap-safe file writes."""
+
+from typing import Callable, Union
+from pathlib import Path
+import os
+import threading
+import numpy as np
+
+
+def replace_file(path: Union[str, Path], write: Callable[[str], None]):
+    """Call ``write`` on a temporary path, then rename it over ``path``.
+
+    The old file is never truncated, so readers that memory-mapped it keep
+    valid data; the rename is atomic, so readers opening ``path`` see either
+    the old or the new contents.
+    """
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(f".{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+    try:
+        write(str(tmp))
+        os.replace(tmp, path)
+    except BaseException:
+        tmp.unlink(missing_ok=True)
+        raise
+
+
+def save_array(path: Union[str, Path], array: np.ndarray):
+    """``np.save`` through replace_file()."""
+
+    def write(tmp: str):
+        with open(tmp, "wb") as f:
+            np.save(f, np.asarray(array))
+
+    replace_file(path, write)
+
+
+def write_text(path: Union[str, Path], text: str):
+    """``Path.write_text`` through replace_file()."""
+    replace_file(path, lambda tmp: Path(tmp).write_text(text))
@@ -0,0 +1,29 @@
+"""Lazy package exports, so importing docvision does not load torch & co."""
+
+from typing import Callable, Dict, List, Tuple
+import importlib
+
+
+def lazy_exports(
+    package: str, exports: Dict[str, str]
+) -> Tuple[Callable, Callable, List[str]]:
+    """Return ``__getattr__``, ``__dir__`` and ``__all__`` for a package.
+
+    ``exports`` maps each public name to the module defining it, relative to
+    ``package``. The module is imported on first access and the value cached
+    in the package namespace (PEP 562).
+    """
+    namespace = importlib.import_module(package).__dict__
+
+    def __getattr__(name: str):
+        module = exports.get(name)
+        if module is None:
+            raise AttributeError(f"module {package!r} has no attribute {name!r}")
+        value = getattr(importlib.import_module(module, package), name)
+        namespace[name] = value
+        return value
+
+    def __dir__() -> List[str]:
+        return sorted(set(namespace) | set(exports))
+
+    return __getattr__, __dir__, list(exports)
@@ -1,5 +1,7 @@
 """Configuration management using Pydantic."""
 
+from functools import lru_cache
+
 from pydantic_settings import BaseSettings
 from pydantic import Field
 
@@ -7,16 +9,59 @@ from pydantic import Field
 class Settings(BaseSettings):
     """Application settings."""
 
-    # API Keys
-    groq_api_key: str = Field(..., env="GROQ_API_KEY")
+    # API Keys; only needed to generate answers
+    groq_api_key: str = Field(default="", env="GROQ_API_KEY")
 
     # Model Settings
     embedding_model: str = Field(default="all-MiniLM-L6-v2", env="EMBEDDING_MODEL")
+    # torch (SentenceTransformer) or onnx (ONNX Runtime, exported on first use)
+    embedding_backend: str = Field(default="torch", env="EMBEDDING_BACKEND")
+    embedding_onnx_dir: str = Field(default="data/onnx", env="EMBEDDING_ONNX_DIR")
+    # int8 dynamic quantization of the ONNX model
+    embedding_quantize: bool = Field(default=False, env="EMBEDDING_QUANTIZE")
+    # ONNX Runtime intra-op threads; 0 = all cores
+    embedding_threads: int = Field(default=0, env="EMBEDDING_THREADS")
+    # Exported models must match PyTorch embeddings to this cosine similarity
+    embedding_min_cosine: float = Field(default=0.99, env="EMBEDDING_MIN_COSINE")
     llm_model: str = Field(default="llama-3.1-8b-instant", env="LLM_MODEL")
+    # Empty means the Groq default endpoint
+    llm_base_url: str = Field(default="", env="LLM_BASE_URL")
+    llm_max_concurrency: int = Field(default=8, env="LLM_MAX_CONCURRENCY")
+    # Prompt context budget, counted with LLM_TOKENIZER (a Hugging Face
+    # tokenizer name) or estimated at four characters per token if empty
+    llm_context_max_tokens: int = Field(default=3000, env="LLM_CONTEXT_MAX_TOKENS")
+    llm_tokenizer: str = Field(default="", env="LLM_TOKENIZER")
+
+    # Semantic Answer Cache
+    answer_cache_enabled: bool = Field(default=True, env="ANSWER_CACHE_ENABLED")
+    answer_cache_threshold: float = Field(default=0.95, env="ANSWER_CACHE_THRESHOLD")
+    answer_cache_max_entries: int = Field(default=1000, env="ANSWER_CACHE_MAX_ENTRIES")
+    answer_cache_ttl: float = Field(default=3600.0, env="ANSWER_CACHE_TTL")
 
     # Chunking Settings
     chunk_size: int = Field(default=1000, env="CHUNK_SIZE")
     chunk_overlap: int = Field(default=200, env="CHUNK_OVERLAP")
+    # Token budget per chunk; 0 means the embedding model's sequence limit
+    chunk_max_tokens: int = Field(default=0, env="CHUNK_MAX_TOKENS")
+
+    # Ingestion Settings
+    ingest_workers: int = Field(default=0, env="INGEST_WORKERS")  # 0 = all CPUs
+    embedding_batch_size: int = Field(default=256, env="EMBEDDING_BATCH_SIZE")
+
+    # Vector Index Settings: flat, ivf_flat, ivf_pq or hnsw
+    index_type: str = Field(default="flat", env="INDEX_TYPE")
+    ivf_nlist: int = Field(default=1024, env="IVF_NLIST")
+    ivf_nprobe: int = Field(default=16, env="IVF_NPROBE")
+    pq_m: int = Field(default=48, env="PQ_M")
+    pq_nbits: int = Field(default=8, env="PQ_NBITS")
+    hnsw_m: int = Field(default=32, env="HNSW_M")
+    hnsw_ef_search: int = Field(default=64, env="HNSW_EF_SEARCH")
+    index_train_size: int = Field(default=50_000, env="INDEX_TRAIN_SIZE")
+    # float32 (L2), or float16 / int8 normalized vectors searched by cosine
+    vector_dtype: str = Field(default="float32", env="VECTOR_DTYPE")
+
+    # Keyword backend for hybrid search: elasticsearch or bm25 (in-process)
+    keyword_backend: str = Field(default="elasticsearch", env="KEYWORD_BACKEND")
 
     # Elasticsearch
     elasticsearch_host: str = Field(
@@ -24,11 +69,86 @@ class Settings(BaseSettings):
     )
     elasticsearch_index: str = Field(default="documents", env="ELASTICSEARCH_INDEX")
 
+    # Hybrid Search Settings
+    hybrid_concurrent: bool = Field(default=True, env="HYBRID_CONCURRENT")
+    # Per-leg timeout in seconds; 0 disables it
+    hybrid_leg_timeout: float = Field(default=2.0, env="HYBRID_LEG_TIMEOUT")
+
+    # Cross-encoder reranking of the first-stage candidates
+    rerank_enabled: bool = Field(default=False, env="RERANK_ENABLED")
+    rerank_model: str = Field(
+        default="cross-encoder/ms-marco-MiniLM-L-6-v2", env="RERANK_MODEL"
+    )
+    # First-stage candidates rescored per query; top_k of them are kept
+    rerank_candidates: int = Field(default=20, env="RERANK_CANDIDATES")
+    rerank_batch_size: int = Field(default=16, env="RERANK_BATCH_SIZE")
+    # Falls back to first-stage order beyond this; 0 disables the budget
+    rerank_time_budget_ms: float = Field(default=150.0, env="RERANK_TIME_BUDGET_MS")
+    rerank_cache_max_entries: int = Field(
+        default=50_000, env="RERANK_CACHE_MAX_ENTRIES"
+    )
+
+    # Persistence
+    index_path: str = Field(default="data/index", env="INDEX_PATH")
+    # Set to an empty string to disable the embedding cache
+    embedding_cache_path: str = Field(
+        default="data/embedding_cache.sqlite", env="EMBEDDING_CACHE_PATH"
+    )
+    embedding_cache_max_entries: int = Field(
+        default=500_000, env="EMBEDDING_CACHE_MAX_ENTRIES"
+    )
+    # Extracted page text by file hash; empty string disables it
+    extraction_cache_path: str = Field(
+        default="data/extraction_cache.sqlite", env="EXTRACTION_CACHE_PATH"
+    )
+    extraction_cache_max_files: int = Field(
+        default=10_000, env="EXTRACTION_CACHE_MAX_FILES"
+    )
+
+    # Named collections: one index directory each under collections_path
+    collections_path: str = Field(default="data/collections", env="COLLECTIONS_PATH")
+    # Loaded collections are evicted least recently used beyond this budget
+    collections_memory_mb: int = Field(default=2048, env="COLLECTIONS_MEMORY_MB")
+
+    # HTTP service (python -m docvision.service)
+    service_hybrid: bool = Field(default=False, env="SERVICE_HYBRID")
+    # Concurrent query embeddings are coalesced within this window
+    service_batch_max_size: int = Field(default=64, env="SERVICE_BATCH_MAX_SIZE")
+    service_batch_wait_ms: float = Field(default=5.0, env="SERVICE_BATCH_WAIT_MS")
+    service_max_body_mb: int = Field(default=100, env="SERVICE_MAX_BODY_MB")
+    uploads_path: str = Field(default="data/uploads", env="UPLOADS_PATH")
+
     class Config:
         env_file = ".env"
         case_sensitive = False
         extra = "ignore"  # Allow extra env vars for libraries
 
 
+@lru_cache(maxsize=None)
+def get_settings() -> Settings:
+    """The Settings singleton, read from the environment on first call."""
+    return Settings()
+
+
+class _LazySettings:
+    """Proxy for get_settings(), so importing this module reads nothing.
+
+    The environment and ``.env`` are read, and validated, the first time a
+    setting is accessed. Assignments go to the underlying instance.
+    """
+
+    def __getattr__(self, name: str):
+        return getattr(get_settings(), name)
+
+    def __setattr__(self, name: str, value):
+        setattr(get_settings(), name, value)
+
+    def __delattr__(self, name: str):
+        delattr(get_settings(), name)
+
+    def __repr__(self) -> str:
+        return repr(get_settings())
+
+
 # Singleton instance
-settings = Settings()
+settings = _LazySettings()
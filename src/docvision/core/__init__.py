@@ -1,3 +1,16 @@
-from .pipeline import LegalGPT
+from typing import TYPE_CHECKING
 
-__all__ = ["LegalGPT"]
+from docvision._lazy import lazy_exports
+
+__getattr__, __dir__, __all__ = lazy_exports(
+    __name__,
+    {
+        "LegalGPT": ".pipeline",
+        "CollectionManager": ".collections",
+        "UnknownCollectionError": ".collections",
+    },
+)
+
+if TYPE_CHECKING:
+    from .pipeline import LegalGPT
+    from .collections import CollectionManager, UnknownCollectionError
@@ -0,0 +1,265 @@
+"""Named, isolated document collections sharing one embedding model."""
+
+from typing import Dict, List, Optional
+from collections import OrderedDict
+from pathlib import Path
+import logging
+import re
+import shutil
+import threading
+
+from docvision.config import settings
+from docvision.core.pipeline import LegalGPT
+from docvision.generation import LLMClient
+from docvision.ingestion import PageCache, PDFLoader
+from docvision.retrieval import EmbeddingCache
+from docvision.observability import instrumentation
+
+logger = logging.getLogger(__name__)
+
+# Lowercase so the name is also valid in an Elasticsearch index name, and
+# no path separators so a collection cannot escape its directory
+COLLECTION_NAME = re.compile(r"[a-z0-9][a-z0-9_-]{0,63}")
+
+
+def validate_collection_name(name: str) -> str:
+    """Return ``name`` if it is a valid collection name, else raise."""
+    if not COLLECTION_NAME.fullmatch(name):
+        raise ValueError(
+            f"Invalid collection name {name!r}: use up to 64 lowercase letters, "
+            "digits, '-' or '_', starting with a letter or digit"
+        )
+    return name
+
+
+class UnknownCollectionError(ValueError):
+    """A collection that was never created was asked for."""
+
+
+class CollectionManager:
+    """Serve many tenants, each searching only their own collection.
+
+    Every collection has its own FAISS index, keyword index and answer cache,
+    saved under ``root/<name>``. Collections are loaded on first use and the
+    least recently used ones are dropped from memory once the loaded total
+    exceeds ``memory_budget_mb``; they stay on disk and reload on the next
+    request. The embedding model, reranker, embedding cache, PDF loader and
+    LLM client are created once and shared by all collections.
+    """
+
+    def __init__(
+        self,
+        root: Optional[str] = None,
+        use_hybrid: bool = False,
+        memory_budget_mb: Optional[int] = None,
+        model=None,
+        llm_client: Optional[LLMClient] = None,
+    ):
+        self.root = Path(root or settings.collections_path)
+        self.use_hybrid = use_hybrid
+        if memory_budget_mb is None:
+            memory_budget_mb = settings.collections_memory_mb
+        self.memory_budget = memory_budget_mb * 2**20
+        self._model = model
+        self._embedding_cache = None
+        if settings.embedding_cache_path:
+            self._embedding_cache = EmbeddingCache(
+                settings.embedding_cache_path, settings.embedding_cache_max_entries
+            )
+        self._page_cache = None
+        if settings.extraction_cache_path:
+            self._page_cache = PageCache(
+                settings.extraction_cache_path, settings.extraction_cache_max_files
+            )
+        # One pool of extraction workers, started on the first ingest
+        self._pdf_loader = PDFLoader(settings.ingest_workers, cache=self._page_cache)
+        self._llm_client = llm_client
+        self._reranker = None
+
+        self._loaded: "OrderedDict[str, LegalGPT]" = OrderedDict()
+        self._sizes: Dict[str, int] = {}
+        self._lock = threading.Lock()
+        # Serializes creating the shared model, LLM client and reranker
+        self._shared_lock = threading.Lock()
+        # One lock per collection being opened, so a slow load does not
+        # block requests for collections that are already in memory
+        self._opening: Dict[str, threading.Lock] = {}
+
+    @property
+    def model(self):
+        """The embedding model shared by every collection, loaded once."""
+        with self._shared_lock:
+            if self._model is None:
+                logger.info(
+                    f"Loading shared embedding model: {settings.embedding_model}"
+                )
+                self._model = LegalGPT.make_embedding_model()
+        return self._model
+
+    @property
+    def llm_client(self) -> LLMClient:
+        """The LLM client shared by every collection."""
+        with self._shared_lock:
+            if self._llm_client is None:
+                self._llm_client = LegalGPT.make_llm_client()
+        return self._llm_client
+
+    @property
+    def reranker(self):
+        """The cross-encoder shared by every collection, if reranking is on."""
+        with self._shared_lock:
+            if self._reranker is None and settings.rerank_enabled:
+                self._reranker = LegalGPT.make_reranker()
+        return self._reranker
+
+    def names(self) -> List[str]:
+        """All collections, saved or loaded."""
+        saved = set()
+        if self.root.exists():
+            saved = {
+                path.name
+                for path in self.root.iterdir()
+                if LegalGPT.saved_index(str(path)) is not None
+            }
+        with self._lock:
+            return sorted(saved | set(self._loaded))
+
+    def loaded(self) -> List[str]:
+        """Collections currently in memory, least recently used first."""
+        with self._lock:
+            return list(self._loaded)
+
+    def memory_usage(self) -> Dict[str, int]:
+        """Approximate bytes held by each loaded collection."""
+        with self._lock:
+            return dict(self._sizes)
+
+    def get(self, name: str, create: bool = False) -> LegalGPT:
+        """Return the pipeline of a collection, loading it if needed.
+
+        Raises ValueError for a collection that does not exist unless
+        ``create`` is set.
+        """
+        validate_collection_name(name)
+        with self._lock:
+            pipeline = self._loaded.get(name)
+            if pipeline is not None:
+                self._loaded.move_to_end(name)
+                return pipeline
+            opening = self._opening.setdefault(name, threading.Lock())
+
+        with opening:
+            with self._lock:
+                pipeline = self._loaded.get(name)
+            if pipeline is None:
+                pipeline = self._open(name, create)
+                with self._lock:
+                    self._loaded[name] = pipeline
+                    self._sizes[name] = pipeline.memory_bytes()
+                    self._opening.pop(name, None)
+                    self._evict(keep=name)
+        return pipeline
+
+    def _open(self, name: str, create: bool) -> LegalGPT:
+        path = self.root / name
+        exists = LegalGPT.saved_index(str(path)) is not None
+        if not exists and not create:
+            raise UnknownCollectionError(f"Unknown collection {name!r}")
+
+        pipeline = LegalGPT(
+            use_hybrid=self.use_hybrid,
+            collection=name,
+            index_path=str(path),
+            model=self.model,
+            embedding_cache=self._embedding_cache,
+            page_cache=self._page_cache,
+            pdf_loader=self._pdf_loader,
+            # Shared client, only created once a collection generates
+            llm_client_factory=lambda: self.llm_client,
+            reranker=self.reranker,
+        )
+        if exists:
+            with instrumentation.span("collections.load", collection=name):
+                pipeline.load_index()
+            instrumentation.count("collections.loads")
+            logger.info(f"✓ Loaded collection {name}")
+        return pipeline
+
+    def _evict(self, keep: str):
+        """Drop least recently used collections until under budget.
+
+        Called with the lock held. ``keep`` is never evicted, so a single
+        collection larger than the budget still loads.
+        """
+        while sum(self._sizes.values()) > self.memory_budget:
+            name = next((n for n in self._loaded if n != keep), None)
+            if name is None:
+                return
+            self._loaded.pop(name).close()
+            freed = self._sizes.pop(name)
+            instrumentation.count("collections.evictions")
+            logger.info(f"✓ Evicted collection {name} ({freed / 2**20:.1f} MB)")
+
+    def add_documents(self, name: str, paths: List[str]) -> List[str]:
+        """Index PDFs into a collection, creating it if needed."""
+        pipeline = self.get(name, create=True)
+        version = pipeline.index_version
+        indexed = pipeline.add_documents(paths)
+        self._saved(name, pipeline, version)
+        return indexed
+
+    def sync_directory(self, name: str, directory: str) -> Dict[str, List[str]]:
+        """Bring a collection in line with a directory of PDFs."""
+        pipeline = self.get(name, create=True)
+        version = pipeline.index_version
+        changes = pipeline.sync_directory(directory)
+        self._saved(name, pipeline, version)
+        return changes
+
+    def remove_documents(self, name: str, sources: List[str]) -> List[str]:
+        """Delete documents from a collection."""
+        pipeline = self.get(name)
+        version = pipeline.index_version
+        removed = pipeline.remove_documents(sources)
+        self._saved(name, pipeline, version)
+        return removed
+
+    def _saved(self, name: str, pipeline: LegalGPT, version: int):
+        """Persist a collection changed since ``version`` so it can be evicted."""
+        changed = pipeline.index_version != version
+        if changed and pipeline.vector_store.index is not None:
+            pipeline.save_index()
+        with self._lock:
+            if self._loaded.get(name) is pipeline:
+                self._sizes[name] = pipeline.memory_bytes()
+                self._evict(keep=name)
+
+    def query(self, name: str, question: str, **kwargs) -> Dict:
+        """Answer a question from one collection's documents only."""
+        return self.get(name).query(question, **kwargs)
+
+    async def astream_query(self, name: str, question: str, **kwargs) -> Dict:
+        """Async counterpart of ``query(name, question, stream=True)``."""
+        return await self.get(name).astream_query(question, **kwargs)
+
+    def drop(self, name: str):
+        """Delete a collection from memory, disk and Elasticsearch."""
+        pipeline = self.get(name)
+        if self.use_hybrid:
+            pipeline.keyword_store.delete_index()
+        with self._lock:
+            self._loaded.pop(name, None)
+            self._sizes.pop(name, None)
+        pipeline.close()
+        shutil.rmtree(self.root / name, ignore_errors=True)
+        logger.info(f"✓ Dropped collection {name}")
+
+    def close(self):
+        """Stop the worker threads and processes of every loaded collection."""
+        with self._lock:
+            pipelines = list(self._loaded.values())
+            self._loaded.clear()
+            self._sizes.clear()
+        for pipeline in pipelines:
+            pipeline.close()
+        self._pdf_loader.close()
@@ -1,84 +1,723 @@
 """Main RAG pipeline orchestration."""
 
-from typing import Dict
+from typing import Dict, List, AsyncIterator, Callable, Iterator, Optional, Tuple
+from contextlib import contextmanager
+from pathlib import Path
+import asyncio
+import json
+import logging
+import shutil
+import threading
+import numpy as np
 
 from docvision.config import settings
-from docvision.ingestion import PDFLoader, TextChunker
-from docvision.retrieval import VectorStore, KeywordStore, HybridSearch
-from docvision.generation import LLMClient
+from docvision.ingestion import PageCache, PDFLoader, TextChunker
+from docvision.retrieval import (
+    VectorStore,
+    KeywordStore,
+    BM25Store,
+    HybridSearch,
+    EmbeddingCache,
+    Reranker,
+    SearchFilter,
+)
+from docvision.retrieval.embedding_backends import load_embedding_model
+from docvision.generation import LLMClient, SemanticCache
+from docvision.generation.context_packer import load_tokenizer
+from docvision.observability import instrumentation
+from docvision._files import write_text
+
+logger = logging.getLogger(__name__)
 
 
 class LegalGPT:
-    """Main RAG pipeline."""
+    """Main RAG pipeline.
+
+    Safe to share between threads. Writes (ingest, sync, remove, load) are
+    serialized and applied to copies of the stores, which are published in
+    one assignment once the write completes; queries keep searching the
+    previously published stores meanwhile, and a failed write publishes
+    nothing. Elasticsearch is updated in place, so during a write hybrid
+    search may see keyword hits the published vector store does not hold
+    yet; those are dropped when results are hydrated.
+    """
+
+    def __init__(
+        self,
+        use_hybrid: bool = False,
+        collection: Optional[str] = None,
+        index_path: Optional[str] = None,
+        model=None,
+        embedding_cache: Optional[EmbeddingCache] = None,
+        page_cache: Optional[PageCache] = None,
+        llm_client: Optional[LLMClient] = None,
+        reranker: Optional[Reranker] = None,
+        llm_client_factory: Optional[Callable[[], LLMClient]] = None,
+        pdf_loader: Optional[PDFLoader] = None,
+    ):
+        """Create a pipeline over one corpus.
 
-    def __init__(self, use_hybrid: bool = False):
-        print("🚀 Initializing LegalGPT...")
+        ``collection`` names an isolated corpus: it gets its own
+        Elasticsearch index and, unless ``index_path`` is given, the default
+        index directory. ``model``, ``embedding_cache``, ``page_cache``,
+        ``llm_client``, ``reranker`` and ``pdf_loader`` let several pipelines
+        share one set of models, caches, one LLM connection pool and one pool
+        of extraction workers (see CollectionManager). Without ``llm_client`` one is made by
+        ``llm_client_factory`` (default make_llm_client()) on the first
+        answer, so search works without LLM credentials.
+        """
+        logger.info("🚀 Initializing LegalGPT...")
+
+        self.collection = collection
+        self.index_path = index_path or settings.index_path
 
         # Initialize components
-        self.pdf_loader = PDFLoader()
-        self.text_chunker = TextChunker(settings.chunk_size, settings.chunk_overlap)
-        self.vector_store = VectorStore(settings.embedding_model)
-        self.llm_client = LLMClient(settings.groq_api_key, settings.llm_model)
+        if page_cache is None and settings.extraction_cache_path:
+            page_cache = PageCache(
+                settings.extraction_cache_path, settings.extraction_cache_max_files
+            )
+        # A shared loader is left running by close()
+        self._owns_pdf_loader = pdf_loader is None
+        if pdf_loader is None:
+            pdf_loader = PDFLoader(settings.ingest_workers, cache=page_cache)
+        self.pdf_loader = pdf_loader
+        if embedding_cache is None and settings.embedding_cache_path:
+            embedding_cache = EmbeddingCache(
+                settings.embedding_cache_path, settings.embedding_cache_max_entries
+            )
+        self.vector_store = VectorStore(
+            settings.embedding_model,
+            model=model,
+            embedding_cache=embedding_cache,
+            index_type=settings.index_type,
+            vector_dtype=settings.vector_dtype,
+            backend=settings.embedding_backend,
+            backend_options=self.embedding_backend_options(),
+            index_params={
+                "nlist": settings.ivf_nlist,
+                "nprobe": settings.ivf_nprobe,
+                "pq_m": settings.pq_m,
+                "pq_nbits": settings.pq_nbits,
+                "hnsw_m": settings.hnsw_m,
+                "ef_search": settings.hnsw_ef_search,
+                "train_size": settings.index_train_size,
+            },
+        )
+        self.text_chunker = self._make_chunker(self.vector_store.model)
+        self._llm_client = llm_client
+        self._llm_client_factory = llm_client_factory or self.make_llm_client
+        self._llm_client_lock = threading.Lock()
+
+        self.reranker = reranker
+        if reranker is None and settings.rerank_enabled:
+            self.reranker = self.make_reranker()
 
         self.use_hybrid = use_hybrid
+        self.keyword_store = None
+        self.hybrid_search = None
         if use_hybrid:
-            self.keyword_store = KeywordStore(
-                settings.elasticsearch_host, settings.elasticsearch_index
+            if settings.keyword_backend == "bm25":
+                self.keyword_store = BM25Store()
+            elif settings.keyword_backend == "elasticsearch":
+                index_name = settings.elasticsearch_index
+                if collection is not None:
+                    index_name = f"{index_name}-{collection}"
+                self.keyword_store = KeywordStore(
+                    settings.elasticsearch_host, index_name
+                )
+            else:
+                raise ValueError(
+                    f"Unknown keyword backend {settings.keyword_backend!r}; "
+                    "expected 'elasticsearch' or 'bm25'"
+                )
+            logger.info("✓ Hybrid mode enabled")
+
+        self.answer_cache = None
+        if settings.answer_cache_enabled:
+            self.answer_cache = SemanticCache(
+                threshold=settings.answer_cache_threshold,
+                max_entries=settings.answer_cache_max_entries,
+                ttl=settings.answer_cache_ttl,
             )
-            self.hybrid_search = None
-            print("✓ Hybrid mode enabled")
 
+        self.documents: Dict[str, str] = {}  # source name -> content hash
+        # Bumped on every corpus change; cached answers are tied to a version
+        self.index_version = 0
         self.is_ready = False
-        print("✓ LegalGPT initialized")
+        # What queries search: (vector store, hybrid search or None)
+        self._published: Tuple = (self.vector_store, None)
+        self._write_lock = threading.RLock()
+        self._writing_depth = 0
+        self._changed = False
+        logger.info("✓ LegalGPT initialized")
+
+    @property
+    def llm_client(self) -> LLMClient:
+        """The LLM client, created on first use."""
+        with self._llm_client_lock:
+            if self._llm_client is None:
+                self._llm_client = self._llm_client_factory()
+        return self._llm_client
+
+    @llm_client.setter
+    def llm_client(self, llm_client: LLMClient):
+        self._llm_client = llm_client
+
+    @staticmethod
+    def _make_chunker(model) -> TextChunker:
+        """Chunker sized to fit the embedding model's sequence limit."""
+        tokenizer = getattr(model, "tokenizer", None)
+        model_limit = getattr(model, "max_seq_length", None)
+        if tokenizer is None or not model_limit:
+            return TextChunker(settings.chunk_size, settings.chunk_overlap)
+
+        # The model adds [CLS] and [SEP] to every chunk
+        max_tokens = model_limit - tokenizer.num_special_tokens_to_add()
+        if settings.chunk_max_tokens:
+            max_tokens = min(max_tokens, settings.chunk_max_tokens)
+        return TextChunker(
+            settings.chunk_size, settings.chunk_overlap, tokenizer, max_tokens
+        )
+
+    @staticmethod
+    def embedding_backend_options() -> Dict:
+        """Options for load_embedding_model() from settings."""
+        return {
+            "onnx_dir": settings.embedding_onnx_dir,
+            "quantize": settings.embedding_quantize,
+            "threads": settings.embedding_threads,
+            "min_cosine": settings.embedding_min_cosine,
+        }
+
+    @classmethod
+    def make_embedding_model(cls):
+        """Embedding model on the configured backend, to share between pipelines."""
+        return load_embedding_model(
+            settings.embedding_model,
+            settings.embedding_backend,
+            **cls.embedding_backend_options(),
+        )
+
+    @staticmethod
+    def make_llm_client() -> LLMClient:
+        """LLM client configured from settings."""
+        if not settings.groq_api_key and not settings.llm_base_url:
+            raise ValueError("GROQ_API_KEY is required to generate answers")
+        return LLMClient(
+            settings.groq_api_key,
+            settings.llm_model,
+            base_url=settings.llm_base_url or None,
+            max_concurrency=settings.llm_max_concurrency,
+            context_max_tokens=settings.llm_context_max_tokens,
+            tokenizer=load_tokenizer(settings.llm_tokenizer),
+        )
+
+    @staticmethod
+    def make_reranker() -> Reranker:
+        """Cross-encoder reranker configured from settings."""
+        budget = settings.rerank_time_budget_ms
+        return Reranker(
+            settings.rerank_model,
+            batch_size=settings.rerank_batch_size,
+            time_budget=budget / 1000 if budget else None,
+            cache_max_entries=settings.rerank_cache_max_entries,
+        )
 
     def ingest_documents(self, directory: str):
-        """Ingest PDF documents."""
-        print(f"\n📂 Ingesting from: {directory}")
+        """Ingest PDF documents, rebuilding all indexes from scratch."""
+        logger.info(f"📂 Ingesting from: {directory}")
 
-        # Load PDFs
-        documents = self.pdf_loader.load_directory(directory)
-        if not documents:
+        if not any(Path(directory).glob("*.pdf")):
             raise ValueError(f"No PDFs found in {directory}")
 
-        # Chunk documents
-        print("\n✂️  Chunking...")
-        chunks = self.text_chunker.chunk_documents(documents)
+        with self._writing():
+            self.documents = {}
+            self.vector_store.index_chunks([])
+            if self.use_hybrid:
+                self.keyword_store.create_index()
+            self._corpus_changed()
+
+            self.sync_directory(directory)
+        logger.info("✅ Ingestion complete!")
+
+    def sync_directory(self, directory: str) -> Dict[str, List[str]]:
+        """Bring the indexes in line with a directory of PDFs.
+
+        Files are compared by content hash, so only new or changed PDFs are
+        loaded, chunked and embedded, and PDFs no longer present are deleted.
+        """
+        paths = sorted(Path(directory).glob("*.pdf"))
+        present = {path.name for path in paths}
+
+        with self._writing():
+            known = dict(self.documents)
+            indexed = self.add_documents(paths)
+            removed = self.remove_documents(
+                [source for source in known if source not in present]
+            )
+
+        return {
+            "added": [s for s in indexed if s not in known],
+            "updated": [s for s in indexed if s in known],
+            "removed": removed,
+        }
+
+    def add_documents(self, paths: List[str]) -> List[str]:
+        """Index new or changed PDFs. Returns the sources that were indexed."""
+        with instrumentation.span("ingest.total"), self._writing():
+            return self._add_documents(paths)
 
-        # Index in vector store
-        print("\n🔍 Building vector index...")
-        self.vector_store.index_chunks(chunks)
+    def _add_documents(self, paths: List[str]) -> List[str]:
+        pending = {}
+        with instrumentation.span("ingest.hash", files=len(paths)):
+            for path in map(Path, paths):
+                content_hash = self.pdf_loader.hash_file(str(path))
+                if self.documents.get(path.name) != content_hash:
+                    pending[path.name] = (path, content_hash)
 
-        # Index in keyword store if hybrid
+        if not pending:
+            logger.info("✓ No new or changed documents")
+            return []
+
+        # Previous versions of changed documents are dropped once replaced
+        stale_ids = self.vector_store.ids_for_sources(
+            [source for source in pending if source in self.documents]
+        )
+
+        # Stream PDFs -> chunks -> embedding batches; extraction runs ahead
+        # in worker processes while the current batch is being embedded
+        loaded = []
+
+        def documents():
+            paths = [path for path, _ in pending.values()]
+            hashes = {source: h for source, (_, h) in pending.items()}
+            for doc in self.pdf_loader.iter_documents(paths, hashes):
+                loaded.append(doc["source"])
+                yield doc
+
+        logger.info("🔍 Updating indexes...")
+        chunks = self.text_chunker.iter_chunks(documents())
+        if self.use_hybrid:
+            self.keyword_store.ensure_index()
+
+        for batch, ids in self.vector_store.add_chunk_stream(
+            chunks, settings.embedding_batch_size
+        ):
+            # Index in keyword store if hybrid
+            if self.use_hybrid:
+                self.keyword_store.index_chunks(batch, ids)
+
+        # Only drop old chunks of documents whose new version loaded
+        stale_sources = [source for source in loaded if source in self.documents]
+        self._delete_ids(
+            np.intersect1d(stale_ids, self.vector_store.ids_for_sources(stale_sources))
+        )
+
+        # Replaced, not updated, so readers never see a dict mid-change
+        self.documents = {
+            **self.documents,
+            **{source: pending[source][1] for source in loaded},
+        }
+
+        self._corpus_changed()
+        return loaded
+
+    def remove_documents(self, sources: List[str]) -> List[str]:
+        """Delete documents from all indexes. Returns the sources removed."""
+        with self._writing():
+            removed = [source for source in sources if source in self.documents]
+            self._delete_chunks(removed)
+            self.documents = {
+                source: content_hash
+                for source, content_hash in self.documents.items()
+                if source not in removed
+            }
+            if removed:
+                self._corpus_changed()
+        return removed
+
+    def _delete_chunks(self, sources: List[str]):
+        """Delete every chunk of the given sources by ID from both stores."""
+        if not sources:
+            return
+
+        self._delete_ids(self.vector_store.ids_for_sources(sources))
+
+    def _delete_ids(self, ids: np.ndarray):
+        """Delete chunks by vector ID from both stores."""
+        if len(ids) == 0:
+            return
+
+        self.vector_store.delete_ids(ids)
         if self.use_hybrid:
-            print("\n📝 Building keyword index...")
-            self.keyword_store.create_index()
-            self.keyword_store.index_chunks(chunks)
-            self.hybrid_search = HybridSearch(self.vector_store, self.keyword_store)
+            self.keyword_store.delete_chunks(ids)
+        self._corpus_changed()
+
+    def _corpus_changed(self):
+        """Note that the indexed documents changed; applied on publish."""
+        self._changed = True
+
+    @contextmanager
+    def _writing(self):
+        """Serialize a write and publish its result atomically.
+
+        The outermost write swaps in copies of the stores for the writer to
+        change; queries keep using ``_published`` until ``_publish()``. If
+        the write raises, the copies are dropped. Nested writes join the
+        outer one.
+        """
+        with self._write_lock:
+            self._writing_depth += 1
+            if self._writing_depth > 1:
+                try:
+                    yield
+                finally:
+                    self._writing_depth -= 1
+                return
 
+            before = (self.vector_store, self.keyword_store, self.documents)
+            self.vector_store = self.vector_store.clone()
+            if isinstance(self.keyword_store, BM25Store):
+                self.keyword_store = self.keyword_store.clone()
+            try:
+                yield
+            except BaseException:
+                self.vector_store, self.keyword_store, self.documents = before
+                self._changed = False
+                raise
+            finally:
+                self._writing_depth -= 1
+            self._publish()
+
+    def _publish(self):
+        """Make the written stores the ones queries search."""
+        if self.use_hybrid:
+            if self.hybrid_search is None:
+                self.hybrid_search = HybridSearch(
+                    self.vector_store,
+                    self.keyword_store,
+                    concurrent=settings.hybrid_concurrent,
+                    leg_timeout=settings.hybrid_leg_timeout or None,
+                )
+            else:
+                self.hybrid_search = self.hybrid_search.with_stores(
+                    self.vector_store, self.keyword_store
+                )
+        self._published = (self.vector_store, self.hybrid_search)
+
+        if self._changed:
+            self._changed = False
+            self.index_version += 1
+            if self.answer_cache is not None:
+                self.answer_cache.clear()
         self.is_ready = True
-        print("\n✅ Ingestion complete!")
 
-    def query(self, question: str, top_k: int = 5) -> Dict:
-        """Answer a question."""
+    @staticmethod
+    def saved_index(directory: str) -> Optional[Path]:
+        """The directory holding the index saved under ``directory``, if any.
+
+        save_index() writes each save to a fresh ``v<n>`` subdirectory and
+        then points ``CURRENT`` at it; indexes saved before that live
+        directly in ``directory``.
+        """
+        path = Path(directory)
+        current = path / "CURRENT"
+        if current.exists():
+            return path / current.read_text().strip()
+        if (path / "manifest.json").exists():
+            return path
+        return None
+
+    def save_index(self, directory: Optional[str] = None):
+        """Persist the vector index so later sessions can skip ingestion.
+
+        Files of the previous save are never rewritten, since a loaded index
+        may have them memory-mapped; readers see either save, never a mix.
+        """
+        path = Path(directory or self.index_path)
+        with self._write_lock:
+            previous = self.saved_index(str(path))
+            generations = sorted(
+                int(child.name[1:])
+                for child in path.glob("v*")
+                if child.is_dir() and child.name[1:].isdigit()
+            )
+            name = f"v{generations[-1] + 1 if generations else 1}"
+            target = path / name
+            self.vector_store.save(str(target))
+            if self.use_hybrid and isinstance(self.keyword_store, BM25Store):
+                self.keyword_store.save(str(target / "keyword"))
+            write_text(target / "documents.json", json.dumps(self.documents, indent=2))
+            write_text(path / "CURRENT", name)
+
+            # Keep the previous save for processes still opening it; files
+            # mapped by this process stay valid after they are unlinked
+            for generation in generations:
+                if path / f"v{generation}" != previous:
+                    shutil.rmtree(path / f"v{generation}", ignore_errors=True)
+        logger.info(f"✓ Saved {name} of {path}")
+
+    def load_index(self, directory: Optional[str] = None, mmap: bool = True):
+        """Load a previously saved vector index."""
+        directory = directory or self.index_path
+        path = self.saved_index(directory)
+        if path is None:
+            raise ValueError(f"No saved index found in {directory}")
+        with self._writing():
+            self.vector_store.load(str(path), mmap=mmap)
+            if self.use_hybrid and isinstance(self.keyword_store, BM25Store):
+                if (path / "keyword").exists():
+                    self.keyword_store.load(str(path / "keyword"), mmap=mmap)
+                else:
+                    # Saved in vector-only mode; rebuild from the stored chunks
+                    self.keyword_store.create_index()
+                    self.keyword_store.index_chunks(
+                        list(self.vector_store.chunks), self.vector_store.ids
+                    )
+
+            documents_path = path / "documents.json"
+            if documents_path.exists():
+                self.documents = json.loads(documents_path.read_text())
+
+            # Elasticsearch keeps its own copy of the chunks between runs, the
+            # BM25 index is saved alongside the vectors
+            self._corpus_changed()
+
+    def memory_bytes(self) -> int:
+        """Approximate bytes held by this pipeline's indexes."""
+        size = self.vector_store.memory_bytes()
+        if self.use_hybrid and isinstance(self.keyword_store, BM25Store):
+            size += self.keyword_store.memory_bytes()
+        return size
+
+    def close(self):
+        """Stop the hybrid search threads and, unless shared, PDF workers."""
+        if self.hybrid_search is not None:
+            self.hybrid_search.close()
+        if self._owns_pdf_loader:
+            self.pdf_loader.close()
+
+    def query(
+        self,
+        question: str,
+        top_k: int = 5,
+        stream: bool = False,
+        timings: bool = False,
+        search_filter: Optional[SearchFilter] = None,
+    ) -> Dict:
+        """Answer a question.
+
+        With ``stream=True`` the result holds an ``answer_stream`` iterator of
+        text deltas instead of ``answer``; sources are available immediately.
+        With ``timings=True`` the result holds a per-stage latency breakdown in
+        milliseconds under ``timings`` (for streams, up to the first delta
+        being requested). ``search_filter`` restricts retrieval to some
+        documents or pages.
+        """
+        instrumentation.count("queries")
+        with instrumentation.trace_request() as trace:
+            with instrumentation.span("query.total"):
+                result = self._query(question, top_k, stream, search_filter)
+        if timings:
+            result["timings"] = trace.breakdown()
+        return result
+
+    def search(
+        self,
+        question: str,
+        top_k: int = 5,
+        search_filter: Optional[SearchFilter] = None,
+    ) -> Dict:
+        """Retrieve chunks for a question without generating an answer."""
+        instrumentation.count("searches")
+        with instrumentation.span("query.retrieve"):
+            chunks, method = self._retrieve(question, top_k, search_filter)
+        return {"chunks": chunks, "search_method": method}
+
+    def _query(
+        self,
+        question: str,
+        top_k: int,
+        stream: bool,
+        search_filter: Optional[SearchFilter] = None,
+    ) -> Dict:
+        question_vector = self._embed_question(question)
+        with instrumentation.span("query.retrieve"):
+            chunks, method = self._retrieve(
+                question, top_k, search_filter, question_vector
+            )
+        context, cached = self._check_answer_cache(question_vector, chunks)
+
+        # Generate answer
+        if cached is not None:
+            logger.info("✓ Answer cache hit")
+            instrumentation.count("answer_cache.hits")
+            result = cached
+            if stream:
+                result["answer_stream"] = iter([result.pop("answer")])
+        elif stream:
+            logger.info("💭 Generating answer...")
+            packed = self.llm_client.pack_context(chunks)
+            sources = self.llm_client.extract_sources(packed["passages"])
+            result = {
+                "answer_stream": self._cache_stream(
+                    self.llm_client.stream_answer(question, chunks, packed),
+                    question_vector,
+                    context,
+                    sources,
+                ),
+                "sources": sources,
+                "context_tokens": packed["tokens"],
+            }
+        else:
+            logger.info("💭 Generating answer...")
+            with instrumentation.span("query.generate"):
+                result = self.llm_client.generate_answer(question, chunks)
+            self._store_answer(question_vector, context, result)
+        result["search_method"] = method
+        result["retrieved_chunks"] = chunks
+        result["cached"] = cached is not None
+
+        return result
+
+    async def astream_query(
+        self,
+        question: str,
+        top_k: int = 5,
+        search_filter: Optional[SearchFilter] = None,
+    ) -> Dict:
+        """Async counterpart of ``query(stream=True)``.
+
+        Retrieval runs in a worker thread so the event loop stays free; the
+        returned ``answer_stream`` is an async iterator of text deltas.
+        """
+        question_vector = await asyncio.to_thread(self._embed_question, question)
+        chunks, method = await asyncio.to_thread(
+            self._retrieve, question, top_k, search_filter, question_vector
+        )
+        context, cached = await asyncio.to_thread(
+            self._check_answer_cache, question_vector, chunks
+        )
+
+        if cached is not None:
+            answer_stream = self._single_delta(cached["answer"])
+            sources, context_tokens = cached["sources"], None
+        else:
+            packed = self.llm_client.pack_context(chunks)
+            sources = self.llm_client.extract_sources(packed["passages"])
+            context_tokens = packed["tokens"]
+            answer_stream = self._cache_astream(
+                self.llm_client.astream_answer(question, chunks, packed),
+                question_vector,
+                context,
+                sources,
+            )
+
+        return {
+            "answer_stream": answer_stream,
+            "sources": sources,
+            "context_tokens": context_tokens,
+            "search_method": method,
+            "retrieved_chunks": chunks,
+            "cached": cached is not None,
+        }
+
+    def _embed_question(self, question: str) -> Optional[np.ndarray]:
+        """The question's vector, embedded once for search and the answer cache.
+
+        None without an answer cache; the vector leg then embeds it itself.
+        """
+        if self.answer_cache is None:
+            return None
+        return self._published[0].embed_queries([question])[0]
+
+    def _check_answer_cache(self, question_vector, chunks: List[Dict]) -> Tuple:
+        """Return (context key, cached result or None)."""
+        if self.answer_cache is None:
+            return None, None
+
+        with instrumentation.span("query.cache_lookup"):
+            context = self.answer_cache.context_key(chunks, self.index_version)
+            return context, self.answer_cache.lookup(question_vector, context)
+
+    def _store_answer(self, question_vector, context, result: Dict):
+        if self.answer_cache is not None:
+            self.answer_cache.store(
+                question_vector,
+                context,
+                {"answer": result["answer"], "sources": result["sources"]},
+            )
+
+    def _cache_stream(self, deltas, question_vector, context, sources) -> Iterator[str]:
+        """Pass deltas through, caching the full answer once it completes."""
+        parts = []
+        for delta in deltas:
+            parts.append(delta)
+            yield delta
+        self._store_answer(
+            question_vector,
+            context,
+            {"answer": "".join(parts), "sources": sources},
+        )
+
+    async def _cache_astream(
+        self, deltas, question_vector, context, sources
+    ) -> AsyncIterator[str]:
+        """Async counterpart of _cache_stream()."""
+        parts = []
+        async for delta in deltas:
+            parts.append(delta)
+            yield delta
+        self._store_answer(
+            question_vector,
+            context,
+            {"answer": "".join(parts), "sources": sources},
+        )
+
+    @staticmethod
+    async def _single_delta(text: str) -> AsyncIterator[str]:
+        yield text
+
+    def _retrieve(
+        self,
+        question: str,
+        top_k: int,
+        search_filter: Optional[SearchFilter] = None,
+        question_vector: Optional[np.ndarray] = None,
+    ) -> Tuple[List[Dict], str]:
+        """Retrieve chunks for a question. Returns (chunks, search method).
+
+        ``question_vector`` from _embed_question() saves encoding it again.
+        """
         if not self.is_ready:
             raise ValueError("Pipeline not ready. Call ingest_documents() first.")
 
-        print(f"\n❓ Question: {question}")
+        logger.info(f"❓ Question: {question}")
+
+        # Rerank a wider candidate set down to top_k
+        candidates = top_k
+        if self.reranker is not None:
+            candidates = max(top_k, settings.rerank_candidates)
 
-        # Retrieve chunks
-        if self.use_hybrid and self.hybrid_search:
-            print("🔍 Hybrid search...")
-            chunks = self.hybrid_search.search(question, top_k)
+        # One read, so a concurrent write cannot swap stores mid-query
+        vector_store, hybrid_search = self._published
+        query_vectors = None if question_vector is None else question_vector[None]
+        if hybrid_search is not None:
+            logger.info("🔍 Hybrid search...")
+            (chunks,) = hybrid_search.search_many(
+                [question], candidates, search_filter, query_vectors
+            )
             method = "hybrid"
         else:
-            print("🔍 Vector search...")
-            chunks = self.vector_store.search(question, top_k)
+            logger.info("🔍 Vector search...")
+            (chunks,) = vector_store.search_many(
+                [question], candidates, search_filter, query_vectors
+            )
             method = "vector"
 
-        # Generate answer
-        print("💭 Generating answer...")
-        result = self.llm_client.generate_answer(question, chunks)
-        result["search_method"] = method
-        result["retrieved_chunks"] = chunks
+        if self.reranker is not None:
+            chunks, reranked = self.reranker.rerank(question, chunks, top_k)
+            if reranked:
+                method += "+rerank"
 
-        return result
+        return chunks, method
@@ -1,3 +1,17 @@
-from .llm_client import LLMClient
+from typing import TYPE_CHECKING
 
-__all__ = ["LLMClient"]
+from docvision._lazy import lazy_exports
+
+__getattr__, __dir__, __all__ = lazy_exports(
+    __name__,
+    {
+        "LLMClient": ".llm_client",
+        "SemanticCache": ".answer_cache",
+        "ContextPacker": ".context_packer",
+    },
+)
+
+if TYPE_CHECKING:
+    from .llm_client import LLMClient
+    from .answer_cache import SemanticCache
+    from .context_packer import ContextPacker
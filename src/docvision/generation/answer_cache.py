@@ -0,0 +1,107 @@
+"""Semantic cache for generated answers."""
+
+from typing import List, Dict, Hashable, Optional, Tuple
+from collections import OrderedDict
+import threading
+import time
+import numpy as np
+
+
+class SemanticCache:
+    """Reuse answers for near-identical questions over the same context.
+
+    An entry matches when it was stored for the same index version and the
+    same set of retrieved chunks, and the cosine similarity between the two
+    question embeddings is at least ``threshold``. Entries expire after
+    ``ttl`` seconds and the least recently used are evicted beyond
+    ``max_entries``.
+    """
+
+    def __init__(
+        self, threshold: float = 0.95, max_entries: int = 1000, ttl: float = 3600.0
+    ):
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        # entry id -> (context key, unit question vector, result, stored at)
+        self._entries: "OrderedDict[int, Tuple]" = OrderedDict()
+        # context key -> entry ids stored for that context
+        self._by_context: Dict[Hashable, List[int]] = {}
+        self._next_id = 0
+
+    @staticmethod
+    def context_key(chunks: List[Dict], index_version: int) -> Hashable:
+        """Identify the retrieved chunk set independent of its order."""
+        return index_version, frozenset(
+            (chunk["source"], chunk["page"], chunk["chunk_id"]) for chunk in chunks
+        )
+
+    def lookup(self, question_vector: np.ndarray, context: Hashable) -> Optional[Dict]:
+        """Return the cached result for a similar question, if any."""
+        vector = self._normalize(question_vector)
+        now = time.monotonic()
+        with self._lock:
+            best_id, best_score = None, self.threshold
+            for entry_id in list(self._by_context.get(context, [])):
+                _, cached_vector, _, stored_at = self._entries[entry_id]
+                if now - stored_at > self.ttl:
+                    self._remove(entry_id)
+                    continue
+                score = float(cached_vector @ vector)
+                if score >= best_score:
+                    best_id, best_score = entry_id, score
+
+            if best_id is None:
+                self.misses += 1
+                return None
+
+            self.hits += 1
+            self._entries.move_to_end(best_id)
+            return dict(self._entries[best_id][2])
+
+    def store(self, question_vector: np.ndarray, context: Hashable, result: Dict):
+        """Cache a result for a question and its context."""
+        with self._lock:
+            entry_id = self._next_id
+            self._next_id += 1
+            self._entries[entry_id] = (
+                context,
+                self._normalize(question_vector),
+                dict(result),
+                time.monotonic(),
+            )
+            self._by_context.setdefault(context, []).append(entry_id)
+
+            while len(self._entries) > self.max_entries:
+                self._remove(next(iter(self._entries)))
+
+    def clear(self):
+        """Drop every entry, e.g. after the corpus changed."""
+        with self._lock:
+            self._entries.clear()
+            self._by_context.clear()
+
+    def stats(self) -> Dict[str, float]:
+        """Hit/miss counters and current size."""
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "entries": len(self._entries),
+        }
+
+    def _remove(self, entry_id: int):
+        context = self._entries.pop(entry_id)[0]
+        siblings = self._by_context[context]
+        siblings.remove(entry_id)
+        if not siblings:
+            del self._by_context[context]
+
+    @staticmethod
+    def _normalize(vector: np.ndarray) -> np.ndarray:
+        vector = np.asarray(vector, dtype=np.float32).ravel()
+        return vector / max(float(np.linalg.norm(vector)), 1e-12)
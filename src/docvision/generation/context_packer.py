@@ -0,0 +1,215 @@
+"""Prompt context construction under a token budget."""
+
+from typing import List, Dict, Set, Tuple
+import logging
+import math
+import re
+
+from docvision.observability import instrumentation
+
+logger = logging.getLogger(__name__)
+
+WORD = re.compile(r"\w+")
+# Characters matched when looking for the text shared by adjacent chunks
+_PROBE_LENGTH = 32
+
+
+class ContextPacker:
+    """Turn retrieved chunks into a compact, token-bounded context.
+
+    1. Chunks from the same source and page with consecutive ``chunk_id``
+       are merged into one passage, dropping the text the chunker repeated
+       as overlap.
+    2. Passages whose word 3-grams are mostly (``dedupe_threshold``)
+       contained in a better-ranked passage are dropped.
+    3. Passages are added in retrieval order, best first, while they fit in
+       ``max_tokens``; a passage that does not fit is skipped in favour of
+       smaller ones further down. If none fits, the best passage is
+       truncated to the budget.
+
+    Retrieval order is used as the score because vector distances, RRF and
+    rerank scores are not comparable. ``tokenizer`` is a Hugging Face
+    tokenizer for the LLM; without one, tokens are estimated at four
+    characters each.
+    """
+
+    def __init__(
+        self,
+        max_tokens: int = 3000,
+        tokenizer=None,
+        dedupe_threshold: float = 0.9,
+    ):
+        self.max_tokens = max_tokens
+        self.tokenizer = tokenizer
+        self.dedupe_threshold = dedupe_threshold
+
+    def count_tokens(self, text: str) -> int:
+        if self.tokenizer is None:
+            return math.ceil(len(text) / 4)
+        return len(self.tokenizer.encode(text, add_special_tokens=False))
+
+    def pack(self, chunks: List[Dict]) -> Dict:
+        """Pack chunks into a context.
+
+        Returns ``context`` (the prompt text), ``passages`` (source, page,
+        text and chunk_ids of each numbered passage), ``tokens`` used and
+        the number of retrieved chunks ``dropped`` entirely.
+        """
+        with instrumentation.span("llm.pack_context", chunks=len(chunks)):
+            passages = self._dedupe(self._merge(chunks))
+            packed, tokens = self._fit(passages)
+
+        used = {rank for passage in packed for rank in passage["members"]}
+        result = {
+            "context": "\n".join(p["rendered"] for p in packed),
+            "passages": [
+                {
+                    "source": p["source"],
+                    "page": p["page"],
+                    "text": p["text"],
+                    "chunk_ids": p["chunk_ids"],
+                }
+                for p in packed
+            ],
+            "tokens": tokens,
+            "dropped": len(chunks) - len(used),
+        }
+        instrumentation.count("llm.context_tokens", tokens)
+        logger.info(
+            f"✓ Packed {len(packed)} passages into {tokens} tokens "
+            f"({result['dropped']} chunks dropped)"
+        )
+        return result
+
+    def _merge(self, chunks: List[Dict]) -> List[Dict]:
+        """Merge consecutive chunks of the same source and page."""
+        groups: Dict[tuple, List[int]] = {}
+        for rank, chunk in enumerate(chunks):
+            groups.setdefault((chunk["source"], chunk["page"]), []).append(rank)
+
+        passages = []
+        for (source, page), ranks in groups.items():
+            ranks.sort(key=lambda r: _chunk_id(chunks[r]))
+            current = None
+            for rank in ranks:
+                chunk = chunks[rank]
+                chunk_id = _chunk_id(chunk)
+                last_id = current["chunk_ids"][-1] if current else None
+                if current is not None and chunk_id >= 0 and last_id >= 0:
+                    if chunk_id == last_id:
+                        # The same chunk retrieved twice
+                        current["members"].append(rank)
+                        continue
+                    if chunk_id == last_id + 1:
+                        current["text"] = join_overlapping(
+                            current["text"], chunk["text"]
+                        )
+                        current["chunk_ids"].append(chunk_id)
+                        current["members"].append(rank)
+                        current["rank"] = min(current["rank"], rank)
+                        continue
+                current = {
+                    "source": source,
+                    "page": page,
+                    "text": chunk["text"],
+                    "chunk_ids": [chunk_id],
+                    "members": [rank],
+                    "rank": rank,
+                }
+                passages.append(current)
+
+        passages.sort(key=lambda p: p["rank"])
+        return passages
+
+    def _dedupe(self, passages: List[Dict]) -> List[Dict]:
+        """Drop passages mostly contained in a better-ranked one."""
+        kept, kept_shingles = [], []
+        for passage in passages:
+            shingles = _shingles(passage["text"])
+            duplicate = any(
+                _containment(shingles, other) >= self.dedupe_threshold
+                for other in kept_shingles
+            )
+            if duplicate:
+                instrumentation.count("llm.context_duplicates")
+                continue
+            kept.append(passage)
+            kept_shingles.append(shingles)
+        return kept
+
+    def _fit(self, passages: List[Dict]) -> Tuple[List[Dict], int]:
+        """Greedily pick passages, best first, that fit in the budget."""
+        packed, used = [], 0
+        for passage in passages:
+            rendered = self._render(len(packed) + 1, passage)
+            cost = self.count_tokens(rendered) + (1 if packed else 0)
+            if used + cost <= self.max_tokens:
+                passage["rendered"] = rendered
+                packed.append(passage)
+                used += cost
+
+        if not packed and passages:
+            # Nothing fits whole; send the start of the best passage
+            passage = passages[0]
+            passage["text"] = self._truncate(passage, self.max_tokens)
+            passage["rendered"] = self._render(1, passage)
+            packed, used = [passage], self.count_tokens(passage["rendered"])
+        return packed, used
+
+    def _truncate(self, passage: Dict, budget: int) -> str:
+        """Shorten a passage's text until it renders within ``budget``."""
+        text = passage["text"]
+        while text:
+            tokens = self.count_tokens(self._render(1, {**passage, "text": text}))
+            if tokens <= budget:
+                return text
+            # Shrink proportionally, and by at least one character
+            keep = min(len(text) - 1, int(len(text) * budget / tokens))
+            cut = text[:keep]
+            text = cut.rsplit(" ", 1)[0] if " " in cut else cut
+        return text
+
+    @staticmethod
+    def _render(number: int, passage: Dict) -> str:
+        return (
+            f"[{number}] Source: {passage['source']}, Page: {passage['page']}\n"
+            f"{passage['text']}\n"
+        )
+
+
+def load_tokenizer(name: str):
+    """Load a Hugging Face tokenizer by name; None for an empty name."""
+    if not name:
+        return None
+    from transformers import AutoTokenizer
+
+    return AutoTokenizer.from_pretrained(name)
+
+
+def join_overlapping(first: str, second: str) -> str:
+    """Concatenate two texts, writing the overlap between them only once."""
+    probe = second[:_PROBE_LENGTH]
+    start = first.find(probe, max(0, len(first) - len(second)))
+    while start != -1:
+        if second.startswith(first[start:]):
+            return first + second[len(first) - start :]
+        start = first.find(probe, start + 1)
+    return f"{first} {second}"
+
+
+def _chunk_id(chunk: Dict) -> int:
+    """Chunk ID, or -1 for chunks without one (never merged)."""
+    chunk_id = chunk.get("chunk_id")
+    return -1 if chunk_id is None else int(chunk_id)
+
+
+def _shingles(text: str, size: int = 3) -> Set[tuple]:
+    words = WORD.findall(text.lower())
+    if len(words) < size:
+        return {tuple(words)}
+    return {tuple(words[i : i + size]) for i in range(len(words) - size + 1)}
+
+
+def _containment(a: Set[tuple], b: Set[tuple]) -> float:
+    """Share of ``a`` that also appears in ``b``."""
+    return len(a & b) / len(a) if a else 1.0
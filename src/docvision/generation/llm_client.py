@@ -1,49 +1,169 @@
 """LLM client for answer generation."""
 
-from typing import List, Dict
-from groq import Groq
+from typing import List, Dict, AsyncIterator, Iterator, Optional
+import asyncio
+import logging
+import threading
+import httpx
+
+from docvision.observability import instrumentation
+from .context_packer import ContextPacker
+
+logger = logging.getLogger(__name__)
+
+SYSTEM_PROMPT = (
+    "You are a legal assistant. Answer questions based on provided context. "
+    "Always cite sources."
+)
 
 
 class LLMClient:
-    """Handle LLM interactions."""
+    """Handle LLM interactions.
 
-    def __init__(self, api_key: str, model: str):
-        self.client = Groq(api_key=api_key)
+    Both the blocking and the async client keep one pooled HTTP connection
+    pool for their lifetime, and at most ``max_concurrency`` generations run
+    at once; further requests wait for a free slot. Retrieved chunks are
+    merged, deduplicated and packed into ``context_max_tokens`` prompt tokens
+    (see ContextPacker) before they are sent.
+    """
+
+    def __init__(
+        self,
+        api_key: str,
+        model: str,
+        base_url: Optional[str] = None,
+        max_concurrency: int = 8,
+        context_max_tokens: int = 3000,
+        tokenizer=None,
+    ):
+        self.api_key = api_key
+        self.base_url = base_url
         self.model = model
-        print(f"✓ LLM client initialized: {model}")
-
-    def generate_answer(self, query: str, context_chunks: List[Dict]) -> Dict[str, any]:
-        """Generate answer from context."""
-        context = self._build_context(context_chunks)
-        prompt = self._create_prompt(query, context)
-
-        response = self.client.chat.completions.create(
-            model=self.model,
-            messages=[
-                {
-                    "role": "system",
-                    "content": "You are a legal assistant. Answer questions based on provided context. Always cite sources.",
-                },
-                {"role": "user", "content": prompt},
-            ],
-            temperature=0.3,
-            max_tokens=1024,
+        self.max_concurrency = max_concurrency
+        self.packer = ContextPacker(context_max_tokens, tokenizer)
+        self._limits = httpx.Limits(
+            max_connections=max_concurrency,
+            max_keepalive_connections=max_concurrency,
+        )
+        from groq import Groq
+
+        self.client = Groq(
+            api_key=api_key,
+            base_url=base_url,
+            http_client=httpx.Client(limits=self._limits),
         )
+        self._slots = threading.BoundedSemaphore(max_concurrency)
+        # Async client and semaphore are bound to the loop that created them
+        self._async_loop = None
+        self._async_client = None
+        self._async_slots = None
+        logger.info(f"✓ LLM client initialized: {model}")
+
+    def generate_answer(
+        self, query: str, context_chunks: List[Dict], packed: Optional[Dict] = None
+    ) -> Dict[str, any]:
+        """Generate answer from context.
+
+        ``packed`` is the result of pack_context(context_chunks), if the
+        caller already has it.
+        """
+        packed = packed or self.pack_context(context_chunks)
+        with self._slots, instrumentation.span("llm.generate", model=self.model):
+            response = self.client.chat.completions.create(
+                model=self.model,
+                messages=self._build_messages(query, packed),
+                temperature=0.3,
+                max_tokens=1024,
+            )
 
         answer = response.choices[0].message.content
-        sources = self._extract_sources(context_chunks)
+        sources = self.extract_sources(packed["passages"])
 
-        return {"answer": answer, "sources": sources}
+        return {
+            "answer": answer,
+            "sources": sources,
+            "context_tokens": packed["tokens"],
+        }
 
-    def _build_context(self, chunks: List[Dict]) -> str:
-        """Build context from chunks."""
-        parts = []
-        for i, chunk in enumerate(chunks, 1):
-            parts.append(
-                f"[{i}] Source: {chunk['source']}, Page: {chunk['page']}\n"
-                f"{chunk['text']}\n"
+    def stream_answer(
+        self, query: str, context_chunks: List[Dict], packed: Optional[Dict] = None
+    ) -> Iterator[str]:
+        """Yield the answer text as tokens arrive from the API."""
+        packed = packed or self.pack_context(context_chunks)
+        with self._slots:
+            timer = _StreamTimer(self.model)
+            stream = self.client.chat.completions.create(
+                model=self.model,
+                messages=self._build_messages(query, packed),
+                temperature=0.3,
+                max_tokens=1024,
+                stream=True,
             )
-        return "\n".join(parts)
+            try:
+                for chunk in stream:
+                    if chunk.choices and chunk.choices[0].delta.content:
+                        timer.token()
+                        yield chunk.choices[0].delta.content
+            finally:
+                timer.finish()
+                stream.close()
+
+    async def astream_answer(
+        self, query: str, context_chunks: List[Dict], packed: Optional[Dict] = None
+    ) -> AsyncIterator[str]:
+        """Async variant of stream_answer() sharing one pooled async client."""
+        packed = packed or self.pack_context(context_chunks)
+        client, slots = self._get_async_client()
+        async with slots:
+            timer = _StreamTimer(self.model)
+            stream = await client.chat.completions.create(
+                model=self.model,
+                messages=self._build_messages(query, packed),
+                temperature=0.3,
+                max_tokens=1024,
+                stream=True,
+            )
+            try:
+                async for chunk in stream:
+                    if chunk.choices and chunk.choices[0].delta.content:
+                        timer.token()
+                        yield chunk.choices[0].delta.content
+            finally:
+                timer.finish()
+                await stream.close()
+
+    def _get_async_client(self):
+        """Return the async client and semaphore for the running event loop."""
+        loop = asyncio.get_running_loop()
+        if self._async_loop is not loop:
+            from groq import AsyncGroq
+
+            self._async_client = AsyncGroq(
+                api_key=self.api_key,
+                base_url=self.base_url,
+                http_client=httpx.AsyncClient(limits=self._limits),
+            )
+            self._async_slots = asyncio.Semaphore(self.max_concurrency)
+            self._async_loop = loop
+        return self._async_client, self._async_slots
+
+    async def aclose(self):
+        """Close the async HTTP client."""
+        if self._async_client is not None:
+            await self._async_client.close()
+            self._async_client = None
+            self._async_loop = None
+
+    def pack_context(self, chunks: List[Dict]) -> Dict:
+        """Merge, deduplicate and pack chunks into the prompt token budget."""
+        return self.packer.pack(chunks)
+
+    def _build_messages(self, query: str, packed: Dict) -> List[Dict]:
+        """Build the chat messages for a query."""
+        return [
+            {"role": "system", "content": SYSTEM_PROMPT},
+            {"role": "user", "content": self._create_prompt(query, packed["context"])},
+        ]
 
     def _create_prompt(self, query: str, context: str) -> str:
         """Create prompt."""
@@ -54,7 +174,7 @@ Question: {query}
 
 Answer based on the context above. Cite sources with document name and page number."""
 
-    def _extract_sources(self, chunks: List[Dict]) -> List[Dict]:
+    def extract_sources(self, chunks: List[Dict]) -> List[Dict]:
         """Extract unique sources."""
         sources = {}
         for chunk in chunks:
@@ -62,3 +182,27 @@ Answer based on the context above. Cite sources with document name and page numb
             if key not in sources:
                 sources[key] = {"document": chunk["source"], "page": chunk["page"]}
         return list(sources.values())
+
+
+class _StreamTimer:
+    """Time-to-first-token and total duration spans for one streamed answer.
+
+    Spans are opened and closed by hand because a streaming generator yields
+    between the two ends.
+    """
+
+    def __init__(self, model: str):
+        self.tokens = 0
+        self._stream = instrumentation.start_span("llm.stream", model=model)
+        self._first = instrumentation.start_span("llm.first_token", model=model)
+
+    def token(self):
+        if self.tokens == 0:
+            instrumentation.end_span(self._first)
+        self.tokens += 1
+
+    def finish(self):
+        if self.tokens == 0:
+            instrumentation.end_span(self._first)
+        self._stream.attributes["tokens"] = self.tokens
+        instrumentation.end_span(self._stream)
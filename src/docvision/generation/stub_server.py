@@ -0,0 +1,152 @@
+"""Local stand-in for the Groq/OpenAI chat completions API.
+
+Serves ``POST /openai/v1/chat/completions`` with canned answers, either as a
+single JSON body or as a server-sent event stream, so generation can be
+exercised and load-tested without network access or an API key::
+
+    server = StubLLMServer(token_delay=0.01).start()
+    client = LLMClient("unused", "stub-model", base_url=server.base_url)
+"""
+
+from typing import List, Optional
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import json
+import threading
+import time
+
+DEFAULT_ANSWER = "The termination notice period is ninety days [1]."
+
+
+class StubLLMServer:
+    """Threaded HTTP server speaking the chat completions wire protocol."""
+
+    def __init__(
+        self,
+        answer: str = DEFAULT_ANSWER,
+        token_delay: float = 0.0,
+        first_token_delay: float = 0.0,
+        host: str = "127.0.0.1",
+        port: int = 0,
+    ):
+        self.answer = answer
+        self.token_delay = token_delay
+        self.first_token_delay = first_token_delay
+        self.requests: List[dict] = []
+        self.active = 0
+        self.max_active = 0
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer((host, port), self._make_handler())
+        self._server.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> "StubLLMServer":
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def tokens(self) -> List[str]:
+        """Split the canned answer into word-level tokens."""
+        words = self.answer.split(" ")
+        return [word if i == 0 else f" {word}" for i, word in enumerate(words)]
+
+    def _make_handler(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"  # keep-alive, so clients can pool
+
+            def log_message(self, format, *args):
+                pass
+
+            def do_POST(self):
+                if self.path.rstrip("/") != "/openai/v1/chat/completions":
+                    self.send_error(404)
+                    return
+
+                length = int(self.headers.get("Content-Length", 0))
+                body = json.loads(self.rfile.read(length) or b"{}")
+                with stub._lock:
+                    stub.requests.append(body)
+                    stub.active += 1
+                    stub.max_active = max(stub.max_active, stub.active)
+                try:
+                    time.sleep(stub.first_token_delay)
+                    if body.get("stream"):
+                        self._stream(body)
+                    else:
+                        self._complete(body)
+                finally:
+                    with stub._lock:
+                        stub.active -= 1
+
+            def _complete(self, body):
+                payload = json.dumps(
+                    {
+                        "id": "chatcmpl-stub",
+                        "object": "chat.completion",
+                        "created": int(time.time()),
+                        "model": body.get("model", "stub"),
+                        "choices": [
+                            {
+                                "index": 0,
+                                "message": {
+                                    "role": "assistant",
+                                    "content": stub.answer,
+                                },
+                                "finish_reason": "stop",
+                            }
+                        ],
+                    }
+                ).encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def _stream(self, body):
+                self.send_response(200)
+                self.send_header("Content-Type", "text/event-stream")
+                self.send_header("Transfer-Encoding", "chunked")
+                self.end_headers()
+
+                tokens = stub.tokens()
+                for i, token in enumerate(tokens):
+                    if i:
+                        time.sleep(stub.token_delay)
+                    last = i == len(tokens) - 1
+                    self._send_event(
+                        {
+                            "id": "chatcmpl-stub",
+                            "object": "chat.completion.chunk",
+                            "created": int(time.time()),
+                            "model": body.get("model", "stub"),
+                            "choices": [
+                                {
+                                    "index": 0,
+                                    "delta": {"content": token},
+                                    "finish_reason": "stop" if last else None,
+                                }
+                            ],
+                        }
+                    )
+                self._send_chunk(b"data: [DONE]\n\n")
+                self._send_chunk(b"")
+
+            def _send_event(self, event):
+                self._send_chunk(f"data: {json.dumps(event)}\n\n".encode())
+
+            def _send_chunk(self, data: bytes):
+                self.wfile.write(b"%x\r\n%s\r\n" % (len(data), data))
+                self.wfile.flush()
+
+        return Handler
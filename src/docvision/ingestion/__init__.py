@@ -1,4 +1,17 @@
-from .pdf_loader import PDFLoader
-from .text_chunker import TextChunker
+from typing import TYPE_CHECKING
 
-__all__ = ["PDFLoader", "TextChunker"]
+from docvision._lazy import lazy_exports
+
+__getattr__, __dir__, __all__ = lazy_exports(
+    __name__,
+    {
+        "PageCache": ".page_cache",
+        "PDFLoader": ".pdf_loader",
+        "TextChunker": ".text_chunker",
+    },
+)
+
+if TYPE_CHECKING:
+    from .page_cache import PageCache
+    from .pdf_loader import PDFLoader
+    from .text_chunker import TextChunker
@@ -0,0 +1,124 @@
+"""On-disk cache of extracted PDF page text."""
+
+from typing import List, Dict, Optional
+from pathlib import Path
+import sqlite3
+import threading
+import time
+
+
+class PageCache:
+    """Cache page extraction results in SQLite keyed by (file key, page).
+
+    The file key combines the file's content hash with the extractor
+    version, so unchanged PDFs are never parsed twice and an extractor
+    upgrade re-extracts everything. Each page keeps its text and status:
+    ``ok``, ``empty`` (skipped by the pre-scan) or ``failed`` with the
+    extraction error. The cache is bounded to ``max_files`` files and evicts
+    the least recently used first.
+    """
+
+    def __init__(self, path: str, max_files: int = 10_000):
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self.path = path
+        self.max_files = max_files
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS files ("
+            " key TEXT PRIMARY KEY,"
+            " num_pages INTEGER NOT NULL,"
+            " last_used REAL NOT NULL)"
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS files_last_used ON files (last_used)"
+        )
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS pages ("
+            " key TEXT NOT NULL,"
+            " page INTEGER NOT NULL,"
+            " text TEXT NOT NULL,"
+            " status TEXT NOT NULL,"
+            " error TEXT,"
+            " PRIMARY KEY (key, page))"
+        )
+        self._conn.commit()
+        (self._size,) = self._conn.execute("SELECT COUNT(*) FROM files").fetchone()
+
+    def get(self, key: str) -> Optional[List[Dict]]:
+        """Page records of a fully extracted file, or None."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT num_pages FROM files WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            pages = self._conn.execute(
+                "SELECT page, text, status, error FROM pages"
+                " WHERE key = ? ORDER BY page",
+                (key,),
+            ).fetchall()
+            self._conn.execute(
+                "UPDATE files SET last_used = ? WHERE key = ?", (time.time(), key)
+            )
+            self._conn.commit()
+        if len(pages) != row[0]:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return [
+            {"page": page, "text": text, "status": status, "error": error}
+            for page, text, status, error in pages
+        ]
+
+    def put(self, key: str, records: List[Dict]):
+        """Store a file's page records, evicting old files if over capacity."""
+        with self._lock:
+            self._conn.execute("DELETE FROM pages WHERE key = ?", (key,))
+            self._conn.executemany(
+                "INSERT INTO pages (key, page, text, status, error)"
+                " VALUES (?, ?, ?, ?, ?)",
+                [(key, r["page"], r["text"], r["status"], r["error"]) for r in records],
+            )
+            self._conn.execute(
+                "INSERT OR REPLACE INTO files (key, num_pages, last_used)"
+                " VALUES (?, ?, ?)",
+                (key, len(records), time.time()),
+            )
+            (self._size,) = self._conn.execute("SELECT COUNT(*) FROM files").fetchone()
+            if self._size > self.max_files:
+                self._conn.execute(
+                    "CREATE TEMP TABLE IF NOT EXISTS evicted (key TEXT PRIMARY KEY)"
+                )
+                self._conn.execute("DELETE FROM evicted")
+                self._conn.execute(
+                    "INSERT INTO evicted"
+                    " SELECT key FROM files ORDER BY last_used LIMIT ?",
+                    (self._size - self.max_files,),
+                )
+                self._conn.execute(
+                    "DELETE FROM pages WHERE key IN (SELECT key FROM evicted)"
+                )
+                self._conn.execute(
+                    "DELETE FROM files WHERE key IN (SELECT key FROM evicted)"
+                )
+                self._size = self.max_files
+            self._conn.commit()
+
+    def stats(self) -> Dict[str, float]:
+        """Hit/miss counters (per file) and current size."""
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "files": self._size,
+        }
+
+    def close(self):
+        """Close the underlying database connection."""
+        self._conn.close()
@@ -1,37 +1,313 @@
 """PDF document loading."""
 
-from typing import List, Dict
+from typing import List, Dict, Callable, Iterable, Iterator, Optional, Union
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from collections import deque
 from pathlib import Path
+import hashlib
+import logging
+import multiprocessing
+import os
+import threading
+import pypdf
 from pypdf import PdfReader
 
+from docvision.observability import instrumentation
+from .page_cache import PageCache
+
+logger = logging.getLogger(__name__)
+
+# Part of every page cache key, so a pypdf upgrade re-extracts
+EXTRACTOR = f"pypdf-{pypdf.__version__}"
+
+
+def extract_page_records(file_path: str) -> List[Dict]:
+    """Extract every page of a PDF as ``{"page", "text", "status", "error"}``.
+
+    Pages the pre-scan finds no text on are ``empty`` without being parsed;
+    a page whose extraction raises is ``failed`` and the rest of the file
+    still loads. Module-level so it can run in a worker process.
+    """
+    records = []
+    with open(file_path, "rb") as file:
+        reader = PdfReader(file)
+        for page_num, page in enumerate(reader.pages, 1):
+            record = {"page": page_num, "text": "", "status": "ok", "error": None}
+            try:
+                if page_has_text(page):
+                    record["text"] = page.extract_text()
+                else:
+                    record["status"] = "empty"
+            except Exception as e:
+                record["status"] = "failed"
+                record["error"] = f"{type(e).__name__}: {e}"
+            records.append(record)
+    return records
+
+
+def extract_pages(file_path: str) -> List[str]:
+    """Extract the text of every page in a PDF."""
+    return [record["text"] for record in extract_page_records(file_path)]
+
+
+def write_if_changed(path: Union[str, Path], data: bytes) -> bool:
+    """Write ``data`` unless the file already holds exactly those bytes.
+
+    Keeps the modification time of re-uploaded, unchanged PDFs. Returns
+    whether the file was written.
+    """
+    path = Path(path)
+    if path.exists() and path.stat().st_size == len(data):
+        if path.read_bytes() == data:
+            return False
+    path.write_bytes(data)
+    return True
+
+
+def page_has_text(page) -> bool:
+    """Cheap check for text-showing operators, without parsing fonts.
+
+    Image-only (scanned) and blank pages have no ``BT`` text objects in
+    their content stream. Form XObjects may hold text of their own, so
+    pages using them are always extracted.
+    """
+    contents = page.get_contents()
+    if contents is not None and b"BT" in contents.get_data():
+        return True
+    resources = page.get("/Resources")
+    xobjects = resources.get_object().get("/XObject") if resources else None
+    if not xobjects:
+        return False
+    return any(
+        xobject.get_object().get("/Subtype") == "/Form"
+        for xobject in xobjects.get_object().values()
+    )
+
+
+def format_document(pages: List[str]) -> str:
+    """Join page texts with the page markers TextChunker understands."""
+    return "".join(
+        f"\n--- Page {page_num} ---\n{page_text}"
+        for page_num, page_text in enumerate(pages, 1)
+    )
+
 
 class PDFLoader:
-    """Handle PDF file loading and text extraction."""
+    """Handle PDF file loading and text extraction.
+
+    With a ``cache``, page text is stored by file content hash and page
+    number, so re-loading an unchanged file costs only hashing it. Pages
+    that fail to extract are recorded in ``failures`` (source -> page ->
+    error) and load as empty text.
+    """
+
+    def __init__(
+        self,
+        workers: int = 0,
+        max_pending: Optional[int] = None,
+        cache: Optional[PageCache] = None,
+    ):
+        # 0 means one worker process per CPU
+        self.workers = workers or os.cpu_count() or 1
+        # Files extracted ahead of the consumer; bounds memory (backpressure)
+        self.max_pending = max_pending or 2 * self.workers
+        self.cache = cache
+        self.failures: Dict[str, Dict[int, str]] = {}
+        # Worker processes, started on first use and reused across calls
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._executor_lock = threading.Lock()
+
+    def _pool(self) -> ProcessPoolExecutor:
+        """The shared worker pool, started without forking the caller.
+
+        Forking a process that runs model or server threads can deadlock the
+        child, so workers come from a forkserver (or spawn) context.
+        """
+        with self._executor_lock:
+            if self._executor is None:
+                methods = multiprocessing.get_all_start_methods()
+                method = "forkserver" if "forkserver" in methods else "spawn"
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    mp_context=multiprocessing.get_context(method),
+                )
+            return self._executor
+
+    def close(self):
+        """Shut down the worker processes."""
+        with self._executor_lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False)
+                self._executor = None
 
     def load_pdf(self, file_path: str) -> str:
         """Extract text from a PDF file."""
-        text = ""
+        return format_document(extract_pages(file_path))
+
+    @staticmethod
+    def hash_file(file_path: str) -> str:
+        """Return the SHA-256 hex digest of a file's bytes."""
+        digest = hashlib.sha256()
         with open(file_path, "rb") as file:
-            reader = PdfReader(file)
-            for page_num, page in enumerate(reader.pages, 1):
-                page_text = page.extract_text()
-                text += f"\n--- Page {page_num} ---\n{page_text}"
-        return text
+            for block in iter(lambda: file.read(1 << 20), b""):
+                digest.update(block)
+        return digest.hexdigest()
 
     def load_directory(self, directory: str) -> List[Dict[str, str]]:
         """Load all PDFs from a directory."""
-        documents = []
-        pdf_dir = Path(directory)
+        return self.load_files(Path(directory).glob("*.pdf"))
 
-        for pdf_file in pdf_dir.glob("*.pdf"):
-            try:
-                text = self.load_pdf(str(pdf_file))
-                documents.append({"content": text, "source": pdf_file.name})
-                print(f"✓ Loaded: {pdf_file.name}")
-            except Exception as e:
-                print(f"✗ Failed: {pdf_file.name} - {e}")
+    def load_files(self, paths: Iterable[Path]) -> List[Dict[str, str]]:
+        """Load the given PDF files."""
+        return list(self.iter_documents(paths))
+
+    def iter_documents(
+        self,
+        paths: Iterable[Union[str, Path]],
+        hashes: Optional[Dict[str, str]] = None,
+    ) -> Iterator[Dict]:
+        """Yield ``{"content", "source"}`` documents, in path order, as they load.
+
+        ``hashes`` maps file names to content hashes already computed by the
+        caller, so the cache does not hash those files again.
+        """
+        for source, records in self._iter_extracted(paths, hashes):
+            pages = [record["text"] for record in records]
+            yield {"content": format_document(pages), "source": source}
+
+    def iter_pages(
+        self,
+        paths: Iterable[Union[str, Path]],
+        hashes: Optional[Dict[str, str]] = None,
+    ) -> Iterator[Dict]:
+        """Yield ``{"source", "page", "text", "status"}`` records per PDF page."""
+        for source, records in self._iter_extracted(paths, hashes):
+            for record in records:
+                yield {
+                    "source": source,
+                    "page": record["page"],
+                    "text": record["text"],
+                    "status": record["status"],
+                }
+
+    def _iter_extracted(
+        self,
+        paths: Iterable[Union[str, Path]],
+        hashes: Optional[Dict[str, str]] = None,
+    ) -> Iterator:
+        """Extract files in a process pool, yielding (source, records) in order.
+
+        Cached files and single-file calls skip the pool. At most
+        ``max_pending`` files are in flight, so a slow consumer (chunking,
+        embedding) holds back extraction instead of letting extracted text
+        pile up in memory.
+        """
+        paths = list(map(Path, paths))
+        hashes = hashes or {}
+
+        if self.workers == 1 or len(paths) <= 1:
+            for pdf_file in paths:
+                key, cached = self._cached(pdf_file, hashes)
+                records = self._records_or_report(
+                    pdf_file,
+                    key,
+                    cached or (lambda: extract_page_records(str(pdf_file))),
+                )
+                if records is not None:
+                    yield pdf_file.name, records
+            return
+
+        executor = self._pool()
+        paths = iter(paths)
+        pending: deque = deque()  # (pdf_file, cache key, getter, future)
+
+        def submit_next() -> bool:
+            pdf_file = next(paths, None)
+            if pdf_file is None:
+                return False
+            key, cached = self._cached(pdf_file, hashes)
+            future = None
+            if cached is None:
+                future = executor.submit(extract_page_records, str(pdf_file))
+                cached = future.result
+            pending.append((pdf_file, key, cached, future))
+            return True
+
+        try:
+            while len(pending) < self.max_pending and submit_next():
+                pass
+
+            while pending:
+                pdf_file, key, get_records, _ = pending.popleft()
+                submit_next()
+                records = self._records_or_report(pdf_file, key, get_records)
+                if records is not None:
+                    yield pdf_file.name, records
+        except BrokenProcessPool:
+            # A worker died; the next call starts a fresh pool
+            with self._executor_lock:
+                if self._executor is executor:
+                    self._executor = None
+            executor.shutdown(wait=False)
+            raise
+        finally:
+            # The pool outlives this call; drop work nobody will consume
+            for _, _, _, future in pending:
+                if future is not None:
+                    future.cancel()
+
+    def _cached(self, pdf_file: Path, hashes: Dict[str, str]):
+        """Return (key to cache fresh records under, getter for cached records).
+
+        A cache hit has no key, since its records are already stored; a miss
+        has no getter.
+        """
+        if self.cache is None:
+            return None, None
+        content_hash = hashes.get(pdf_file.name) or self.hash_file(str(pdf_file))
+        key = f"{EXTRACTOR}:{content_hash}"
+        records = self.cache.get(key)
+        if records is None:
+            return key, None
+        instrumentation.count("ingest.files_cached")
+        return None, lambda: records
+
+    def _records_or_report(
+        self,
+        pdf_file: Path,
+        key: Optional[str],
+        get_records: Callable[[], List[Dict]],
+    ) -> Optional[List[Dict]]:
+        """Run or fetch an extraction, logging the file's and pages' outcome."""
+        try:
+            with instrumentation.span("ingest.parse", source=pdf_file.name):
+                records = get_records()
+        except Exception as e:
+            logger.warning(f"✗ Failed: {pdf_file.name} - {e}")
+            instrumentation.count("ingest.files_failed")
+            return None
+        if key is not None:
+            self.cache.put(key, records)
+
+        failed = {r["page"]: r["error"] for r in records if r["status"] == "failed"}
+        empty = sum(r["status"] == "empty" for r in records)
+        for page, error in failed.items():
+            logger.warning(f"⚠ {pdf_file.name} page {page} failed: {error}")
+        if failed:
+            self.failures[pdf_file.name] = failed
+        else:
+            self.failures.pop(pdf_file.name, None)
 
-        return documents
+        logger.info(
+            f"✓ Loaded: {pdf_file.name} ({len(records)} pages, {empty} without "
+            f"text, {len(failed)} failed)"
+        )
+        instrumentation.count("ingest.files")
+        instrumentation.count("ingest.pages", len(records))
+        instrumentation.count("ingest.pages_empty", empty)
+        instrumentation.count("ingest.pages_failed", len(failed))
+        return records
 
 
 # Uncomment for quick testing
@@ -1,57 +1,184 @@
 """Text chunking utilities."""
 
-from typing import List, Dict
+from typing import List, Dict, Iterable, Iterator, Optional, Tuple
+from bisect import bisect_left
+import logging
 import re
+import numpy as np
+
+from docvision.observability import instrumentation
+from docvision.retrieval.chunk_store import ChunkStore
+
+logger = logging.getLogger(__name__)
+
+# Written by format_document(); the marker itself is not chunk content
+PAGE_MARKER = re.compile(r"--- Page (\d+) ---\n")
+# Sentence ends (with closing quotes) followed by whitespace, or paragraph
+# breaks. Every branch starts with a literal so the regex engine can skip
+# ahead to candidate characters instead of trying each position.
+BOUNDARY = re.compile(r"\.[\"')\]]*\s+|![\"')\]]*\s+|\?[\"')\]]*\s+|\n[ \t]*\n\s*")
+# The greedy ".*" backtracks from the end of the window, so this matches up
+# to the last boundary without scanning the text before it
+LAST_BOUNDARY = re.compile(rf"(?s:.*)(?:{BOUNDARY.pattern})")
+NON_SPACE = re.compile(r"\S")
 
 
 class TextChunker:
-    """Split documents into chunks."""
+    """Split documents into chunks on sentence and paragraph boundaries.
+
+    Each chunk is the longest run of whole sentences that fits in
+    ``chunk_size`` characters and, when a tokenizer is given, ``max_tokens``
+    tokens, so no chunk is silently truncated by the embedding model. The
+    next chunk starts on the first sentence within the last ``chunk_overlap``
+    characters. A sentence too long for one chunk is cut at a word boundary.
+    Only the ends of each chunk are searched, so the cost grows with the
+    number of chunks rather than their size.
+
+    ``tokenizer`` is a Hugging Face tokenizer, e.g. the ``tokenizer``
+    attribute of a SentenceTransformer.
+    """
 
-    def __init__(self, chunk_size: int, chunk_overlap: int):
+    def __init__(
+        self,
+        chunk_size: int,
+        chunk_overlap: int,
+        tokenizer=None,
+        max_tokens: Optional[int] = None,
+    ):
+        if tokenizer is not None and not max_tokens:
+            raise ValueError("max_tokens is required when a tokenizer is given")
+        if chunk_overlap >= chunk_size:
+            raise ValueError("chunk_overlap must be smaller than chunk_size")
         self.chunk_size = chunk_size
         self.chunk_overlap = chunk_overlap
+        self.tokenizer = tokenizer
+        self.max_tokens = max_tokens
 
     def chunk_text(self, text: str, source: str) -> List[Dict]:
         """Split text into overlapping chunks."""
-        chunks = []
-        start = 0
+        return self._dicts(*self._chunk(text), source)
 
-        while start < len(text):
-            end = start + self.chunk_size
-            chunk_text = text[start:end]
+    def chunk_store(self, text: str, source: str) -> ChunkStore:
+        """Chunk one document straight into a columnar ChunkStore."""
+        return self._store(*self._chunk(text), source)
 
-            # Try to break at sentence boundary
-            if end < len(text):
-                last_period = chunk_text.rfind(".")
-                if last_period > self.chunk_size // 2:
-                    end = start + last_period + 1
-                    chunk_text = text[start:end]
+    def chunk_documents(self, documents: List[Dict]) -> List[Dict]:
+        """Chunk multiple documents."""
+        return list(self.iter_chunks(documents))
 
-            page_num = self._extract_page_number(chunk_text)
+    def chunk_documents_to_store(self, documents: Iterable[Dict]) -> ChunkStore:
+        """Chunk multiple documents into a single ChunkStore."""
+        stores = [
+            self._store(*self._chunk_document(doc), doc["source"]) for doc in documents
+        ]
+        return ChunkStore.concat(stores) if stores else ChunkStore.from_chunks([])
 
-            chunks.append(
-                {
-                    "text": chunk_text.strip(),
-                    "source": source,
-                    "page": page_num,
-                    "chunk_id": len(chunks),
-                }
-            )
+    def iter_chunks(self, documents: Iterable[Dict]) -> Iterator[Dict]:
+        """Lazily chunk a stream of documents, one document at a time."""
+        for doc in documents:
+            yield from self._dicts(*self._chunk_document(doc), doc["source"])
 
-            start = end - self.chunk_overlap
+    def _chunk_document(self, doc: Dict) -> Tuple[List[str], np.ndarray]:
+        with instrumentation.span("ingest.chunk", source=doc["source"]):
+            texts, pages = self._chunk(doc["content"])
+        logger.info(f"✓ Chunked {doc['source']}: {len(texts)} chunks")
+        instrumentation.count("ingest.chunks", len(texts))
+        return texts, pages
 
-        return chunks
+    @staticmethod
+    def _dicts(texts: List[str], pages: np.ndarray, source: str) -> List[Dict]:
+        return [
+            {"text": text, "source": source, "page": page, "chunk_id": i}
+            for i, (text, page) in enumerate(zip(texts, pages.tolist()))
+        ]
 
-    def _extract_page_number(self, text: str) -> int:
-        """Extract page number from text marker."""
-        match = re.search(r"--- Page (\d+) ---", text)
-        return int(match.group(1)) if match else 0
+    @staticmethod
+    def _store(texts: List[str], pages: np.ndarray, source: str) -> ChunkStore:
+        return ChunkStore.from_columns(
+            texts, [source] * len(texts), pages, np.arange(len(texts))
+        )
 
-    def chunk_documents(self, documents: List[Dict]) -> List[Dict]:
-        """Chunk multiple documents."""
-        all_chunks = []
-        for doc in documents:
-            chunks = self.chunk_text(doc["content"], doc["source"])
-            all_chunks.extend(chunks)
-            print(f"✓ Chunked {doc['source']}: {len(chunks)} chunks")
-        return all_chunks
+    def _chunk(self, text: str) -> Tuple[List[str], np.ndarray]:
+        """Chunk texts and the page each chunk starts on."""
+        text, page_starts, page_numbers = self._strip_page_markers(text)
+        token_starts = self._token_starts(text)
+        length = len(text)
+        # Hoisted out of the loop, which runs once per chunk
+        chunk_size, chunk_overlap = self.chunk_size, self.chunk_overlap
+        last_boundary, next_boundary = LAST_BOUNDARY.match, BOUNDARY.search
+
+        starts, ends = [], []
+        position, covered = self._skip_space(text, 0), 0
+        while position < length:
+            limit = position + chunk_size
+            if token_starts is not None:
+                limit = self._token_limit(position, limit, token_starts)
+            limit = min(limit, length)
+            if limit <= covered:
+                # The overlap leaves no room for new text; drop it
+                position = self._skip_space(text, covered)
+                continue
+            if limit == length:
+                end = length
+            else:
+                # Last sentence boundary in the second half of the window
+                middle = position + (limit - position) // 2
+                match = last_boundary(text, middle, limit)
+                end = match.end() if match else self._word_cut(text, position, limit)
+            starts.append(position)
+            ends.append(end)
+            covered = end
+
+            # First sentence start within the last chunk_overlap characters
+            match = next_boundary(text, max(end - chunk_overlap, position + 1), end)
+            position = match.end() if match else end
+            if position < length and text[position].isspace():
+                position = self._skip_space(text, position)
+
+        texts = [text[start:end].strip() for start, end in zip(starts, ends)]
+        rows = np.searchsorted(page_starts, np.asarray(starts), side="right") - 1
+        return texts, page_numbers[rows]
+
+    def _token_starts(self, text: str) -> Optional[List[int]]:
+        """Character offset of every token, or None without a tokenizer."""
+        if self.tokenizer is None:
+            return None
+        offsets = self.tokenizer(
+            text, add_special_tokens=False, return_offsets_mapping=True
+        )["offset_mapping"]
+        return [start for start, _ in offsets]
+
+    def _token_limit(self, position: int, limit: int, token_starts: List[int]) -> int:
+        """Lower ``limit`` so the chunk holds at most ``max_tokens`` tokens."""
+        budget_end = bisect_left(token_starts, position) + self.max_tokens
+        if budget_end < len(token_starts):
+            limit = min(limit, token_starts[budget_end])
+        return limit
+
+    @staticmethod
+    def _word_cut(text: str, start: int, limit: int) -> int:
+        """Cut a sentence too long for one chunk at its last word boundary."""
+        space = max(
+            text.rfind(" ", start + 1, limit), text.rfind("\n", start + 1, limit)
+        )
+        return space if space > start else limit
+
+    @staticmethod
+    def _skip_space(text: str, position: int) -> int:
+        match = NON_SPACE.search(text, position)
+        return match.start() if match else len(text)
+
+    @staticmethod
+    def _strip_page_markers(text: str) -> Tuple[str, np.ndarray, np.ndarray]:
+        """Remove page markers in one pass.
+
+        Returns the clean text, the offset where each page starts in it and
+        the page numbers. Text before the first marker is page 0.
+        """
+        parts = PAGE_MARKER.split(text)
+        pieces, numbers = parts[::2], parts[1::2]
+        page_starts = np.zeros(len(pieces), dtype=np.int64)
+        # Each marker becomes a paragraph break of two characters
+        np.cumsum([len(piece) + 2 for piece in pieces[:-1]], out=page_starts[1:])
+        page_numbers = np.asarray([0] + numbers, dtype=np.int32)
+        return "\n\n".join(pieces), page_starts, page_numbers
@@ -0,0 +1,282 @@
+"""Latency instrumentation: stage timers, counters and pluggable exporters.
+
+Components wrap their stages in ``instrumentation.span("stage.name")``.
+Finished spans are fanned out to the registered exporters (an in-process
+histogram is always installed) and, inside ``instrumentation.trace_request()``,
+collected into a per-request timing breakdown.
+"""
+
+from typing import List, Dict, Iterator, Optional
+from abc import ABC, abstractmethod
+from collections import defaultdict, deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+import logging
+import os
+import threading
+import time
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+class Span:
+    """One timed stage, shaped after an OpenTelemetry span."""
+
+    __slots__ = (
+        "name",
+        "trace_id",
+        "span_id",
+        "parent_id",
+        "start_ns",
+        "end_ns",
+        "attributes",
+    )
+
+    def __init__(self, name: str, trace_id: str, parent_id: Optional[str], **attrs):
+        self.name = name
+        self.trace_id = trace_id
+        self.span_id = os.urandom(8).hex()
+        self.parent_id = parent_id
+        self.start_ns = time.time_ns()
+        self.end_ns: Optional[int] = None
+        self.attributes = attrs
+
+    @property
+    def duration_ms(self) -> float:
+        return ((self.end_ns or time.time_ns()) - self.start_ns) / 1e6
+
+    def to_otlp(self) -> Dict:
+        """Render the span as an OTLP/JSON span object."""
+        return {
+            "traceId": self.trace_id,
+            "spanId": self.span_id,
+            "parentSpanId": self.parent_id or "",
+            "name": self.name,
+            "startTimeUnixNano": str(self.start_ns),
+            "endTimeUnixNano": str(self.end_ns),
+            "attributes": [
+                {"key": key, "value": {"stringValue": str(value)}}
+                for key, value in self.attributes.items()
+            ],
+        }
+
+
+class Exporter(ABC):
+    """Receives every finished span."""
+
+    @abstractmethod
+    def export(self, span: Span):
+        """Handle one finished span."""
+
+
+class HistogramExporter(Exporter):
+    """Aggregate span durations per stage in process.
+
+    Keeps Prometheus-style cumulative buckets plus a window of recent samples
+    for percentiles.
+    """
+
+    BUCKETS_MS = (1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+
+    def __init__(self, window: int = 2048):
+        self.window = window
+        self._lock = threading.Lock()
+        self._count: Dict[str, int] = defaultdict(int)
+        self._sum: Dict[str, float] = defaultdict(float)
+        self._buckets: Dict[str, List[int]] = {}
+        self._samples: Dict[str, deque] = {}
+
+    def export(self, span: Span):
+        duration = span.duration_ms
+        with self._lock:
+            if span.name not in self._buckets:
+                self._buckets[span.name] = [0] * (len(self.BUCKETS_MS) + 1)
+                self._samples[span.name] = deque(maxlen=self.window)
+            self._count[span.name] += 1
+            self._sum[span.name] += duration
+            self._samples[span.name].append(duration)
+            position = np.searchsorted(self.BUCKETS_MS, duration)
+            self._buckets[span.name][position] += 1
+
+    def summary(self) -> Dict[str, Dict[str, float]]:
+        """Count, mean and p50/p95/p99 latency (ms) per stage."""
+        with self._lock:
+            result = {}
+            for name, samples in self._samples.items():
+                p50, p95, p99 = np.percentile(list(samples), [50, 95, 99])
+                result[name] = {
+                    "count": self._count[name],
+                    "mean_ms": self._sum[name] / self._count[name],
+                    "p50_ms": float(p50),
+                    "p95_ms": float(p95),
+                    "p99_ms": float(p99),
+                }
+            return result
+
+    def reset(self):
+        with self._lock:
+            self._count.clear()
+            self._sum.clear()
+            self._buckets.clear()
+            self._samples.clear()
+
+    def render_prometheus(self, counters: Optional[Dict[str, float]] = None) -> str:
+        """Render stage histograms (in seconds) and counters as Prometheus text."""
+        lines = [
+            "# HELP docvision_stage_duration_seconds Pipeline stage latency.",
+            "# TYPE docvision_stage_duration_seconds histogram",
+        ]
+        with self._lock:
+            for name in sorted(self._buckets):
+                cumulative = 0
+                for bound, count in zip(self.BUCKETS_MS + (None,), self._buckets[name]):
+                    cumulative += count
+                    le = "+Inf" if bound is None else f"{bound / 1000:g}"
+                    lines.append(
+                        f'docvision_stage_duration_seconds_bucket{{stage="{name}",'
+                        f'le="{le}"}} {cumulative}'
+                    )
+                lines.append(
+                    f'docvision_stage_duration_seconds_sum{{stage="{name}"}} '
+                    f"{self._sum[name] / 1000:.6f}"
+                )
+                lines.append(
+                    f'docvision_stage_duration_seconds_count{{stage="{name}"}} '
+                    f"{self._count[name]}"
+                )
+
+        if counters:
+            lines.append("# HELP docvision_events_total Pipeline event counters.")
+            lines.append("# TYPE docvision_events_total counter")
+            for name in sorted(counters):
+                lines.append(
+                    f'docvision_events_total{{event="{name}"}} {counters[name]:g}'
+                )
+        return "\n".join(lines) + "\n"
+
+
+class OpenTelemetryExporter(Exporter):
+    """Forward spans to an OpenTelemetry tracer.
+
+    Requires the optional ``opentelemetry-api`` package unless a tracer is
+    passed in.
+    """
+
+    def __init__(self, tracer=None):
+        if tracer is None:
+            try:
+                from opentelemetry import trace
+            except ImportError as e:
+                raise ImportError(
+                    "OpenTelemetryExporter requires opentelemetry-api: "
+                    "pip install opentelemetry-api opentelemetry-sdk"
+                ) from e
+            tracer = trace.get_tracer("docvision")
+        self.tracer = tracer
+
+    def export(self, span: Span):
+        attributes = dict(span.attributes)
+        attributes["docvision.trace_id"] = span.trace_id
+        otel_span = self.tracer.start_span(
+            span.name, start_time=span.start_ns, attributes=attributes
+        )
+        otel_span.end(end_time=span.end_ns)
+
+
+class RequestTrace:
+    """Spans recorded while handling one request."""
+
+    def __init__(self):
+        self.trace_id = os.urandom(16).hex()
+        self.spans: List[Span] = []
+        self._lock = threading.Lock()
+
+    def add(self, span: Span):
+        with self._lock:
+            self.spans.append(span)
+
+    def breakdown(self) -> Dict[str, float]:
+        """Total milliseconds per stage, in first-seen order."""
+        totals: Dict[str, float] = {}
+        with self._lock:
+            for span in self.spans:
+                totals[span.name] = totals.get(span.name, 0.0) + span.duration_ms
+        return {name: round(ms, 3) for name, ms in totals.items()}
+
+
+_current_trace: ContextVar[Optional[RequestTrace]] = ContextVar(
+    "docvision_trace", default=None
+)
+_current_span: ContextVar[Optional[Span]] = ContextVar("docvision_span", default=None)
+
+
+class Instrumentation:
+    """Registry of exporters and counters shared by all components."""
+
+    def __init__(self):
+        self.histogram = HistogramExporter()
+        self.exporters: List[Exporter] = [self.histogram]
+        self.counters: Dict[str, float] = defaultdict(float)
+        self._lock = threading.Lock()
+
+    def add_exporter(self, exporter: Exporter):
+        self.exporters.append(exporter)
+
+    def remove_exporter(self, exporter: Exporter):
+        self.exporters.remove(exporter)
+
+    @contextmanager
+    def span(self, name: str, **attributes) -> Iterator[Span]:
+        """Time a stage and report it to the exporters and current request."""
+        span = self.start_span(name, **attributes)
+        token = _current_span.set(span)
+        try:
+            yield span
+        finally:
+            _current_span.reset(token)
+            self.end_span(span)
+
+    def start_span(self, name: str, **attributes) -> Span:
+        """Open a span by hand, for stages that cross generator yields."""
+        request = _current_trace.get()
+        parent = _current_span.get()
+        trace_id = request.trace_id if request else os.urandom(16).hex()
+        return Span(name, trace_id, parent.span_id if parent else None, **attributes)
+
+    def end_span(self, span: Span):
+        """Close a span and report it to the exporters and current request."""
+        span.end_ns = time.time_ns()
+        request = _current_trace.get()
+        if request is not None:
+            request.add(span)
+        for exporter in self.exporters:
+            try:
+                exporter.export(span)
+            except Exception:
+                logger.exception("Span exporter %r failed", exporter)
+
+    def count(self, name: str, value: float = 1):
+        """Increment a counter."""
+        with self._lock:
+            self.counters[name] += value
+
+    @contextmanager
+    def trace_request(self) -> Iterator[RequestTrace]:
+        """Collect the spans of one request for a per-request breakdown."""
+        request = RequestTrace()
+        token = _current_trace.set(request)
+        try:
+            yield request
+        finally:
+            _current_trace.reset(token)
+
+    def prometheus(self) -> str:
+        """Current histograms and counters in Prometheus text format."""
+        with self._lock:
+            counters = dict(self.counters)
+        return self.histogram.render_prometheus(counters)
+
+
+# Singleton instance
+instrumentation = Instrumentation()
@@ -1,5 +1,30 @@
-from .vector_store import VectorStore
-from .keyword_store import KeywordStore
-from .hybrid_search import HybridSearch
+from typing import TYPE_CHECKING
 
-__all__ = ["VectorStore", "KeywordStore", "HybridSearch"]
+from docvision._lazy import lazy_exports
+
+__getattr__, __dir__, __all__ = lazy_exports(
+    __name__,
+    {
+        "VectorStore": ".vector_store",
+        "KeywordStore": ".keyword_store",
+        "BM25Store": ".bm25_store",
+        "HybridSearch": ".hybrid_search",
+        "Reranker": ".reranker",
+        "ChunkStore": ".chunk_store",
+        "SearchFilter": ".filters",
+        "EmbeddingCache": ".embedding_cache",
+        "ONNXEmbedder": ".embedding_backends",
+        "load_embedding_model": ".embedding_backends",
+    },
+)
+
+if TYPE_CHECKING:
+    from .vector_store import VectorStore
+    from .keyword_store import KeywordStore
+    from .bm25_store import BM25Store
+    from .hybrid_search import HybridSearch
+    from .reranker import Reranker
+    from .chunk_store import ChunkStore
+    from .filters import SearchFilter
+    from .embedding_cache import EmbeddingCache
+    from .embedding_backends import ONNXEmbedder, load_embedding_model
@@ -0,0 +1,444 @@
+"""Embedded BM25 keyword search."""
+
+from typing import List, Dict, Iterable, Optional, Sequence, Tuple
+from collections import Counter
+from pathlib import Path
+import json
+import logging
+import copy
+import re
+import threading
+import numpy as np
+from .chunk_store import ChunkStore
+from .filters import SearchFilter
+from docvision._files import save_array, write_text
+from docvision.observability import instrumentation
+
+logger = logging.getLogger(__name__)
+
+BM25_FORMAT_VERSION = 1
+
+# Same tokens as Elasticsearch's standard analyzer for plain text
+TOKEN_PATTERN = re.compile(r"\w+")
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercased word tokens."""
+    return TOKEN_PATTERN.findall(text.lower())
+
+
+class _Segment:
+    """Immutable postings for a block of documents in CSR layout.
+
+    Postings of term ``t`` are ``rows[offsets[t]:offsets[t + 1]]`` with
+    matching term frequencies in ``tfs``. Terms added to the vocabulary after
+    the segment was built fall beyond ``offsets`` and have no postings here.
+    """
+
+    __slots__ = ("offsets", "rows", "tfs")
+
+    def __init__(self, offsets: np.ndarray, rows: np.ndarray, tfs: np.ndarray):
+        self.offsets = offsets
+        self.rows = rows
+        self.tfs = tfs
+
+    @classmethod
+    def from_postings(
+        cls, terms: np.ndarray, rows: np.ndarray, tfs: np.ndarray, num_terms: int
+    ) -> "_Segment":
+        order = np.lexsort((rows, terms))
+        offsets = np.zeros(num_terms + 1, dtype=np.int64)
+        np.cumsum(np.bincount(terms, minlength=num_terms), out=offsets[1:])
+        return cls(offsets, rows[order], tfs[order])
+
+    def __len__(self) -> int:
+        return len(self.rows)
+
+    def postings(self, term: int) -> Tuple[np.ndarray, np.ndarray]:
+        if term + 1 >= len(self.offsets):
+            return self.rows[:0], self.tfs[:0]
+        start, end = self.offsets[term], self.offsets[term + 1]
+        return self.rows[start:end], self.tfs[start:end]
+
+    def terms(self) -> np.ndarray:
+        """Term ID of every posting."""
+        return np.repeat(
+            np.arange(len(self.offsets) - 1, dtype=np.int32), np.diff(self.offsets)
+        )
+
+
+class BM25Store:
+    """In-process inverted index with the same interface as KeywordStore.
+
+    Each ``index_chunks`` call writes a new postings segment; segments of
+    similar size are merged as they accumulate, so indexing stays
+    incremental; per-document columns of new chunks are buffered and only
+    concatenated when the index is next read. Deletes are tombstones that
+    scoring skips and are dropped when everything is merged, which happens on
+    save and once a quarter of the documents are dead. Scoring uses Lucene's
+    BM25 (``k1``, ``b``) over the live documents, vectorized per query term.
+    """
+
+    def __init__(self, k1: float = 1.2, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self._lock = threading.Lock()
+        self.create_index()
+        logger.info("✓ BM25 keyword index initialized")
+
+    def create_index(self):
+        """Drop all documents."""
+        self.vocabulary: Dict[str, int] = {}
+        self.segments: List[_Segment] = []
+        self.chunks = ChunkStore.from_chunks([])
+        self.ids = np.empty(0, dtype=np.int64)
+        self.doc_lengths = np.empty(0, dtype=np.int32)
+        self.live = np.empty(0, dtype=bool)
+        self._pending: List[Tuple[ChunkStore, np.ndarray, np.ndarray]] = []
+        self._num_rows = 0
+        self._live_count = 0
+        self._live_length = 0
+
+    def clone(self) -> "BM25Store":
+        """A copy to write to while this store keeps serving searches.
+
+        Segments and columns are shared, since writes replace them; only the
+        vocabulary, which indexing extends in place, is copied.
+        """
+        with self._lock:
+            clone = copy.copy(self)
+            clone.vocabulary = dict(self.vocabulary)
+        clone._lock = threading.Lock()
+        return clone
+
+    def ensure_index(self):
+        """Nothing to create; present for KeywordStore compatibility."""
+
+    def delete_index(self):
+        """Drop all documents; the saved copy belongs to the caller."""
+        with self._lock:
+            self.create_index()
+
+    def __len__(self) -> int:
+        return self._live_count
+
+    def memory_bytes(self) -> int:
+        """Approximate bytes held by postings and per-document columns."""
+        segments, live, doc_lengths, chunks, ids, _, _ = self._snapshot()
+        size = sum(s.offsets.nbytes + s.rows.nbytes + s.tfs.nbytes for s in segments)
+        size += ids.nbytes + live.nbytes + doc_lengths.nbytes
+        return int(size + chunks.nbytes)
+
+    def index_chunks(self, chunks: List[Dict], ids: Optional[Sequence[int]] = None):
+        """Index chunks under the given IDs (positional if omitted)."""
+        if ids is None:
+            ids = range(len(chunks))
+        ids = np.asarray(list(ids), dtype=np.int64)
+        if not chunks:
+            return
+
+        with instrumentation.span("ingest.keyword_index", chunks=len(chunks)):
+            with self._lock:
+                self._add(chunks, ids)
+        logger.info(f"✓ Indexed {len(chunks)} documents in BM25 index")
+
+    def _add(self, chunks: List[Dict], ids: np.ndarray):
+        first_row = self._num_rows
+        terms, rows, tfs = [], [], []
+        lengths = np.empty(len(chunks), dtype=np.int32)
+        for i, chunk in enumerate(chunks):
+            tokens = tokenize(chunk["text"])
+            lengths[i] = len(tokens)
+            for token, count in Counter(tokens).items():
+                terms.append(self.vocabulary.setdefault(token, len(self.vocabulary)))
+                rows.append(first_row + i)
+                tfs.append(count)
+
+        segments = self.segments + [
+            _Segment.from_postings(
+                np.asarray(terms, dtype=np.int32),
+                np.asarray(rows, dtype=np.int32),
+                np.asarray(tfs, dtype=np.int32),
+                len(self.vocabulary),
+            )
+        ]
+        # Merge neighbours of similar size, keeping O(log n) segments
+        while len(segments) > 1 and len(segments[-2]) <= 2 * len(segments[-1]):
+            segments = segments[:-2] + [self._merge(segments[-2:])]
+
+        # Readers take a snapshot of these attributes, so replace, never mutate
+        self.segments = segments
+        self._pending = self._pending + [(ChunkStore.from_chunks(chunks), ids, lengths)]
+        self._num_rows += len(chunks)
+        self._live_count += len(chunks)
+        self._live_length += int(lengths.sum())
+
+    def _flush(self):
+        """Fold buffered per-document columns into the main arrays."""
+        if not self._pending:
+            return
+        stores, ids, lengths = zip(*self._pending)
+        self.chunks = ChunkStore.concat([self.chunks, *stores])
+        self.ids = np.concatenate([self.ids, *ids])
+        self.doc_lengths = np.concatenate([self.doc_lengths, *lengths])
+        added = sum(len(store) for store in stores)
+        self.live = np.concatenate([self.live, np.ones(added, dtype=bool)])
+        self._pending = []
+
+    def _snapshot(self) -> Tuple:
+        with self._lock:
+            self._flush()
+            return (
+                self.segments,
+                self.live,
+                self.doc_lengths,
+                self.chunks,
+                self.ids,
+                self._live_count,
+                self._live_length,
+            )
+
+    def delete_chunks(self, ids: Sequence[int]):
+        """Delete chunks by ID."""
+        ids = np.asarray(list(ids), dtype=np.int64)
+        if len(ids) == 0:
+            return
+
+        with self._lock:
+            self._flush()
+            rows = np.flatnonzero(np.isin(self.ids, ids) & self.live)
+            live = self.live.copy()
+            live[rows] = False
+            self.live = live
+            self._live_count -= len(rows)
+            self._live_length -= int(self.doc_lengths[rows].sum())
+            if len(self.live) - self._live_count > len(self.live) // 4:
+                self._compact()
+        logger.info(f"✓ Deleted {len(rows)} documents from BM25 index")
+
+    def _merge(self, segments: List[_Segment]) -> _Segment:
+        empty = [np.empty(0, dtype=np.int32)]
+        return _Segment.from_postings(
+            np.concatenate(empty + [s.terms() for s in segments]),
+            np.concatenate(empty + [s.rows for s in segments]),
+            np.concatenate(empty + [s.tfs for s in segments]),
+            len(self.vocabulary),
+        )
+
+    def _compact(self):
+        """Merge all segments into one and drop deleted documents."""
+        keep = np.flatnonzero(self.live)
+        new_rows = np.full(len(self.live), -1, dtype=np.int32)
+        new_rows[keep] = np.arange(len(keep), dtype=np.int32)
+
+        merged = self._merge(self.segments)
+        rows = new_rows[np.asarray(merged.rows)]
+        alive = rows >= 0
+        self.segments = [
+            _Segment.from_postings(
+                merged.terms()[alive],
+                rows[alive],
+                merged.tfs[alive],
+                len(self.vocabulary),
+            )
+        ]
+        self.chunks = self.chunks.take(keep)
+        self.ids = np.asarray(self.ids)[keep]
+        self.doc_lengths = np.asarray(self.doc_lengths)[keep]
+        self.live = np.ones(len(keep), dtype=bool)
+        self._num_rows = len(keep)
+
+    def search(
+        self, query: str, top_k: int = 5, search_filter: Optional[SearchFilter] = None
+    ) -> List[Dict]:
+        """Keyword search."""
+        with instrumentation.span("retrieve.keyword", queries=1):
+            return self._search(query, top_k, self._snapshot(), search_filter)
+
+    def search_many(
+        self,
+        queries: List[str],
+        top_k: int = 5,
+        search_filter: Optional[SearchFilter] = None,
+    ) -> List[List[Dict]]:
+        """Keyword search for many queries."""
+        with instrumentation.span("retrieve.keyword", queries=len(queries)):
+            snapshot = self._snapshot()
+            return [
+                self._search(query, top_k, snapshot, search_filter) for query in queries
+            ]
+
+    def search_ids_many(
+        self,
+        queries: List[str],
+        top_k: int = 5,
+        search_filter: Optional[SearchFilter] = None,
+    ) -> List[Tuple[np.ndarray, np.ndarray]]:
+        """Like search_many, but return (ids, scores) arrays per query."""
+        with instrumentation.span("retrieve.keyword", queries=len(queries)):
+            snapshot = self._snapshot()
+            ids = snapshot[4]
+            results = []
+            for query in queries:
+                rows, scores = self._top_rows(query, top_k, snapshot, search_filter)
+                results.append((np.asarray(ids)[rows], scores))
+            return results
+
+    def _search(
+        self,
+        query: str,
+        top_k: int,
+        snapshot: Tuple,
+        search_filter: Optional[SearchFilter] = None,
+    ) -> List[Dict]:
+        chunks = snapshot[3]
+        rows, scores = self._top_rows(query, top_k, snapshot, search_filter)
+        results = []
+        for row, score in zip(rows, scores):
+            chunk = chunks[int(row)]
+            chunk["score"] = float(score)
+            results.append(chunk)
+        return results
+
+    def _top_rows(
+        self,
+        query: str,
+        top_k: int,
+        snapshot: Tuple,
+        search_filter: Optional[SearchFilter] = None,
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """Rows and scores of the best ``top_k`` matches, best first."""
+        segments, live, doc_lengths, chunks, _, num_docs, total_length = snapshot
+        rows, scores = self._score(
+            query, segments, live, doc_lengths, num_docs, total_length
+        )
+        if search_filter is not None:
+            # Filter the matching rows before picking the top k
+            mask = search_filter.row_mask(chunks, rows)
+            rows, scores = rows[mask], scores[mask]
+
+        if len(rows) > top_k:
+            best = np.argpartition(-scores, top_k - 1)[:top_k]
+            rows, scores = rows[best], scores[best]
+        # Highest score first, ties in indexing order
+        order = np.lexsort((rows, -scores))
+        return rows[order], scores[order]
+
+    def score(self, query: str) -> Tuple[np.ndarray, np.ndarray]:
+        """BM25 scores of every live document matching the query.
+
+        Returns (rows, scores) with one entry per matching document.
+        """
+        segments, live, doc_lengths, _, _, num_docs, total_length = self._snapshot()
+        return self._score(query, segments, live, doc_lengths, num_docs, total_length)
+
+    def _score(
+        self,
+        query: str,
+        segments: List[_Segment],
+        live: np.ndarray,
+        doc_lengths: np.ndarray,
+        num_docs: int,
+        total_length: int,
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        if num_docs == 0:
+            return np.empty(0, dtype=np.int32), np.empty(0)
+        avg_length = total_length / num_docs
+
+        matched_rows, contributions = [], []
+        for token, query_tf in Counter(tokenize(query)).items():
+            term = self.vocabulary.get(token)
+            if term is None:
+                continue
+            rows, tfs = self._postings(segments, term)
+            mask = live[rows]
+            rows, tfs = rows[mask], tfs[mask].astype(np.float64)
+            if len(rows) == 0:
+                continue
+
+            df = len(rows)
+            idf = np.log(1 + (num_docs - df + 0.5) / (df + 0.5))
+            norm = self.k1 * (1 - self.b + self.b * doc_lengths[rows] / avg_length)
+            matched_rows.append(rows)
+            contributions.append(query_tf * idf * tfs * (self.k1 + 1) / (tfs + norm))
+
+        if not matched_rows:
+            return np.empty(0, dtype=np.int32), np.empty(0)
+        rows, inverse = np.unique(np.concatenate(matched_rows), return_inverse=True)
+        return rows, np.bincount(inverse, weights=np.concatenate(contributions))
+
+    @staticmethod
+    def _postings(
+        segments: Iterable[_Segment], term: int
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        parts = [segment.postings(term) for segment in segments]
+        return (
+            np.concatenate([rows for rows, _ in parts]),
+            np.concatenate([tfs for _, tfs in parts]),
+        )
+
+    def save(self, directory: str):
+        """Persist the index to a directory, merged into a single segment."""
+        with self._lock:
+            self._flush()
+            self._compact()
+            (segment,) = self.segments
+            path = Path(directory)
+            path.mkdir(parents=True, exist_ok=True)
+
+            save_array(path / "offsets.npy", segment.offsets)
+            save_array(path / "rows.npy", segment.rows)
+            save_array(path / "tfs.npy", segment.tfs)
+            save_array(path / "ids.npy", self.ids)
+            save_array(path / "doc_lengths.npy", self.doc_lengths)
+            self.chunks.save(str(path / "chunks"))
+            write_text(path / "vocabulary.json", json.dumps(list(self.vocabulary)))
+
+            manifest = {
+                "format_version": BM25_FORMAT_VERSION,
+                "num_chunks": len(self.ids),
+                "k1": self.k1,
+                "b": self.b,
+            }
+            write_text(path / "manifest.json", json.dumps(manifest, indent=2))
+        logger.info(f"✓ Saved BM25 index to {path}")
+
+    def load(self, directory: str, mmap: bool = True):
+        """Load an index written by save().
+
+        With ``mmap`` the postings and chunk columns are memory-mapped
+        read-only; documents added later go into in-memory segments.
+        """
+        path = Path(directory)
+        manifest_path = path / "manifest.json"
+        if not manifest_path.exists():
+            raise ValueError(f"No saved BM25 index found in {path}")
+
+        manifest = json.loads(manifest_path.read_text())
+        if manifest["format_version"] != BM25_FORMAT_VERSION:
+            raise ValueError(
+                f"Unsupported BM25 index format {manifest['format_version']} "
+                f"(expected {BM25_FORMAT_VERSION})"
+            )
+
+        mode = "r" if mmap else None
+        with self._lock:
+            terms = json.loads((path / "vocabulary.json").read_text())
+            self.vocabulary = {term: i for i, term in enumerate(terms)}
+            self.segments = [
+                _Segment(
+                    np.load(path / "offsets.npy", mmap_mode=mode),
+                    np.load(path / "rows.npy", mmap_mode=mode),
+                    np.load(path / "tfs.npy", mmap_mode=mode),
+                )
+            ]
+            self.ids = np.load(path / "ids.npy", mmap_mode=mode)
+            self.doc_lengths = np.load(path / "doc_lengths.npy", mmap_mode=mode)
+            self.chunks = ChunkStore.load(str(path / "chunks"), mmap=mmap)
+            self.live = np.ones(len(self.ids), dtype=bool)
+            self._pending = []
+            self._num_rows = len(self.ids)
+            self.k1, self.b = manifest["k1"], manifest["b"]
+            self._live_count = len(self.ids)
+            self._live_length = int(np.sum(self.doc_lengths))
+        logger.info(f"✓ Loaded {len(self.ids)} documents into BM25 index from {path}")
@@ -0,0 +1,188 @@
+"""Columnar storage for chunk metadata."""
+
+from typing import List, Dict, Iterator, Sequence
+from pathlib import Path
+import json
+import numpy as np
+from docvision._files import save_array, write_text
+
+
+class ChunkStore:
+    """Compact, column-oriented container for chunks.
+
+    Texts live in a single UTF-8 byte blob addressed by an offsets array and
+    sources are dictionary-encoded, so the store can be memory-mapped from
+    disk and shared between processes. Indexing returns a fresh chunk dict,
+    which lets the store stand in for a list of chunk dicts.
+    """
+
+    def __init__(
+        self,
+        text_blob: np.ndarray,
+        offsets: np.ndarray,
+        source_names: List[str],
+        source_codes: np.ndarray,
+        pages: np.ndarray,
+        chunk_ids: np.ndarray,
+    ):
+        self.text_blob = text_blob
+        self.offsets = offsets
+        self.source_names = source_names
+        self.source_codes = source_codes
+        self.pages = pages
+        self.chunk_ids = chunk_ids
+
+    @classmethod
+    def from_chunks(cls, chunks: List[Dict]) -> "ChunkStore":
+        """Build a store from a list of chunk dicts."""
+        return cls.from_columns(
+            [chunk["text"] for chunk in chunks],
+            [chunk["source"] for chunk in chunks],
+            [chunk["page"] for chunk in chunks],
+            [chunk["chunk_id"] for chunk in chunks],
+        )
+
+    @classmethod
+    def from_columns(
+        cls,
+        texts: Sequence[str],
+        sources: Sequence[str],
+        pages: Sequence[int],
+        chunk_ids: Sequence[int],
+    ) -> "ChunkStore":
+        """Build a store from parallel columns, without per-chunk dicts."""
+        encoded = [text.encode("utf-8") for text in texts]
+        offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+        if encoded:
+            np.cumsum([len(b) for b in encoded], out=offsets[1:])
+        text_blob = np.frombuffer(b"".join(encoded), dtype=np.uint8)
+
+        source_lookup: Dict[str, int] = {}
+        source_codes = np.empty(len(encoded), dtype=np.int32)
+        for i, source in enumerate(sources):
+            source_codes[i] = source_lookup.setdefault(source, len(source_lookup))
+
+        return cls(
+            text_blob=text_blob,
+            offsets=offsets,
+            source_names=list(source_lookup),
+            source_codes=source_codes,
+            pages=np.asarray(pages, dtype=np.int32).reshape(-1),
+            chunk_ids=np.asarray(chunk_ids, dtype=np.int32).reshape(-1),
+        )
+
+    @classmethod
+    def concat(cls, stores: List["ChunkStore"]) -> "ChunkStore":
+        """Concatenate several stores into a new in-memory store."""
+        source_lookup: Dict[str, int] = {}
+        blobs, lengths, codes = [], [], []
+        for store in stores:
+            remap = np.array(
+                [
+                    source_lookup.setdefault(name, len(source_lookup))
+                    for name in store.source_names
+                ],
+                dtype=np.int32,
+            )
+            blobs.append(np.asarray(store.text_blob))
+            lengths.append(np.diff(np.asarray(store.offsets)))
+            codes.append(
+                remap[store.source_codes] if len(remap) else store.source_codes
+            )
+
+        offsets = np.zeros(sum(len(c) for c in codes) + 1, dtype=np.int64)
+        if len(offsets) > 1:
+            np.cumsum(np.concatenate(lengths), out=offsets[1:])
+
+        return cls(
+            text_blob=np.concatenate(blobs).astype(np.uint8, copy=False),
+            offsets=offsets,
+            source_names=list(source_lookup),
+            source_codes=np.concatenate(codes).astype(np.int32, copy=False),
+            pages=np.concatenate([s.pages for s in stores]).astype(np.int32),
+            chunk_ids=np.concatenate([s.chunk_ids for s in stores]).astype(np.int32),
+        )
+
+    def take(self, rows: np.ndarray) -> "ChunkStore":
+        """Return a new in-memory store holding only the given rows."""
+        rows = np.asarray(rows, dtype=np.int64)
+        offsets = np.asarray(self.offsets)
+        starts, ends = offsets[rows], offsets[rows + 1]
+        blob = np.asarray(self.text_blob)
+
+        new_offsets = np.zeros(len(rows) + 1, dtype=np.int64)
+        np.cumsum(ends - starts, out=new_offsets[1:])
+        pieces = [blob[a:b] for a, b in zip(starts, ends)]
+
+        subset = ChunkStore(
+            text_blob=np.concatenate(pieces) if pieces else blob[:0],
+            offsets=new_offsets,
+            source_names=self.source_names,
+            source_codes=np.asarray(self.source_codes)[rows],
+            pages=np.asarray(self.pages)[rows],
+            chunk_ids=np.asarray(self.chunk_ids)[rows],
+        )
+        # Re-encode so sources no longer referenced are dropped
+        return ChunkStore.concat([subset])
+
+    def __len__(self) -> int:
+        return len(self.source_codes)
+
+    def __getitem__(self, idx: int) -> Dict:
+        return {
+            "text": self.text(idx),
+            "source": self.source_names[self.source_codes[idx]],
+            "page": int(self.pages[idx]),
+            "chunk_id": int(self.chunk_ids[idx]),
+        }
+
+    def __iter__(self) -> Iterator[Dict]:
+        for i in range(len(self)):
+            yield self[i]
+
+    @property
+    def nbytes(self) -> int:
+        """Bytes held by the columns (mapped file size for mmap stores)."""
+        columns = (
+            self.text_blob,
+            self.offsets,
+            self.source_codes,
+            self.pages,
+            self.chunk_ids,
+        )
+        return sum(column.nbytes for column in columns)
+
+    def text(self, idx: int) -> str:
+        """Decode the text of a single chunk."""
+        start, end = self.offsets[idx], self.offsets[idx + 1]
+        return bytes(self.text_blob[start:end]).decode("utf-8")
+
+    def texts(self) -> List[str]:
+        """Decode all chunk texts."""
+        return [self.text(i) for i in range(len(self))]
+
+    def save(self, directory: str):
+        """Write the store as a set of .npy columns plus a JSON header."""
+        path = Path(directory)
+        path.mkdir(parents=True, exist_ok=True)
+        # Replace files rather than rewrite them: a loaded store may map them
+        save_array(path / "text_blob.npy", self.text_blob)
+        save_array(path / "offsets.npy", self.offsets)
+        save_array(path / "source_codes.npy", self.source_codes)
+        save_array(path / "pages.npy", self.pages)
+        save_array(path / "chunk_ids.npy", self.chunk_ids)
+        write_text(path / "sources.json", json.dumps(self.source_names))
+
+    @classmethod
+    def load(cls, directory: str, mmap: bool = True) -> "ChunkStore":
+        """Load a store written by save(), memory-mapping the columns."""
+        path = Path(directory)
+        mode = "r" if mmap else None
+        return cls(
+            text_blob=np.load(path / "text_blob.npy", mmap_mode=mode),
+            offsets=np.load(path / "offsets.npy", mmap_mode=mode),
+            source_names=json.loads((path / "sources.json").read_text()),
+            source_codes=np.load(path / "source_codes.npy", mmap_mode=mode),
+            pages=np.load(path / "pages.npy", mmap_mode=mode),
+            chunk_ids=np.load(path / "chunk_ids.npy", mmap_mode=mode),
+        )
@@ -0,0 +1,266 @@
+"""Embedding model backends: PyTorch SentenceTransformer or ONNX Runtime."""
+
+from typing import List, Dict, Optional, Sequence
+from pathlib import Path
+import json
+import logging
+import os
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+EMBEDDING_BACKENDS = ("torch", "onnx")
+
+# Bump when the files written by export_onnx() change
+ONNX_FORMAT_VERSION = 1
+
+# Sentences the ONNX model is checked against PyTorch on after export
+VALIDATION_TEXTS = [
+    "The Tenant shall pay rent monthly in advance.",
+    "Either party may terminate this Agreement on ninety days written notice.",
+    "Confidential Information excludes information that is publicly available.",
+    "This Agreement is governed by the laws of the State of Delaware.",
+    "What is the notice period for termination?",
+    "indemnify",
+]
+
+
+def load_embedding_model(
+    model_name: str,
+    backend: str = "torch",
+    onnx_dir: str = "data/onnx",
+    quantize: bool = False,
+    threads: int = 0,
+    min_cosine: float = 0.99,
+):
+    """Load ``model_name`` with the given backend.
+
+    Both backends expose ``encode``, ``get_sentence_embedding_dimension``,
+    ``tokenizer`` and ``max_seq_length``, so either can be handed to
+    VectorStore. The ONNX backend exports (and optionally quantizes) the
+    model on first use and caches it under ``onnx_dir``.
+    """
+    if backend not in EMBEDDING_BACKENDS:
+        raise ValueError(
+            f"Unknown embedding backend {backend!r}, expected {EMBEDDING_BACKENDS}"
+        )
+    if backend == "torch":
+        from sentence_transformers import SentenceTransformer
+
+        return SentenceTransformer(model_name)
+
+    directory = Path(onnx_dir) / model_name.replace("/", "__")
+    ONNXEmbedder.prepare(model_name, directory, quantize, min_cosine)
+    return ONNXEmbedder(directory, quantize=quantize, threads=threads)
+
+
+class ONNXEmbedder:
+    """SentenceTransformer-compatible encoder running on ONNX Runtime.
+
+    Runs the exported transformer and applies the model's own pooling and
+    normalization in numpy. ``threads`` sets ONNX Runtime's intra-op thread
+    pool (0 lets it use every core); it is separate from the OpenMP/MKL
+    threads PyTorch and FAISS use.
+    """
+
+    def __init__(self, directory: str, quantize: bool = False, threads: int = 0):
+        import onnxruntime
+        from transformers import AutoTokenizer
+
+        self.directory = Path(directory)
+        self.config = json.loads((self.directory / "config.json").read_text())
+        if self.config["format_version"] != ONNX_FORMAT_VERSION:
+            raise ValueError(
+                f"Unsupported ONNX export format {self.config['format_version']} "
+                f"in {self.directory}; delete it to re-export"
+            )
+
+        self.variant = "onnx-int8" if quantize else "onnx"
+        model_file = "model.int8.onnx" if quantize else "model.onnx"
+        options = onnxruntime.SessionOptions()
+        options.intra_op_num_threads = threads
+        options.inter_op_num_threads = 1
+        options.graph_optimization_level = (
+            onnxruntime.GraphOptimizationLevel.ORT_ENABLE_ALL
+        )
+        self.session = onnxruntime.InferenceSession(
+            str(self.directory / model_file),
+            options,
+            providers=["CPUExecutionProvider"],
+        )
+        self.tokenizer = AutoTokenizer.from_pretrained(str(self.directory))
+        self.max_seq_length = self.config["max_seq_length"]
+        self.input_names = [i.name for i in self.session.get_inputs()]
+        logger.info(
+            f"✓ ONNX embedder ready ({self.variant}, threads={threads or 'all'})"
+        )
+
+    def get_sentence_embedding_dimension(self) -> int:
+        return self.config["dimension"]
+
+    def encode(
+        self, texts: Sequence[str], batch_size: int = 32, **kwargs
+    ) -> np.ndarray:
+        """Embed texts; extra SentenceTransformer arguments are ignored."""
+        if isinstance(texts, str):
+            return self.encode([texts], batch_size)[0]
+
+        batches = []
+        for start in range(0, len(texts), batch_size):
+            inputs = self.tokenizer(
+                list(texts[start : start + batch_size]),
+                padding=True,
+                truncation=True,
+                max_length=self.max_seq_length,
+                return_tensors="np",
+            )
+            feed = {name: inputs[name].astype(np.int64) for name in self.input_names}
+            (hidden,) = self.session.run(["last_hidden_state"], feed)
+            batches.append(
+                pool(
+                    hidden,
+                    inputs["attention_mask"],
+                    self.config["pooling"],
+                    self.config["normalize"],
+                )
+            )
+        if not batches:
+            return np.empty((0, self.config["dimension"]), dtype="float32")
+        return np.concatenate(batches)
+
+    @staticmethod
+    def prepare(
+        model_name: str, directory: Path, quantize: bool, min_cosine: float
+    ) -> Path:
+        """Export (and quantize) the model unless already done.
+
+        Each new ONNX file is checked against the PyTorch model; a file whose
+        embeddings fall below ``min_cosine`` is removed and ValueError raised.
+        """
+        model_path = directory / "model.onnx"
+        quantized_path = directory / "model.int8.onnx"
+        wanted = quantized_path if quantize else model_path
+        if wanted.exists():
+            return wanted
+
+        from sentence_transformers import SentenceTransformer
+
+        reference = SentenceTransformer(model_name, device="cpu")
+        if not model_path.exists():
+            export_onnx(reference, directory)
+            _check(directory, False, reference, min_cosine, model_path)
+        if quantize:
+            from onnxruntime.quantization import QuantType, quantize_dynamic
+
+            logger.info("Quantizing ONNX model to int8...")
+            quantize_dynamic(
+                str(model_path), str(quantized_path), weight_type=QuantType.QInt8
+            )
+            _check(directory, True, reference, min_cosine, quantized_path)
+        return wanted
+
+
+def export_onnx(model, directory: Path):
+    """Export a SentenceTransformer's transformer to ONNX with its config."""
+    import torch
+
+    directory.mkdir(parents=True, exist_ok=True)
+    transformer = model[0]
+    tokenizer = transformer.tokenizer
+    sample = tokenizer(["export sample"], return_tensors="pt")
+    input_names = [
+        name
+        for name in ("input_ids", "attention_mask", "token_type_ids")
+        if name in sample
+    ]
+
+    class LastHiddenState(torch.nn.Module):
+        def __init__(self, auto_model):
+            super().__init__()
+            self.auto_model = auto_model
+
+        def forward(self, *inputs):
+            features = dict(zip(input_names, inputs))
+            return self.auto_model(**features).last_hidden_state
+
+    axes = {0: "batch", 1: "sequence"}
+    logger.info(f"Exporting {transformer.auto_model.__class__.__name__} to ONNX...")
+    with torch.no_grad():
+        torch.onnx.export(
+            LastHiddenState(transformer.auto_model.eval()),
+            tuple(sample[name] for name in input_names),
+            str(directory / "model.onnx"),
+            input_names=input_names,
+            output_names=["last_hidden_state"],
+            dynamic_axes={name: axes for name in input_names + ["last_hidden_state"]},
+            opset_version=17,
+            dynamo=False,
+        )
+    tokenizer.save_pretrained(str(directory))
+
+    pooling = "mean"
+    normalize = False
+    for module in model:
+        if hasattr(module, "get_pooling_mode_str"):
+            pooling = module.get_pooling_mode_str()
+        if module.__class__.__name__ == "Normalize":
+            normalize = True
+    if pooling not in ("mean", "cls", "max"):
+        raise ValueError(f"Pooling mode {pooling!r} is not supported by ONNXEmbedder")
+
+    config = {
+        "format_version": ONNX_FORMAT_VERSION,
+        "dimension": model.get_sentence_embedding_dimension(),
+        "max_seq_length": model.max_seq_length,
+        "pooling": pooling,
+        "normalize": normalize,
+    }
+    (directory / "config.json").write_text(json.dumps(config, indent=2))
+    logger.info(f"✓ Exported ONNX model to {directory}")
+
+
+def pool(
+    hidden: np.ndarray, attention_mask: np.ndarray, mode: str, normalize: bool
+) -> np.ndarray:
+    """Reduce token embeddings to one vector per text, like SentenceTransformer."""
+    mask = attention_mask[..., None].astype(np.float32)
+    if mode == "cls":
+        vectors = hidden[:, 0]
+    elif mode == "max":
+        vectors = np.where(mask > 0, hidden, -1e9).max(axis=1)
+    else:
+        vectors = (hidden * mask).sum(axis=1) / np.maximum(mask.sum(axis=1), 1e-9)
+    if normalize:
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        vectors = vectors / np.maximum(norms, 1e-12)
+    return vectors.astype("float32")
+
+
+def validate_embedder(
+    candidate, reference, texts: Optional[List[str]] = None
+) -> Dict[str, float]:
+    """Cosine similarity between two models' embeddings of the same texts."""
+    texts = texts or VALIDATION_TEXTS
+    a = np.asarray(candidate.encode(texts), dtype=np.float32)
+    b = np.asarray(reference.encode(texts), dtype=np.float32)
+    if a.shape != b.shape:
+        raise ValueError(f"Embedding shapes differ: {a.shape} vs {b.shape}")
+    cosine = (a * b).sum(axis=1) / np.maximum(
+        np.linalg.norm(a, axis=1) * np.linalg.norm(b, axis=1), 1e-12
+    )
+    return {"min_cosine": float(cosine.min()), "mean_cosine": float(cosine.mean())}
+
+
+def _check(directory: Path, quantize: bool, reference, min_cosine: float, path: Path):
+    """Validate a freshly written ONNX file against PyTorch, or remove it."""
+    stats = validate_embedder(
+        ONNXEmbedder(directory, quantize=quantize, threads=os.cpu_count() or 1),
+        reference,
+    )
+    if stats["min_cosine"] < min_cosine:
+        path.unlink()
+        raise ValueError(
+            f"{path.name} embeddings diverge from PyTorch: min cosine "
+            f"{stats['min_cosine']:.4f} < {min_cosine}"
+        )
+    logger.info(f"✓ {path.name} matches PyTorch (min cosine {stats['min_cosine']:.4f})")
@@ -0,0 +1,150 @@
+"""Content-addressed on-disk cache for chunk embeddings."""
+
+from typing import List, Dict, Callable
+from pathlib import Path
+import hashlib
+import sqlite3
+import threading
+import time
+import numpy as np
+
+
+class EmbeddingCache:
+    """Cache embeddings in SQLite keyed by (model name, normalized text hash).
+
+    Identical texts (re-uploaded PDFs, chunk overlap, boilerplate clauses)
+    are only encoded once. The cache is bounded to ``max_entries`` and evicts
+    least recently used entries first.
+    """
+
+    def __init__(self, path: str, max_entries: int = 500_000):
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self.path = path
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings ("
+            " key TEXT PRIMARY KEY,"
+            " vector BLOB NOT NULL,"
+            " last_used REAL NOT NULL)"
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS embeddings_last_used"
+            " ON embeddings (last_used)"
+        )
+        self._conn.commit()
+        (self._size,) = self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()
+
+    @staticmethod
+    def make_key(model_name: str, text: str) -> str:
+        """Hash whitespace-normalized text together with the model name."""
+        normalized = " ".join(text.split())
+        digest = hashlib.sha256(normalized.encode("utf-8")).hexdigest()
+        return f"{model_name}:{digest}"
+
+    def get_many(self, keys: List[str]) -> Dict[str, np.ndarray]:
+        """Return cached vectors for the keys that are present."""
+        found = {}
+        with self._lock:
+            for start in range(0, len(keys), 500):
+                batch = keys[start : start + 500]
+                placeholders = ",".join("?" * len(batch))
+                rows = self._conn.execute(
+                    f"SELECT key, vector FROM embeddings WHERE key IN ({placeholders})",
+                    batch,
+                ).fetchall()
+                for key, blob in rows:
+                    found[key] = np.frombuffer(blob, dtype=np.float32)
+
+            if found:
+                now = time.time()
+                self._conn.executemany(
+                    "UPDATE embeddings SET last_used = ? WHERE key = ?",
+                    [(now, key) for key in found],
+                )
+                self._conn.commit()
+        return found
+
+    def put_many(self, items: Dict[str, np.ndarray]):
+        """Store vectors, evicting the least recently used if over capacity."""
+        now = time.time()
+        rows = [
+            (key, np.asarray(vector, dtype=np.float32).tobytes(), now)
+            for key, vector in items.items()
+        ]
+        with self._lock:
+            # Only inserts of new keys count as changes, so the size stays
+            # exact when some keys are already cached
+            before = self._conn.total_changes
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO embeddings (key, vector, last_used)"
+                " VALUES (?, ?, ?)",
+                rows,
+            )
+            inserted = self._conn.total_changes - before
+            if inserted < len(rows):
+                self._conn.executemany(
+                    "UPDATE embeddings SET vector = ?, last_used = ? WHERE key = ?",
+                    [(vector, last_used, key) for key, vector, last_used in rows],
+                )
+            self._size += inserted
+            if self._size > self.max_entries:
+                self._conn.execute(
+                    "DELETE FROM embeddings WHERE key IN ("
+                    " SELECT key FROM embeddings ORDER BY last_used LIMIT ?)",
+                    (self._size - self.max_entries,),
+                )
+                (self._size,) = self._conn.execute(
+                    "SELECT COUNT(*) FROM embeddings"
+                ).fetchone()
+            self._conn.commit()
+
+    def encode(
+        self,
+        model_name: str,
+        texts: List[str],
+        encode_fn: Callable[[List[str]], np.ndarray],
+    ) -> np.ndarray:
+        """Return embeddings for texts, sending only cache misses to encode_fn."""
+        keys = [self.make_key(model_name, text) for text in texts]
+        cached = self.get_many(list(dict.fromkeys(keys)))
+
+        missing = {}
+        for key, text in zip(keys, texts):
+            if key not in cached and key not in missing:
+                missing[key] = text
+
+        # Repeats within one batch are encoded once, so they count as hits
+        with self._lock:
+            self.hits += len(keys) - len(missing)
+            self.misses += len(missing)
+
+        if missing:
+            encoded = np.asarray(encode_fn(list(missing.values())), dtype=np.float32)
+            new_vectors = dict(zip(missing, encoded))
+            self.put_many(new_vectors)
+            cached.update(new_vectors)
+
+        if not keys:
+            return np.empty((0, 0), dtype=np.float32)
+        return np.stack([cached[key] for key in keys])
+
+    def stats(self) -> Dict[str, float]:
+        """Hit/miss counters and current size."""
+        with self._lock:
+            hits, misses, size = self.hits, self.misses, self._size
+        lookups = hits + misses
+        return {
+            "hits": hits,
+            "misses": misses,
+            "hit_rate": hits / lookups if lookups else 0.0,
+            "entries": size,
+        }
+
+    def close(self):
+        """Close the underlying database connection."""
+        self._conn.close()
@@ -0,0 +1,101 @@
+"""Metadata filters applied inside each search engine."""
+
+from typing import List, Dict, Optional, Sequence
+import numpy as np
+
+from .chunk_store import ChunkStore
+
+
+class SearchFilter:
+    """Restrict retrieval to some sources and/or a page range.
+
+    Each store applies the filter while searching rather than on its
+    results: Elasticsearch as ``bool`` filter clauses, BM25 as a row mask and
+    FAISS through an ID selector, so ``top_k`` is always filled from the
+    matching chunks. Bounds are inclusive; None leaves a side open.
+    """
+
+    def __init__(
+        self,
+        sources: Optional[Sequence[str]] = None,
+        page_min: Optional[int] = None,
+        page_max: Optional[int] = None,
+    ):
+        if isinstance(sources, str):
+            raise ValueError("sources must be a list of file names")
+        for name, page in (("page_min", page_min), ("page_max", page_max)):
+            if page is not None and (
+                not isinstance(page, int) or isinstance(page, bool) or page < 1
+            ):
+                raise ValueError(f"{name} must be a positive integer")
+        if page_min is not None and page_max is not None and page_min > page_max:
+            raise ValueError(f"page_min {page_min} is greater than page_max {page_max}")
+        self.sources = None if sources is None else [str(s) for s in sources]
+        self.page_min = page_min
+        self.page_max = page_max
+
+    @classmethod
+    def from_dict(cls, data: Optional[Dict]) -> Optional["SearchFilter"]:
+        """Build a filter from ``{"sources", "page_min", "page_max"}``."""
+        if not data:
+            return None
+        if not isinstance(data, dict):
+            raise ValueError("filters must be an object")
+        unknown = set(data) - {"sources", "page_min", "page_max"}
+        if unknown:
+            raise ValueError(f"Unknown filter fields: {sorted(unknown)}")
+        return cls(data.get("sources"), data.get("page_min"), data.get("page_max"))
+
+    def to_dict(self) -> Dict:
+        return {
+            "sources": self.sources,
+            "page_min": self.page_min,
+            "page_max": self.page_max,
+        }
+
+    def __repr__(self) -> str:
+        fields = ", ".join(f"{k}={v!r}" for k, v in self.to_dict().items())
+        return f"SearchFilter({fields})"
+
+    def es_clauses(self) -> List[Dict]:
+        """Elasticsearch ``bool.filter`` clauses for this filter."""
+        clauses = []
+        if self.sources is not None:
+            clauses.append({"terms": {"source": self.sources}})
+        pages = {}
+        if self.page_min is not None:
+            pages["gte"] = self.page_min
+        if self.page_max is not None:
+            pages["lte"] = self.page_max
+        if pages:
+            clauses.append({"range": {"page": pages}})
+        return clauses
+
+    def source_codes(self, chunks: ChunkStore) -> np.ndarray:
+        """Codes of the wanted sources in ``chunks.source_names``."""
+        wanted = set(self.sources)
+        return np.asarray(
+            [code for code, name in enumerate(chunks.source_names) if name in wanted],
+            dtype=np.int64,
+        )
+
+    def page_mask(self, pages: np.ndarray) -> np.ndarray:
+        """Whether each page number lies in the page range."""
+        mask = np.ones(len(pages), dtype=bool)
+        if self.page_min is not None:
+            mask &= pages >= self.page_min
+        if self.page_max is not None:
+            mask &= pages <= self.page_max
+        return mask
+
+    def row_mask(
+        self, chunks: ChunkStore, rows: Optional[np.ndarray] = None
+    ) -> np.ndarray:
+        """Whether each of ``rows`` (default: all) of ``chunks`` matches."""
+        if rows is None:
+            rows = np.arange(len(chunks))
+        mask = self.page_mask(np.asarray(chunks.pages)[rows])
+        if self.sources is not None:
+            codes = np.asarray(chunks.source_codes)[rows]
+            mask &= np.isin(codes, self.source_codes(chunks))
+        return mask
@@ -1,62 +1,171 @@
 """Hybrid search combining vector and keyword retrieval."""
 
-from typing import List, Dict
+from typing import List, Dict, Callable, Optional, Tuple
+from concurrent.futures import ThreadPoolExecutor, TimeoutError
+import contextvars
+import copy
+import logging
+import time
+import numpy as np
 from .vector_store import VectorStore
 from .keyword_store import KeywordStore
+from .filters import SearchFilter
+from docvision.observability import instrumentation
+
+logger = logging.getLogger(__name__)
 
 
 class HybridSearch:
     """Combine vector and keyword search with RRF."""
 
     def __init__(
-        self, vector_store: VectorStore, keyword_store: KeywordStore, alpha: float = 0.5
+        self,
+        vector_store: VectorStore,
+        keyword_store: KeywordStore,
+        alpha: float = 0.5,
+        concurrent: bool = True,
+        leg_timeout: Optional[float] = None,
     ):
         self.vector_store = vector_store
         self.keyword_store = keyword_store
         self.alpha = alpha
-        print(f"✓ Hybrid search initialized (α={alpha})")
+        self.concurrent = concurrent
+        self.leg_timeout = leg_timeout
+        # Legs that overrun their timeout keep a worker busy until they finish,
+        # so leave headroom beyond the two legs of a single query
+        self._executor = ThreadPoolExecutor(
+            max_workers=8, thread_name_prefix="hybrid-search"
+        )
+        logger.info(f"✓ Hybrid search initialized (α={alpha})")
 
-    def search(self, query: str, top_k: int = 5) -> List[Dict]:
-        """Perform hybrid search."""
-        # Get results from both stores
-        vector_results = self.vector_store.search(query, top_k * 2)
-        keyword_results = self.keyword_store.search(query, top_k * 2)
+    def search(
+        self, query: str, top_k: int = 5, search_filter: Optional[SearchFilter] = None
+    ) -> List[Dict]:
+        """Perform hybrid search, applying ``search_filter`` in both legs."""
+        return self.search_many([query], top_k, search_filter)[0]
 
-        # Apply RRF
-        scores = self._reciprocal_rank_fusion(vector_results, keyword_results)
+    def search_many(
+        self,
+        queries: List[str],
+        top_k: int = 5,
+        search_filter: Optional[SearchFilter] = None,
+        query_vectors: Optional[np.ndarray] = None,
+    ) -> List[List[Dict]]:
+        """Hybrid search for many queries using batched retrieval on both sides.
 
-        # Get top-k
-        sorted_items = sorted(scores.items(), key=lambda x: x[1], reverse=True)
-        top_keys = [k for k, _ in sorted_items[:top_k]]
+        Both legs return only chunk IDs and scores; fusion runs on those
+        arrays and only the final ``top_k`` chunks per query are hydrated
+        from the vector store, so over-fetching costs no chunk copies.
+        ``query_vectors`` is passed on to the vector leg.
+        """
+        # Hydrate from the store that was searched, even if swapped meanwhile
+        vector_store, keyword_store = self.vector_store, self.keyword_store
+        empty = [(np.empty(0, dtype=np.int64), np.empty(0)) for _ in queries]
+        vector_results, keyword_results = self._run_legs(
+            lambda: vector_store.search_ids_many(
+                queries, top_k * 2, search_filter, query_vectors
+            ),
+            lambda: keyword_store.search_ids_many(queries, top_k * 2, search_filter),
+            empty=empty,
+        )
+        with instrumentation.span("retrieve.rrf", queries=len(queries)):
+            fused = [
+                self._reciprocal_rank_fusion(vec_ids, kw_ids, top_k)
+                for (vec_ids, _), (kw_ids, _) in zip(vector_results, keyword_results)
+            ]
+        return [
+            vector_store.hydrate(ids, scores, field="hybrid_score")
+            for ids, scores in fused
+        ]
 
-        # Return chunks
-        results = []
-        all_chunks = {self._chunk_key(c): c for c in vector_results + keyword_results}
+    def with_stores(
+        self, vector_store: VectorStore, keyword_store: KeywordStore
+    ) -> "HybridSearch":
+        """A copy searching other stores, sharing this one's worker threads."""
+        hybrid = copy.copy(self)
+        hybrid.vector_store = vector_store
+        hybrid.keyword_store = keyword_store
+        return hybrid
 
-        for key in top_keys:
-            if key in all_chunks:
-                chunk = all_chunks[key].copy()
-                chunk["hybrid_score"] = scores[key]
-                results.append(chunk)
+    def _run_legs(self, vector_fn: Callable, keyword_fn: Callable, empty) -> Tuple:
+        """Run the vector and keyword legs, concurrently if enabled.
 
-        return results
+        A leg that fails or misses ``leg_timeout`` is replaced by ``empty``, so
+        fusion degrades to the leg that did return. Only if both legs fail is
+        the error raised.
+        """
+        if not self.concurrent:
+            return vector_fn(), keyword_fn()
 
-    def _reciprocal_rank_fusion(
-        self, vec_results: List[Dict], kw_results: List[Dict], k: int = 60
-    ) -> Dict[str, float]:
-        """RRF algorithm."""
-        scores = {}
+        # Run each leg in a copy of the caller's context so its spans land in
+        # the caller's request trace
+        futures = [
+            (
+                "vector",
+                self._executor.submit(contextvars.copy_context().run, vector_fn),
+            ),
+            (
+                "keyword",
+                self._executor.submit(contextvars.copy_context().run, keyword_fn),
+            ),
+        ]
+        deadline = None
+        if self.leg_timeout is not None:
+            deadline = time.monotonic() + self.leg_timeout
+
+        results, errors = [], []
+        for name, future in futures:
+            remaining = None
+            if deadline is not None:
+                remaining = max(0.0, deadline - time.monotonic())
+            try:
+                results.append(future.result(timeout=remaining))
+            except TimeoutError as e:
+                logger.warning(f"⚠ {name} search timed out after {self.leg_timeout}s")
+                instrumentation.count(f"hybrid.{name}_timeouts")
+                errors.append(e)
+                results.append(empty)
+            except Exception as e:
+                logger.warning(f"⚠ {name} search failed: {e}")
+                instrumentation.count(f"hybrid.{name}_errors")
+                errors.append(e)
+                results.append(empty)
 
-        for rank, chunk in enumerate(vec_results, 1):
-            key = self._chunk_key(chunk)
-            scores[key] = scores.get(key, 0) + self.alpha / (k + rank)
+        if len(errors) == len(futures):
+            raise errors[0]
+        return tuple(results)
 
-        for rank, chunk in enumerate(kw_results, 1):
-            key = self._chunk_key(chunk)
-            scores[key] = scores.get(key, 0) + (1 - self.alpha) / (k + rank)
+    def close(self):
+        """Shut down the worker threads.
+
+        Later searches run their legs in the calling thread, so a query
+        still holding this instance completes.
+        """
+        self.concurrent = False
+        self._executor.shutdown(wait=False)
+
+    def _reciprocal_rank_fusion(
+        self, vec_ids: np.ndarray, kw_ids: np.ndarray, top_k: int, k: int = 60
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """RRF over two ranked ID arrays; returns the top-k (ids, scores).
 
-        return scores
+        Ties keep the order in which IDs first appear, vector results first.
+        """
+        ids = np.concatenate([vec_ids, kw_ids]).astype(np.int64, copy=False)
+        weights = np.concatenate(
+            [
+                self.alpha / (k + np.arange(1, len(vec_ids) + 1)),
+                (1 - self.alpha) / (k + np.arange(1, len(kw_ids) + 1)),
+            ]
+        )
+        unique, first, inverse = np.unique(ids, return_index=True, return_inverse=True)
+        scores = np.bincount(inverse, weights=weights, minlength=len(unique))
 
-    def _chunk_key(self, chunk: Dict) -> str:
-        """Generate unique key for chunk."""
-        return f"{chunk['source']}_{chunk['page']}_{chunk['chunk_id']}"
+        if len(unique) > top_k:
+            # Keep everything tied with the k-th best score, so the tie-break
+            # below rather than argpartition decides which of them make it
+            kth_best = -np.partition(-scores, top_k - 1)[top_k - 1]
+            keep = scores >= kth_best
+            unique, first, scores = unique[keep], first[keep], scores[keep]
+        order = np.lexsort((first, -scores))[:top_k]
+        return unique[order], scores[order]
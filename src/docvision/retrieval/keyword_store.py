@@ -1,23 +1,43 @@
 """Keyword-based search using Elasticsearch."""
 
-from typing import List, Dict
-from elasticsearch import Elasticsearch
-from elasticsearch.helpers import bulk
+from typing import List, Dict, Optional, Sequence, Tuple
+import logging
+import numpy as np
+
+from docvision.observability import instrumentation
+from .filters import SearchFilter
+
+logger = logging.getLogger(__name__)
 
 
 class KeywordStore:
     """Manage keyword search with Elasticsearch."""
 
     def __init__(self, host: str, index_name: str):
+        from elasticsearch import Elasticsearch
+
         self.client = Elasticsearch(hosts=[host])
         self.index_name = index_name
-        print(f"✓ Connected to Elasticsearch: {host}")
+        logger.info(f"✓ Connected to Elasticsearch: {host}")
 
     def create_index(self):
-        """Create Elasticsearch index."""
+        """Create Elasticsearch index, dropping any existing one."""
+        if self.client.indices.exists(index=self.index_name):
+            self.client.indices.delete(index=self.index_name)
+        self._create_index()
+
+    def ensure_index(self):
+        """Create Elasticsearch index if it does not exist yet."""
+        if not self.client.indices.exists(index=self.index_name):
+            self._create_index()
+
+    def delete_index(self):
+        """Delete the Elasticsearch index if it exists."""
         if self.client.indices.exists(index=self.index_name):
             self.client.indices.delete(index=self.index_name)
+            logger.info(f"✓ Deleted index: {self.index_name}")
 
+    def _create_index(self):
         mapping = {
             "mappings": {
                 "properties": {
@@ -30,27 +50,125 @@ class KeywordStore:
         }
 
         self.client.indices.create(index=self.index_name, mappings=mapping["mappings"])
-        print(f"✓ Created index: {self.index_name}")
+        logger.info(f"✓ Created index: {self.index_name}")
+
+    def index_chunks(self, chunks: List[Dict], ids: Optional[Sequence[int]] = None):
+        """Index chunks in Elasticsearch.
+
+        ``ids`` should be the vector IDs returned by VectorStore so both stores
+        agree on document identity; positional IDs are used if omitted.
+        """
+        from elasticsearch.helpers import bulk
+
+        if ids is None:
+            ids = range(len(chunks))
 
-    def index_chunks(self, chunks: List[Dict]):
-        """Index chunks in Elasticsearch."""
         actions = [
-            {"_index": self.index_name, "_id": i, "_source": chunk}
-            for i, chunk in enumerate(chunks)
+            {"_index": self.index_name, "_id": str(int(i)), "_source": chunk}
+            for i, chunk in zip(ids, chunks)
         ]
 
-        success, _ = bulk(self.client, actions)
+        with instrumentation.span("ingest.keyword_index", chunks=len(actions)):
+            success, _ = bulk(self.client, actions)
+            self.client.indices.refresh(index=self.index_name)
+        logger.info(f"✓ Indexed {success} documents in Elasticsearch")
+
+    def delete_chunks(self, ids: Sequence[int]):
+        """Delete chunks by ID."""
+        from elasticsearch.helpers import bulk
+
+        actions = [
+            {"_op_type": "delete", "_index": self.index_name, "_id": str(int(i))}
+            for i in ids
+        ]
+        if not actions:
+            return
+
+        success, _ = bulk(self.client, actions, raise_on_error=False)
         self.client.indices.refresh(index=self.index_name)
-        print(f"✓ Indexed {success} documents in Elasticsearch")
+        logger.info(f"✓ Deleted {success} documents from Elasticsearch")
 
-    def search(self, query: str, top_k: int = 5) -> List[Dict]:
+    def search(
+        self, query: str, top_k: int = 5, search_filter: Optional[SearchFilter] = None
+    ) -> List[Dict]:
         """Keyword search."""
-        query_body = {"match": {"text": query}}
+        query_body = self._query(query, search_filter)
+
+        with instrumentation.span("retrieve.keyword", queries=1):
+            response = self.client.search(
+                index=self.index_name, query=query_body, size=top_k
+            )
+
+        return self._hits_to_chunks(response)
+
+    def search_many(
+        self,
+        queries: List[str],
+        top_k: int = 5,
+        search_filter: Optional[SearchFilter] = None,
+    ) -> List[List[Dict]]:
+        """Keyword search for many queries in a single msearch round trip."""
+        return [
+            self._hits_to_chunks(item)
+            for item in self._msearch(queries, top_k, search_filter)
+        ]
+
+    def search_ids_many(
+        self,
+        queries: List[str],
+        top_k: int = 5,
+        search_filter: Optional[SearchFilter] = None,
+    ) -> List[Tuple[np.ndarray, np.ndarray]]:
+        """Like search_many, but return (ids, scores) arrays per query.
+
+        ``_source`` is not fetched, so no chunk text crosses the wire.
+        """
+        results = []
+        for item in self._msearch(queries, top_k, search_filter, _source=False):
+            hits = item["hits"]["hits"]
+            results.append(
+                (
+                    np.asarray([int(hit["_id"]) for hit in hits], dtype=np.int64),
+                    np.asarray([hit["_score"] for hit in hits], dtype=np.float64),
+                )
+            )
+        return results
+
+    def _msearch(
+        self,
+        queries: List[str],
+        top_k: int,
+        search_filter: Optional[SearchFilter],
+        **options,
+    ) -> List[Dict]:
+        """Run all queries in a single msearch round trip."""
+        if not queries:
+            return []
+
+        searches = []
+        for query in queries:
+            searches.append({})
+            searches.append(
+                {"query": self._query(query, search_filter), "size": top_k, **options}
+            )
+
+        with instrumentation.span("retrieve.keyword", queries=len(queries)):
+            response = self.client.msearch(index=self.index_name, searches=searches)
+
+        for item in response["responses"]:
+            if "error" in item:
+                raise RuntimeError(f"Elasticsearch msearch failed: {item['error']}")
+        return response["responses"]
 
-        response = self.client.search(
-            index=self.index_name, query=query_body, size=top_k
-        )
+    @staticmethod
+    def _query(query: str, search_filter: Optional[SearchFilter]) -> Dict:
+        """Match query, with the filter as non-scoring ``bool`` clauses."""
+        match = {"match": {"text": query}}
+        if search_filter is None:
+            return match
+        return {"bool": {"must": match, "filter": search_filter.es_clauses()}}
 
+    def _hits_to_chunks(self, response: Dict) -> List[Dict]:
         results = []
         for hit in response["hits"]["hits"]:
             chunk = hit["_source"]
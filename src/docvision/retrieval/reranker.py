@@ -0,0 +1,136 @@
+"""Second-stage reranking with a cross-encoder."""
+
+from typing import List, Dict, Optional, Tuple
+from collections import OrderedDict
+import hashlib
+import logging
+import threading
+import time
+import numpy as np
+
+from docvision.observability import instrumentation
+
+logger = logging.getLogger(__name__)
+
+
+class Reranker:
+    """Rescore first-stage candidates with a cross-encoder.
+
+    Candidates are scored in batches of ``batch_size`` (query, chunk) pairs.
+    Scores are cached per pair, keyed by the query and the chunk's text, so
+    repeated and overlapping queries only score what is new. If
+    ``time_budget`` seconds would be exceeded by the next batch (judged by
+    the slowest batch so far), reranking
+    stops and the first-stage order is returned instead; scores computed so
+    far are still cached.
+    """
+
+    def __init__(
+        self,
+        model_name: str = "cross-encoder/ms-marco-MiniLM-L-6-v2",
+        model=None,
+        batch_size: int = 16,
+        time_budget: Optional[float] = None,
+        cache_max_entries: int = 50_000,
+    ):
+        if model is None:
+            from sentence_transformers import CrossEncoder
+
+            logger.info(f"Loading cross-encoder: {model_name}...")
+            model = CrossEncoder(model_name, device="cpu")
+        self.model = model
+        self.batch_size = batch_size
+        self.time_budget = time_budget
+        self.cache_max_entries = cache_max_entries
+        self._cache: "OrderedDict[bytes, float]" = OrderedDict()
+        self._lock = threading.Lock()
+        logger.info(f"✓ Reranker initialized ({model_name})")
+
+    def rerank(
+        self, query: str, chunks: List[Dict], top_k: int
+    ) -> Tuple[List[Dict], bool]:
+        """Return the best ``top_k`` chunks and whether they were reranked.
+
+        On a blown time budget the first ``top_k`` chunks are returned in
+        their original order with ``False``.
+        """
+        if not chunks:
+            return [], True
+
+        with instrumentation.span("retrieve.rerank", candidates=len(chunks)):
+            scores = self._scores(query, chunks)
+        if scores is None:
+            logger.warning(
+                f"⚠ Reranking exceeded {self.time_budget}s; using first-stage order"
+            )
+            instrumentation.count("rerank.timeouts")
+            return chunks[:top_k], False
+
+        # Stable, so ties keep their first-stage order
+        order = np.argsort(-scores, kind="stable")[:top_k]
+        results = []
+        for row in order:
+            chunk = chunks[row].copy()
+            chunk["rerank_score"] = float(scores[row])
+            results.append(chunk)
+        return results, True
+
+    def _scores(self, query: str, chunks: List[Dict]) -> Optional[np.ndarray]:
+        """Cross-encoder score of every chunk, or None if out of time."""
+        start = time.monotonic()
+        query = " ".join(query.split())
+        keys = [self._key(query, chunk["text"]) for chunk in chunks]
+        scores = np.empty(len(chunks), dtype=np.float32)
+
+        missing = []
+        with self._lock:
+            for row, key in enumerate(keys):
+                score = self._cache.get(key)
+                if score is None:
+                    missing.append(row)
+                else:
+                    self._cache.move_to_end(key)
+                    scores[row] = score
+        instrumentation.count("rerank.cache_hits", len(chunks) - len(missing))
+        instrumentation.count("rerank.cache_misses", len(missing))
+
+        slowest = 0.0
+        for i in range(0, len(missing), self.batch_size):
+            now = time.monotonic()
+            if self.time_budget is not None and (
+                now - start + slowest > self.time_budget
+            ):
+                return None
+
+            rows = missing[i : i + self.batch_size]
+            pairs = [(query, chunks[row]["text"]) for row in rows]
+            batch = np.asarray(
+                self.model.predict(pairs, batch_size=self.batch_size),
+                dtype=np.float32,
+            ).reshape(-1)
+            scores[rows] = batch
+            self._store([keys[row] for row in rows], batch)
+            slowest = max(slowest, time.monotonic() - now)
+
+        return scores
+
+    @staticmethod
+    def _key(query: str, text: str) -> bytes:
+        digest = hashlib.blake2b(digest_size=16)
+        digest.update(query.encode("utf-8"))
+        digest.update(b"\0")
+        digest.update(text.encode("utf-8"))
+        return digest.digest()
+
+    def _store(self, keys: List[bytes], scores: np.ndarray):
+        with self._lock:
+            for key, score in zip(keys, scores):
+                self._cache[key] = float(score)
+                self._cache.move_to_end(key)
+            while len(self._cache) > self.cache_max_entries:
+                self._cache.popitem(last=False)
+
+    def clear(self):
+        """Drop all cached scores."""
+        with self._lock:
+            self._cache.clear()
@@ -1,55 +1,750 @@
 """Vector storage and search using FAISS."""
 
-from typing import List, Dict
+from typing import List, Dict, Iterable, Iterator, Optional, Tuple
+from itertools import islice
+import copy
+from pathlib import Path
+import json
+import logging
+import math
 import faiss
 import numpy as np
-from sentence_transformers import SentenceTransformer
+
+from .chunk_store import ChunkStore
+from .embedding_cache import EmbeddingCache
+from .embedding_backends import load_embedding_model
+from .filters import SearchFilter
+from docvision.observability import instrumentation
+from docvision._files import replace_file, save_array, write_text
+
+logger = logging.getLogger(__name__)
+
+# Bump when the on-disk layout written by VectorStore.save() changes
+INDEX_FORMAT_VERSION = 4
+
+
+INDEX_TYPES = ("flat", "ivf_flat", "ivf_pq", "hnsw")
+
+# float32 keeps raw vectors and searches by L2 distance; float16 and int8
+# store normalized vectors once, scalar-quantized, and search by cosine
+VECTOR_DTYPES = ("float32", "float16", "int8")
+
+DEFAULT_INDEX_PARAMS = {
+    "nlist": 1024,  # IVF cells
+    "nprobe": 16,  # IVF cells visited per query
+    "pq_m": 48,  # PQ sub-quantizers, must divide the dimension
+    "pq_nbits": 8,  # bits per PQ code
+    "hnsw_m": 32,  # HNSW graph degree
+    "ef_search": 64,  # HNSW search breadth
+    "train_size": 50_000,  # vectors sampled to train IVF/PQ
+}
+
+# Minimum training points per centroid before faiss starts warning
+_POINTS_PER_CENTROID = 39
+# Retrain an IVF index once the store is this many times the size it was
+# trained on (and can support more cells)
+_RETRAIN_GROWTH = 4
+
+
+def _nlist(n_train: int, params: Dict) -> int:
+    """IVF cells that ``n_train`` training vectors support."""
+    return min(params["nlist"], n_train // _POINTS_PER_CENTROID)
+
+
+def _trainable_type(index_type: str, n_train: int, params: Dict) -> str:
+    """``index_type``, or "flat" if ``n_train`` vectors cannot train it."""
+    if index_type == "ivf_pq":
+        enough = n_train >= 2 ** params["pq_nbits"] * _POINTS_PER_CENTROID
+    elif index_type == "ivf_flat":
+        enough = _nlist(n_train, params) >= 1
+    else:
+        enough = True
+    return index_type if enough else "flat"
+
+
+def create_faiss_index(
+    index_type: str,
+    dimension: int,
+    train_vectors: np.ndarray,
+    params: Dict,
+    vector_dtype: str = "float32",
+) -> faiss.Index:
+    """Build an empty, trained FAISS index that accepts add_with_ids.
+
+    IVF indexes store IDs natively; flat and HNSW are wrapped in IndexIDMap.
+    IVF variants shrink ``nlist`` to what the training sample supports and
+    fall back to a flat index when there is too little data to train on.
+    With a compact ``vector_dtype`` the vectors are scalar-quantized and
+    compared by inner product.
+    """
+    if index_type not in INDEX_TYPES:
+        raise ValueError(f"Unknown index type {index_type!r}, expected {INDEX_TYPES}")
+    if vector_dtype not in VECTOR_DTYPES:
+        raise ValueError(
+            f"Unknown vector dtype {vector_dtype!r}, expected {VECTOR_DTYPES}"
+        )
+
+    n_train = len(train_vectors)
+    nlist = _nlist(n_train, params)
+    if _trainable_type(index_type, n_train, params) != index_type:
+        logger.warning(f"⚠ Only {n_train} vectors to train {index_type}; using flat")
+        index_type = "flat"
+
+    if vector_dtype != "float32":
+        if index_type == "ivf_pq":
+            raise ValueError("ivf_pq is already compressed; use vector_dtype float32")
+        qtype = {
+            "float16": faiss.ScalarQuantizer.QT_fp16,
+            "int8": faiss.ScalarQuantizer.QT_8bit_uniform,  # fixed range below
+        }[vector_dtype]
+        metric = faiss.METRIC_INNER_PRODUCT
+        if index_type == "flat":
+            index = faiss.IndexScalarQuantizer(dimension, qtype, metric)
+            _fix_int8_range(index, vector_dtype)
+            index = faiss.IndexIDMap(index)
+        elif index_type == "hnsw":
+            index = faiss.IndexHNSWSQ(dimension, qtype, params["hnsw_m"], metric)
+            _fix_int8_range(faiss.downcast_index(index.storage), vector_dtype)
+            index.is_trained = True
+            index = faiss.IndexIDMap(index)
+        else:
+            index = faiss.IndexIVFScalarQuantizer(
+                faiss.IndexFlatIP(dimension), dimension, nlist, qtype, metric
+            )
+            # Quantize the vectors themselves, which stay within [-1, 1]
+            index.by_residual = vector_dtype != "int8"
+    elif index_type == "flat":
+        index = faiss.IndexIDMap(faiss.IndexFlatL2(dimension))
+    elif index_type == "hnsw":
+        index = faiss.IndexIDMap(faiss.IndexHNSWFlat(dimension, params["hnsw_m"]))
+    elif index_type == "ivf_flat":
+        index = faiss.IndexIVFFlat(faiss.IndexFlatL2(dimension), dimension, nlist)
+    else:
+        index = faiss.IndexIVFPQ(
+            faiss.IndexFlatL2(dimension),
+            dimension,
+            nlist,
+            params["pq_m"],
+            params["pq_nbits"],
+        )
+
+    if not index.is_trained:
+        # Enough points for every cell, however small train_size is
+        size = max(params["train_size"], nlist * _POINTS_PER_CENTROID)
+        sample = np.random.default_rng(0).permutation(n_train)[:size]
+        index.train(np.ascontiguousarray(train_vectors[np.sort(sample)]))
+        if isinstance(index, faiss.IndexIVFScalarQuantizer):
+            _fix_int8_range(index, vector_dtype)
+    return index
+
+
+def _fix_int8_range(index: faiss.Index, vector_dtype: str):
+    """Quantize int8 vectors over [-1, 1], the range of any normalized vector.
+
+    A range learned from the first vectors would clip later ones that fall
+    outside it, and compact stores keep no raw vectors to retrain from.
+    """
+    if vector_dtype != "int8":
+        return
+    # QT_8bit_uniform stores one (min, max - min) pair for all dimensions
+    faiss.copy_array_to_vector(np.array([-1.0, 2.0], dtype="float32"), index.sq.trained)
+    index.is_trained = True
+
+
+def _batched(items: Iterable, size: int) -> Iterator[List]:
+    iterator = iter(items)
+    while batch := list(islice(iterator, size)):
+        yield batch
 
 
 class VectorStore:
-    """Manage vector embeddings and similarity search."""
+    """Manage vector embeddings and similarity search.
+
+    With the default ``vector_dtype="float32"`` raw embeddings are kept
+    alongside the index and ``score`` is an L2 distance (lower is closer).
+    ``float16`` or ``int8`` store L2-normalized vectors once, inside a
+    scalar-quantized index, and ``score`` is the cosine similarity (higher
+    is closer); that is 4x or 8x less memory per vector.
+    """
+
+    def __init__(
+        self,
+        model_name: str,
+        model=None,
+        embedding_cache: EmbeddingCache = None,
+        index_type: str = "flat",
+        index_params: Optional[Dict] = None,
+        backend: str = "torch",
+        backend_options: Optional[Dict] = None,
+        vector_dtype: str = "float32",
+    ):
+        """Load the embedding model unless ``model`` is given.
 
-    def __init__(self, model_name: str):
-        print(f"Loading embedding model: {model_name}...")
+        ``backend`` ("torch" or "onnx") and ``backend_options`` are passed to
+        load_embedding_model().
+        """
+        logger.info(f"Loading embedding model: {model_name}...")
         # Set number of threads for FAISS to avoid segfault on macOS
         faiss.omp_set_num_threads(1)
-        self.model = SentenceTransformer(model_name)
+        self.model_name = model_name
+        if model is None:
+            model = load_embedding_model(model_name, backend, **(backend_options or {}))
+        self.model = model
+        # Cached embeddings are only reused by the same backend variant
+        variant = getattr(model, "variant", None)
+        self.embedding_key = f"{model_name}@{variant}" if variant else model_name
         self.dimension = self.model.get_sentence_embedding_dimension()
+        self.embedding_cache = embedding_cache
+        if index_type not in INDEX_TYPES:
+            raise ValueError(
+                f"Unknown index type {index_type!r}, expected {INDEX_TYPES}"
+            )
+        # The type asked for, and the type of the index actually built: flat
+        # until the store holds enough vectors to train an IVF index
+        self.requested_index_type = index_type
+        self.index_type = index_type
+        self.index_params = {**DEFAULT_INDEX_PARAMS, **(index_params or {})}
+        if index_type == "ivf_pq" and self.dimension % self.index_params["pq_m"]:
+            raise ValueError(
+                f"pq_m={self.index_params['pq_m']} must divide "
+                f"dimension {self.dimension}"
+            )
+        if vector_dtype not in VECTOR_DTYPES:
+            raise ValueError(
+                f"Unknown vector dtype {vector_dtype!r}, expected {VECTOR_DTYPES}"
+            )
+        if vector_dtype != "float32" and index_type == "ivf_pq":
+            raise ValueError("ivf_pq is already compressed; use vector_dtype float32")
+        self.vector_dtype = vector_dtype
         self.index = None
-        self.chunks = []
-        self.embeddings = None  # Store embeddings for serialization
-        print(f"✓ Model loaded (dimension: {self.dimension})")
+        self.chunks = ChunkStore.from_chunks([])
+        # Raw embeddings, kept for rebuilds in float32 mode only
+        self.embeddings = self._empty_embeddings()
+        # Stable vector IDs, ascending and parallel to self.chunks
+        self.ids = np.empty(0, dtype=np.int64)
+        self.next_id = 0
+        # Vectors the current index was built from
+        self._trained_on = 0
+        # File the index was loaded from, re-read if it cannot be cloned
+        self._index_file: Optional[str] = None
+        # Per-source row ranges, rebuilt whenever self.chunks is replaced
+        self._ranges_for = None
+        self._ranges: Tuple = ()
+        logger.info(f"✓ Model loaded (dimension: {self.dimension})")
+
+    def clone(self) -> "VectorStore":
+        """A copy to write to while this store keeps serving searches.
+
+        The FAISS index is copied; the model, caches and metadata columns are
+        shared, since writes replace those columns rather than mutate them.
+        """
+        clone = copy.copy(self)
+        if self.index is not None:
+            try:
+                clone.index = faiss.clone_index(self.index)
+            except RuntimeError:
+                # Memory-mapped inverted lists cannot be cloned; read a
+                # private copy of the file they were mapped from instead
+                if self._index_file is None:
+                    raise
+                clone.index = faiss.read_index(self._index_file)
+                clone._apply_search_params()
+        return clone
+
+    def index_chunks(self, chunks: List[Dict]) -> np.ndarray:
+        """Create FAISS index from chunks, replacing any existing contents."""
+        self.index = None
+        self.chunks = ChunkStore.from_chunks([])
+        self.embeddings = self._empty_embeddings()
+        self.ids = np.empty(0, dtype=np.int64)
+        self.next_id = 0
+        return self.add_chunks(chunks)
+
+    @property
+    def compact(self) -> bool:
+        """Whether vectors live only in a quantized index."""
+        return self.vector_dtype != "float32"
+
+    def _empty_embeddings(self) -> Optional[np.ndarray]:
+        if self.compact:
+            return None
+        return np.empty((0, self.dimension), dtype="float32")
+
+    def add_chunks(self, chunks: List[Dict]) -> np.ndarray:
+        """Embed and append chunks to the index, returning their vector IDs."""
+        logger.info(f"Indexing {len(chunks)} chunks...")
+        ids = [batch_ids for _, batch_ids in self.add_chunk_stream(chunks)]
+        return np.concatenate(ids) if ids else np.empty(0, dtype=np.int64)
+
+    def add_chunk_stream(
+        self, chunks: Iterable[Dict], batch_size: int = 256
+    ) -> Iterator[Tuple[List[Dict], np.ndarray]]:
+        """Embed and index chunks from an iterable in fixed-size batches.
 
-    def index_chunks(self, chunks: List[Dict]):
-        """Create FAISS index from chunks."""
-        print(f"Indexing {len(chunks)} chunks...")
-        self.chunks = chunks
+        Yields each ``(batch, ids)`` once it is searchable in FAISS, so callers
+        can index the same batch elsewhere. Each added batch is kept only as a
+        columnar ChunkStore (plus its embeddings in float32 mode), and these
+        are concatenated once when the stream ends. An IVF store searches a
+        flat index until it holds ``train_size`` vectors, and is retrained
+        at the end of the stream once it has outgrown its index.
+        """
+        added = []  # (ChunkStore, ids, embeddings or None) now in FAISS
+        try:
+            for batch in _batched(chunks, batch_size):
+                batch_ids = np.arange(
+                    self.next_id, self.next_id + len(batch), dtype=np.int64
+                )
+                batch_embeddings = self._encode_texts([c["text"] for c in batch])
+                self.next_id += len(batch)
 
-        texts = [chunk["text"] for chunk in chunks]
-        embeddings = self.model.encode(texts, show_progress_bar=True, batch_size=32)
-        self.embeddings = np.array(embeddings).astype("float32")
+                self._build_index(batch_embeddings)
+                faiss.omp_set_num_threads(1)  # Set again before adding
+                with instrumentation.span("ingest.faiss_add", vectors=len(batch)):
+                    self.index.add_with_ids(batch_embeddings, batch_ids)
+                # The dicts are dropped once yielded; keep compact columns only
+                embeddings = None if self.compact else batch_embeddings
+                added.append((ChunkStore.from_chunks(batch), batch_ids, embeddings))
+                yield batch, batch_ids
+        finally:
+            # Keep metadata in step with FAISS even if the consumer stops early
+            if added:
+                self.chunks = ChunkStore.concat(
+                    [self.chunks] + [c for c, _, _ in added]
+                )
+                if not self.compact:
+                    self.embeddings = np.concatenate(
+                        [self.embeddings] + [e for _, _, e in added]
+                    )
+                self.ids = np.concatenate([self.ids] + [i for _, i, _ in added])
+                logger.info(f"✓ Indexed {self.index.ntotal} vectors")
+        # Only reached when the stream was consumed to the end
+        if self._outgrown_index():
+            self.rebuild_index()
 
-        # Use a simpler index type that's more stable on macOS
-        self.index = faiss.IndexFlatL2(self.dimension)
-        faiss.omp_set_num_threads(1)  # Set again before adding
-        self.index.add(self.embeddings)
+    def _train_size(self) -> int:
+        """Vectors needed before the requested index type is built."""
+        if self.requested_index_type in ("ivf_flat", "ivf_pq"):
+            return self.index_params["train_size"]
+        return 0
 
-        print(f"✓ Indexed {self.index.ntotal} vectors")
+    def _buildable_type(self, n_vectors: int) -> str:
+        """The requested index type, or "flat" while it cannot be trained."""
+        if n_vectors < self._train_size():
+            return "flat"
+        return _trainable_type(self.requested_index_type, n_vectors, self.index_params)
+
+    def _outgrown_index(self) -> bool:
+        """Whether the index was built for far fewer vectors than it holds.
+
+        A flat stand-in is replaced once the requested type can be trained;
+        an IVF index is retrained once the store is ``_RETRAIN_GROWTH`` times
+        the size it was trained on and supports more cells.
+        """
+        if self.index is None:
+            return False
+        n_vectors = len(self.ids)
+        if self.index_type == "flat":
+            return self._buildable_type(n_vectors) != "flat"
+        if self.index_type not in ("ivf_flat", "ivf_pq"):
+            return False
+        nlist = faiss.downcast_index(self.index).nlist
+        return (
+            n_vectors >= _RETRAIN_GROWTH * self._trained_on
+            and _nlist(n_vectors, self.index_params) > nlist
+        )
+
+    def _build_index(self, vectors: np.ndarray):
+        """Create an index for ``vectors`` if none exists yet."""
+        if self.index is not None:
+            return
+        self.index_type = self._buildable_type(len(vectors))
+        self.index = create_faiss_index(
+            self.index_type,
+            self.dimension,
+            vectors,
+            self.index_params,
+            self.vector_dtype,
+        )
+        self._trained_on = len(vectors)
+        self._apply_search_params()
+
+    def _base_index(self) -> faiss.Index:
+        """The index behind IndexIDMap, if any."""
+        index = faiss.downcast_index(self.index)
+        if isinstance(index, faiss.IndexIDMap):
+            return faiss.downcast_index(index.index)
+        return index
+
+    def _apply_search_params(self):
+        """Set nprobe / efSearch on the index, whatever its type."""
+        base = self._base_index()
+        space = faiss.ParameterSpace()
+        if isinstance(base, faiss.IndexIVF):
+            space.set_index_parameter(self.index, "nprobe", self.index_params["nprobe"])
+        elif isinstance(base, faiss.IndexHNSW):
+            space.set_index_parameter(
+                self.index, "efSearch", self.index_params["ef_search"]
+            )
+
+    def stored_vectors(self) -> np.ndarray:
+        """Vectors parallel to ``self.ids``; decoded from the index if compact."""
+        if not self.compact:
+            return np.asarray(self.embeddings)
+        if self.index is None or not len(self.ids):
+            return np.empty((0, self.dimension), dtype="float32")
+
+        index = faiss.downcast_index(self.index)
+        if isinstance(index, faiss.IndexIVF):
+            index.set_direct_map_type(faiss.DirectMap.Hashtable)
+            try:
+                return index.reconstruct_batch(np.asarray(self.ids))
+            finally:
+                index.set_direct_map_type(faiss.DirectMap.NoMap)
+        # IndexIDMap keeps vectors in insertion order, which is ID order
+        return self._base_index().reconstruct_n(0, len(self.ids))
+
+    def rebuild_index(self, vectors: Optional[np.ndarray] = None):
+        """Retrain and rebuild the index from the stored vectors.
+
+        ``vectors`` (parallel to ``self.ids``) defaults to stored_vectors().
+        """
+        if vectors is None:
+            vectors = self.stored_vectors()
+        self.index = None
+        self._build_index(vectors)
+        if len(self.ids):
+            self.index.add_with_ids(vectors, np.asarray(self.ids))
+        logger.info(
+            f"✓ Rebuilt {self.index_type} index with {self.index.ntotal} vectors"
+        )
 
-    def search(self, query: str, top_k: int = 5) -> List[Dict]:
+    def evaluate_recall(
+        self, queries: Optional[List[str]] = None, top_k: int = 10
+    ) -> float:
+        """Recall@k of the configured index against exact float32 search.
+
+        Without ``queries``, up to 100 stored vectors are used as queries.
+        Compact stores re-embed the chunk texts (through the embedding cache,
+        if any) for the float32 truth, so quantization loss is included.
+        """
+        if self.compact:
+            vectors = self._encode_texts(self.chunks.texts())
+            exact = faiss.IndexFlatIP(self.dimension)
+        else:
+            vectors = np.asarray(self.embeddings)
+            exact = faiss.IndexFlatL2(self.dimension)
+
+        if queries is None:
+            sample = np.random.default_rng(0).permutation(len(self.ids))[:100]
+            query_vectors = vectors[np.sort(sample)]
+        else:
+            query_vectors = self.embed_queries(queries)
+
+        exact.add(vectors)
+        _, truth_rows = exact.search(query_vectors, top_k)
+        _, approx = self.index.search(query_vectors, top_k)
+
+        truth = np.asarray(self.ids)[truth_rows]
+        hits = sum(len(set(t) & set(a)) for t, a in zip(truth, approx))
+        return hits / truth.size
+
+    def _encode_texts(self, texts: List[str]) -> np.ndarray:
+        """Embed chunk texts, going through the embedding cache if configured."""
+
+        def encode(batch: List[str]) -> np.ndarray:
+            return self.model.encode(batch, show_progress_bar=True, batch_size=32)
+
+        if self.embedding_cache is None:
+            with instrumentation.span("ingest.encode", texts=len(texts)):
+                return self._prepare(encode(texts))
+
+        with instrumentation.span("ingest.encode", texts=len(texts)):
+            embeddings = self.embedding_cache.encode(self.embedding_key, texts, encode)
+        stats = self.embedding_cache.stats()
+        logger.info(
+            f"✓ Embedding cache: {stats['hits']} hits, {stats['misses']} misses "
+            f"({stats['hit_rate']:.0%} hit rate)"
+        )
+        return self._prepare(embeddings)
+
+    def _prepare(self, vectors) -> np.ndarray:
+        """float32 vectors for FAISS, L2-normalized for cosine if compact."""
+        vectors = np.array(vectors, dtype="float32")
+        if self.compact:
+            faiss.normalize_L2(vectors)
+        return vectors
+
+    def ids_for_sources(self, sources: List[str]) -> np.ndarray:
+        """Return the vector IDs of all chunks from the given sources."""
+        return self.filter_ids(SearchFilter(sources))
+
+    def filter_ids(self, search_filter: SearchFilter) -> np.ndarray:
+        """Ascending vector IDs of the chunks matching a filter.
+
+        Sources are looked up in the per-source range index, so only the
+        pages of the wanted documents are scanned.
+        """
+        if search_filter.sources is None:
+            rows = np.arange(len(self.ids))
+        else:
+            starts, ends, codes = self._source_ranges()
+            wanted = np.isin(codes, search_filter.source_codes(self.chunks))
+            runs = [np.arange(a, b) for a, b in zip(starts[wanted], ends[wanted])]
+            rows = np.sort(np.concatenate(runs)) if runs else np.empty(0, np.int64)
+        rows = rows[search_filter.page_mask(np.asarray(self.chunks.pages)[rows])]
+        return np.asarray(self.ids)[rows]
+
+    def _source_ranges(self) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Runs of consecutive rows (and so IDs) from one source.
+
+        A document's chunks are indexed together, so each source covers one
+        run, or a few after re-ingestion. Returns the start rows, end rows
+        and source code of each run.
+        """
+        if self._ranges_for is not self.chunks:
+            codes = np.asarray(self.chunks.source_codes)
+            starts = np.flatnonzero(np.diff(codes, prepend=-1))
+            ends = np.append(starts[1:], len(codes))
+            self._ranges = (starts, ends, codes[starts])
+            self._ranges_for = self.chunks
+        return self._ranges
+
+    def delete_ids(self, ids: np.ndarray) -> int:
+        """Remove chunks by vector ID. Returns the number removed."""
+        ids = np.asarray(ids, dtype=np.int64)
+        if self.index is None or len(ids) == 0:
+            return 0
+
+        keep = ~np.isin(self.ids, ids)
+        removed = int(len(keep) - keep.sum())
+        if self.index_type == "hnsw":
+            # HNSW graphs do not support removal; rebuild from what is left
+            remaining = self.stored_vectors()[keep]
+        self.chunks = self.chunks.take(np.flatnonzero(keep))
+        if not self.compact:
+            self.embeddings = np.asarray(self.embeddings)[keep]
+        self.ids = self.ids[keep]
+
+        if self.index_type == "hnsw":
+            self.rebuild_index(remaining)
+        else:
+            self.index.remove_ids(ids)
+
+        logger.info(f"✓ Removed {removed} vectors")
+        return int(removed)
+
+    def memory_bytes(self) -> int:
+        """Approximate bytes held by the index, embeddings and metadata."""
+        size = self.ids.nbytes + self.chunks.nbytes
+        if self.embeddings is not None:
+            size += self.embeddings.nbytes
+        if self.index is not None:
+            base = self._base_index()
+            if isinstance(base, faiss.IndexHNSW):
+                storage = faiss.downcast_index(base.storage)
+                per_vector = storage.code_size + self.index_params["hnsw_m"] * 8
+            else:
+                per_vector = base.code_size
+            # Plus the 8-byte ID kept by IndexIDMap or the inverted lists
+            size += self.index.ntotal * (per_vector + 8)
+        return int(size)
+
+    def embed_queries(self, queries: List[str]) -> np.ndarray:
+        """Embed query strings with the store's model."""
+        with instrumentation.span("retrieve.embed", queries=len(queries)):
+            vectors = self.model.encode(queries, batch_size=64)
+        return self._prepare(vectors)
+
+    def search(
+        self, query: str, top_k: int = 5, search_filter: Optional[SearchFilter] = None
+    ) -> List[Dict]:
         """Search for similar chunks."""
+        return self.search_many([query], top_k, search_filter)[0]
+
+    def search_many(
+        self,
+        queries: List[str],
+        top_k: int = 5,
+        search_filter: Optional[SearchFilter] = None,
+        query_vectors: Optional[np.ndarray] = None,
+    ) -> List[List[Dict]]:
+        """Search for many queries with one batched encode and FAISS search.
+
+        With ``search_filter`` FAISS only considers the matching vectors.
+        ``query_vectors`` from embed_queries() skips encoding the queries.
+        """
+        results = self.search_ids_many(queries, top_k, search_filter, query_vectors)
+        return [self.hydrate(ids, scores) for ids, scores in results]
+
+    def search_ids_many(
+        self,
+        queries: List[str],
+        top_k: int = 5,
+        search_filter: Optional[SearchFilter] = None,
+        query_vectors: Optional[np.ndarray] = None,
+    ) -> List[Tuple[np.ndarray, np.ndarray]]:
+        """Like search_many, but return (ids, scores) arrays per query.
+
+        No chunk is materialized; see hydrate().
+        """
         if self.index is None:
             raise ValueError("Index not built. Call index_chunks() first.")
+        if not queries:
+            return []
+
+        params = None
+        if search_filter is not None:
+            allowed = self.filter_ids(search_filter)
+            if len(allowed) == 0:
+                return [(allowed, np.empty(0, dtype=np.float32)) for _ in queries]
+            params = self._filter_params(allowed)
+
+        if query_vectors is None:
+            query_vectors = self.embed_queries(queries)
+
+        with instrumentation.span("retrieve.faiss", queries=len(queries)):
+            distances, labels = self.index.search(query_vectors, top_k, params=params)
+        # Label -1 pads queries with fewer than top_k vectors in the index
+        return [
+            (query_labels[query_labels >= 0], query_distances[query_labels >= 0])
+            for query_labels, query_distances in zip(labels, distances)
+        ]
 
-        query_vector = self.model.encode([query])
-        query_vector = np.array(query_vector).astype("float32")
+    def hydrate(
+        self, ids: np.ndarray, scores: np.ndarray, field: str = "score"
+    ) -> List[Dict]:
+        """Chunk dicts for vector IDs, in order, with each score under ``field``.
 
-        distances, indices = self.index.search(query_vector, top_k)
+        IDs no longer in the store (deleted since the search) are skipped.
+        """
+        ids = np.asarray(ids, dtype=np.int64)
+        if not len(ids) or not len(self.ids):
+            return []
+        rows = np.minimum(np.searchsorted(self.ids, ids), len(self.ids) - 1)
+        found = np.asarray(self.ids)[rows] == ids
 
         results = []
-        for idx, distance in zip(indices[0], distances[0]):
-            chunk = self.chunks[idx].copy()
-            chunk["score"] = float(distance)
+        for row, score in zip(rows[found], np.asarray(scores)[found]):
+            chunk = self.chunks[int(row)]
+            chunk[field] = float(score)
             results.append(chunk)
-
         return results
+
+    def _filter_params(self, allowed: np.ndarray) -> faiss.SearchParameters:
+        """Search parameters restricting FAISS to the ``allowed`` IDs.
+
+        IVF and HNSW search proportionally wider (nprobe / efSearch) as the
+        filter gets more selective, so about as many matching candidates are
+        visited as in an unfiltered search.
+        """
+        if allowed[-1] - allowed[0] + 1 == len(allowed):
+            selector = faiss.IDSelectorRange(int(allowed[0]), int(allowed[-1]) + 1)
+        else:
+            selector = faiss.IDSelectorBatch(allowed)
+        widen = len(self.ids) / len(allowed)
+
+        base = self._base_index()
+        if isinstance(base, faiss.IndexIVF):
+            nprobe = math.ceil(self.index_params["nprobe"] * widen)
+            params = faiss.SearchParametersIVF(
+                sel=selector, nprobe=min(nprobe, base.nlist)
+            )
+        elif isinstance(base, faiss.IndexHNSW):
+            ef = math.ceil(self.index_params["ef_search"] * widen)
+            params = faiss.SearchParametersHNSW(
+                sel=selector, efSearch=min(ef, len(self.ids))
+            )
+        else:
+            params = faiss.SearchParameters(sel=selector)
+        return params
+
+    def save(self, directory: str):
+        """Persist index, embeddings and chunk metadata to a directory."""
+        if self.index is None:
+            raise ValueError("Index not built. Call index_chunks() first.")
+
+        path = Path(directory)
+        path.mkdir(parents=True, exist_ok=True)
+
+        # Loaded stores may have these files mapped; replace, never truncate
+        replace_file(
+            path / "index.faiss", lambda tmp: faiss.write_index(self.index, tmp)
+        )
+        if not self.compact:
+            save_array(path / "embeddings.npy", self.embeddings)
+        save_array(path / "ids.npy", self.ids)
+        self.chunks.save(str(path / "chunks"))
+
+        manifest = {
+            "format_version": INDEX_FORMAT_VERSION,
+            "model_name": self.model_name,
+            "dimension": self.dimension,
+            "index_type": self.index_type,
+            "requested_index_type": self.requested_index_type,
+            "trained_on": self._trained_on,
+            "vector_dtype": self.vector_dtype,
+            "num_chunks": len(self.chunks),
+            "next_id": self.next_id,
+        }
+        write_text(path / "manifest.json", json.dumps(manifest, indent=2))
+        logger.info(f"✓ Saved index to {path}")
+
+    def load(self, directory: str, mmap: bool = True):
+        """Load an index written by save().
+
+        With ``mmap`` the FAISS index (unless IVF), embeddings and chunk
+        columns are memory-mapped read-only, so several processes can share
+        one copy through the OS page cache.
+        """
+        path = Path(directory)
+        manifest_path = path / "manifest.json"
+        if not manifest_path.exists():
+            raise ValueError(f"No saved index found in {path}")
+
+        manifest = json.loads(manifest_path.read_text())
+        if manifest["format_version"] != INDEX_FORMAT_VERSION:
+            raise ValueError(
+                f"Unsupported index format {manifest['format_version']} "
+                f"(expected {INDEX_FORMAT_VERSION})"
+            )
+        if manifest["model_name"] != self.model_name:
+            raise ValueError(
+                f"Index was built with {manifest['model_name']}, "
+                f"not {self.model_name}"
+            )
+        if manifest["dimension"] != self.dimension:
+            raise ValueError(
+                f"Index dimension {manifest['dimension']} does not match "
+                f"model dimension {self.dimension}"
+            )
+
+        # Mapped IVF lists are read-only OnDiskInvertedLists that can neither
+        # be added to nor cloned, so IVF indexes are always read into memory
+        flags = 0
+        if mmap and manifest["index_type"] not in ("ivf_flat", "ivf_pq"):
+            flags = faiss.IO_FLAG_MMAP | faiss.IO_FLAG_READ_ONLY
+        self._index_file = str(path / "index.faiss")
+        self.index = faiss.read_index(self._index_file, flags)
+        # Queries must be prepared the way the saved vectors were
+        self.vector_dtype = manifest["vector_dtype"]
+        self.embeddings = None
+        if not self.compact:
+            self.embeddings = np.load(
+                path / "embeddings.npy", mmap_mode="r" if mmap else None
+            )
+        self.chunks = ChunkStore.load(str(path / "chunks"), mmap=mmap)
+        self.ids = np.load(path / "ids.npy", mmap_mode="r" if mmap else None)
+        self.next_id = manifest["next_id"]
+        self.index_type = manifest["index_type"]
+        self.requested_index_type = manifest.get(
+            "requested_index_type", self.index_type
+        )
+        self._trained_on = manifest.get("trained_on", len(self.ids))
+        if self.index_type in ("ivf_flat", "ivf_pq") and not isinstance(
+            self._base_index(), faiss.IndexIVF
+        ):
+            # Older manifests named the requested type for a flat fallback
+            self.index_type = "flat"
+        self._apply_search_params()
+
+        logger.info(f"✓ Loaded {self.index.ntotal} vectors from {path}")
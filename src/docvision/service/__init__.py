@@ -0,0 +1,16 @@
+from typing import TYPE_CHECKING
+
+from docvision._lazy import lazy_exports
+
+__getattr__, __dir__, __all__ = lazy_exports(
+    __name__,
+    {
+        "MicroBatcher": ".batcher",
+        "QueryService": ".app",
+        "create_app": ".app",
+    },
+)
+
+if TYPE_CHECKING:
+    from .batcher import MicroBatcher
+    from .app import QueryService, create_app
@@ -0,0 +1,31 @@
+"""Run the HTTP service: ``python -m docvision.service``."""
+
+import argparse
+import logging
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--log-level", default="info")
+    args = parser.parse_args(argv)
+
+    try:
+        import uvicorn
+    except ImportError:
+        raise SystemExit(
+            "The HTTP service needs an ASGI server: pip install 'legalgpt[server]'"
+        )
+
+    from docvision.service import create_app
+
+    logging.basicConfig(
+        level=args.log_level.upper(), format="%(asctime)s %(name)s %(message)s"
+    )
+    # One process: the model and micro-batcher are shared by all requests
+    uvicorn.run(create_app(), host=args.host, port=args.port, log_level=args.log_level)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,432 @@
+"""ASGI application serving collections over HTTP.
+
+Written against the raw ASGI interface, so any ASGI server can run it
+without a web framework::
+
+    uvicorn docvision.service:create_app --factory
+
+Endpoints (JSON in and out unless noted):
+
+- ``GET /health``: the process is up.
+- ``GET /ready``: 200 once the embedding model is loaded and warmed, 503
+  before. The model loads in the background after the server starts.
+- ``GET /metrics``: stage latencies and counters in Prometheus text format.
+- ``POST /ingest``: ``{"collection", "paths"}`` or ``{"collection",
+  "directory"}`` for PDFs on the server under ``UPLOADS_PATH`` (relative
+  paths are taken from there), or a raw ``application/pdf`` body with
+  ``?collection=...&filename=...``. A ``directory`` is synced: documents of
+  the collection that are not in it are removed.
+- ``POST /search``: ``{"collection", "query", "top_k", "filters"}``,
+  retrieval only.
+- ``POST /query``: ``{"collection", "question", "top_k", "filters",
+  "stream", "timings"}``; with ``stream`` the answer is sent as server-sent
+  events.
+
+``filters`` is ``{"sources": [...], "page_min", "page_max"}``, any subset.
+"""
+
+from typing import Callable, Dict, Optional
+from pathlib import Path
+from urllib.parse import parse_qs
+import asyncio
+import json
+import logging
+
+from docvision.config import settings
+from docvision.core.collections import (
+    CollectionManager,
+    UnknownCollectionError,
+    validate_collection_name,
+)
+from docvision.core.pipeline import LegalGPT
+from docvision.generation import LLMClient
+from docvision.ingestion.pdf_loader import write_if_changed
+from docvision.observability import instrumentation
+from docvision.retrieval.filters import SearchFilter
+from .batcher import MicroBatcher
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_COLLECTION = "default"
+MAX_TOP_K = 100
+
+
+class HTTPError(Exception):
+    """Error that maps directly onto an HTTP status code."""
+
+    def __init__(self, status: int, message: str):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+
+
+class QueryService:
+    """ASGI app around a CollectionManager.
+
+    The embedding model is loaded once, in the background from ASGI
+    lifespan startup (or by an explicit ``await service.startup()``), and
+    wrapped in a MicroBatcher, so concurrent queries across all collections
+    share ``model.encode`` calls.
+    Pipeline calls run in worker threads to keep the event loop free.
+    """
+
+    def __init__(
+        self,
+        root: Optional[str] = None,
+        use_hybrid: Optional[bool] = None,
+        model=None,
+        llm_client: Optional[LLMClient] = None,
+    ):
+        self.root = root
+        self.use_hybrid = settings.service_hybrid if use_hybrid is None else use_hybrid
+        self._model = model
+        self._llm_client = llm_client
+        self.batcher: Optional[MicroBatcher] = None
+        self.collections: Optional[CollectionManager] = None
+        self.ready = False
+        self.error: Optional[str] = None
+        self._starting: Optional[asyncio.Future] = None
+        self.routes: Dict[tuple, Callable] = {
+            ("GET", "/health"): self.health,
+            ("GET", "/ready"): self.readiness,
+            ("GET", "/metrics"): self.metrics,
+            ("POST", "/ingest"): self.ingest,
+            ("POST", "/search"): self.search,
+            ("POST", "/query"): self.query,
+        }
+
+    def start(self) -> asyncio.Future:
+        """Start loading the model in the background; idempotent."""
+        if self._starting is None:
+            self._starting = asyncio.ensure_future(self._warm_up())
+        return self._starting
+
+    async def startup(self):
+        """Load the embedding model and start the batcher; wait until done."""
+        await self.start()
+        if self.error is not None:
+            raise RuntimeError(f"Service startup failed: {self.error}")
+
+    async def _warm_up(self):
+        try:
+            await asyncio.to_thread(self._load)
+        except Exception as e:
+            self.error = str(e)
+            logger.exception("⚠ Service startup failed")
+            return
+        self.ready = True
+        logger.info("✓ Service ready")
+
+    def _load(self):
+        model = self._model
+        if model is None:
+            logger.info(f"Loading embedding model: {settings.embedding_model}")
+            model = LegalGPT.make_embedding_model()
+        # The first encode pays for lazy initialisation; keep it off a request
+        model.encode(["warm up"])
+        self.batcher = MicroBatcher(
+            model, settings.service_batch_max_size, settings.service_batch_wait_ms
+        ).start()
+        self.collections = CollectionManager(
+            self.root,
+            use_hybrid=self.use_hybrid,
+            model=self.batcher,
+            llm_client=self._llm_client,
+        )
+
+    async def shutdown(self):
+        if self._starting is not None:
+            # A load in progress would start the batcher after we stop it
+            await self._starting
+        self.ready = False
+        if self.batcher is not None:
+            await asyncio.to_thread(self.batcher.stop)
+        if self.collections is not None:
+            self.collections.close()
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "lifespan":
+            await self._lifespan(receive, send)
+            return
+        if scope["type"] != "http":
+            return
+
+        path = scope["path"].rstrip("/") or "/"
+        handler = self.routes.get((scope["method"], path))
+        try:
+            if handler is None:
+                if any(route_path == path for _, route_path in self.routes):
+                    raise HTTPError(405, "Method not allowed")
+                raise HTTPError(404, "Not found")
+            await handler(scope, receive, send)
+        except HTTPError as e:
+            await send_json(send, e.status, {"error": e.message})
+        except UnknownCollectionError as e:
+            await send_json(send, 404, {"error": str(e)})
+        except Exception:
+            logger.exception(f"⚠ {scope['method']} {path} failed")
+            await send_json(send, 500, {"error": "Internal server error"})
+
+    async def _lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message["type"] == "lifespan.startup":
+                # Accept connections (health, readiness) while the model loads
+                self.start()
+                await send({"type": "lifespan.startup.complete"})
+            elif message["type"] == "lifespan.shutdown":
+                await self.shutdown()
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+
+    async def health(self, scope, receive, send):
+        await send_json(send, 200, {"status": "ok"})
+
+    async def readiness(self, scope, receive, send):
+        if self.error is not None:
+            await send_json(send, 503, {"status": "failed", "error": self.error})
+            return
+        if not self.ready:
+            await send_json(send, 503, {"status": "starting"})
+            return
+        await send_json(
+            send, 200, {"status": "ready", "loaded": self.collections.loaded()}
+        )
+
+    async def metrics(self, scope, receive, send):
+        body = instrumentation.prometheus().encode()
+        await send_response(send, 200, body, b"text/plain; version=0.0.4")
+
+    async def ingest(self, scope, receive, send):
+        collections = self._collections()
+        if header(scope, b"content-type").startswith("application/pdf"):
+            params = parse_qs(scope.get("query_string", b"").decode())
+            name = params.get("collection", [DEFAULT_COLLECTION])[0]
+            filename = Path(params.get("filename", [""])[0]).name
+            if not filename.lower().endswith(".pdf"):
+                raise HTTPError(400, "filename must name a .pdf file")
+            checked_name(name)
+            data = await read_body(receive)
+
+            path = Path(settings.uploads_path) / name / filename
+            path.parent.mkdir(parents=True, exist_ok=True)
+            await asyncio.to_thread(write_if_changed, path, data)
+            indexed = await asyncio.to_thread(
+                collections.add_documents, name, [str(path)]
+            )
+            await send_json(send, 200, {"collection": name, "indexed": indexed})
+            return
+
+        body = await read_json(receive)
+        name = collection_name(body)
+        if "directory" in body:
+            directory = upload_path(body["directory"])
+            # Syncing a missing directory would remove every document
+            if not directory.is_dir():
+                raise HTTPError(400, f"{body['directory']!r} is not a directory")
+            changes = await asyncio.to_thread(
+                collections.sync_directory, name, str(directory)
+            )
+            await send_json(send, 200, {"collection": name, **changes})
+        elif "paths" in body:
+            if not isinstance(body["paths"], list):
+                raise HTTPError(400, "'paths' must be a list")
+            paths = [str(upload_path(p)) for p in body["paths"]]
+            indexed = await asyncio.to_thread(collections.add_documents, name, paths)
+            await send_json(send, 200, {"collection": name, "indexed": indexed})
+        else:
+            raise HTTPError(400, "Expected 'paths', 'directory' or a PDF body")
+
+    async def search(self, scope, receive, send):
+        collections = self._collections()
+        body = await read_json(receive)
+        name = collection_name(body)
+        query = required_text(body, "query")
+        top_k = parse_top_k(body)
+        search_filter = parse_filter(body)
+
+        pipeline = await asyncio.to_thread(collections.get, name)
+        result = await asyncio.to_thread(pipeline.search, query, top_k, search_filter)
+        await send_json(send, 200, {"collection": name, **result})
+
+    async def query(self, scope, receive, send):
+        collections = self._collections()
+        body = await read_json(receive)
+        name = collection_name(body)
+        question = required_text(body, "question")
+        top_k = parse_top_k(body)
+        search_filter = parse_filter(body)
+
+        if body.get("stream"):
+            pipeline = await asyncio.to_thread(collections.get, name)
+            result = await pipeline.astream_query(question, top_k, search_filter)
+            await self._stream(send, name, result)
+            return
+
+        result = await asyncio.to_thread(
+            collections.query,
+            name,
+            question,
+            top_k=top_k,
+            timings=bool(body.get("timings")),
+            search_filter=search_filter,
+        )
+        await send_json(send, 200, {"collection": name, **result})
+
+    async def _stream(self, send, name: str, result: Dict):
+        """Send the answer as server-sent events, sources first."""
+        await send(
+            {
+                "type": "http.response.start",
+                "status": 200,
+                "headers": [
+                    (b"content-type", b"text/event-stream"),
+                    (b"cache-control", b"no-cache"),
+                ],
+            }
+        )
+        answer_stream = result.pop("answer_stream")
+        await send_event(send, {"collection": name, **result})
+        try:
+            async for delta in answer_stream:
+                await send_event(send, {"delta": delta})
+        except Exception as e:
+            # The status line is already sent; report the failure in-band
+            logger.exception("⚠ Answer stream failed")
+            await send_event(send, {"error": str(e)})
+        await send(
+            {
+                "type": "http.response.body",
+                "body": b"data: [DONE]\n\n",
+                "more_body": False,
+            }
+        )
+
+    def _collections(self) -> CollectionManager:
+        if self.error is not None:
+            raise HTTPError(503, "Service failed to start")
+        if not self.ready:
+            raise HTTPError(503, "Service is starting")
+        return self.collections
+
+
+def create_app() -> QueryService:
+    """Build the service from settings."""
+    return QueryService()
+
+
+def header(scope, name: bytes) -> str:
+    for key, value in scope.get("headers", []):
+        if key.lower() == name:
+            return value.decode("latin-1")
+    return ""
+
+
+async def read_body(receive) -> bytes:
+    """Read the full request body, bounded by SERVICE_MAX_BODY_MB."""
+    limit = settings.service_max_body_mb * 2**20
+    parts, size = [], 0
+    while True:
+        message = await receive()
+        if message["type"] == "http.disconnect":
+            raise HTTPError(400, "Client disconnected")
+        part = message.get("body", b"")
+        size += len(part)
+        if size > limit:
+            raise HTTPError(413, "Request body too large")
+        parts.append(part)
+        if not message.get("more_body"):
+            return b"".join(parts)
+
+
+async def read_json(receive) -> Dict:
+    try:
+        body = json.loads(await read_body(receive) or b"{}")
+    except json.JSONDecodeError:
+        raise HTTPError(400, "Invalid JSON body")
+    if not isinstance(body, dict):
+        raise HTTPError(400, "Expected a JSON object")
+    return body
+
+
+def collection_name(body: Dict) -> str:
+    name = body.get("collection", DEFAULT_COLLECTION)
+    if not isinstance(name, str):
+        raise HTTPError(400, "'collection' must be a string")
+    return checked_name(name)
+
+
+def checked_name(name: str) -> str:
+    try:
+        return validate_collection_name(name)
+    except ValueError as e:
+        raise HTTPError(400, str(e))
+
+
+def upload_path(value) -> Path:
+    """Resolve a client-supplied path, which must lie under UPLOADS_PATH."""
+    if not isinstance(value, str) or not value:
+        raise HTTPError(400, "Paths must be non-empty strings")
+    root = Path(settings.uploads_path).resolve()
+    path = (root / value).resolve()
+    if not path.is_relative_to(root):
+        raise HTTPError(403, f"{value!r} is outside the uploads directory")
+    return path
+
+
+def parse_filter(body: Dict) -> Optional[SearchFilter]:
+    try:
+        return SearchFilter.from_dict(body.get("filters"))
+    except ValueError as e:
+        raise HTTPError(400, str(e))
+
+
+def required_text(body: Dict, field: str) -> str:
+    value = body.get(field)
+    if not isinstance(value, str) or not value.strip():
+        raise HTTPError(400, f"'{field}' must be a non-empty string")
+    return value
+
+
+def parse_top_k(body: Dict) -> int:
+    top_k = body.get("top_k", 5)
+    if not isinstance(top_k, int) or not 1 <= top_k <= MAX_TOP_K:
+        raise HTTPError(400, f"'top_k' must be an integer from 1 to {MAX_TOP_K}")
+    return top_k
+
+
+def _json_default(value):
+    # numpy scalars in scores and timings
+    if hasattr(value, "item"):
+        return value.item()
+    raise TypeError(f"{type(value).__name__} is not JSON serializable")
+
+
+async def send_response(send, status: int, body: bytes, content_type: bytes):
+    await send(
+        {
+            "type": "http.response.start",
+            "status": status,
+            "headers": [
+                (b"content-type", content_type),
+                (b"content-length", str(len(body)).encode()),
+            ],
+        }
+    )
+    await send({"type": "http.response.body", "body": body})
+
+
+async def send_json(send, status: int, payload: Dict):
+    body = json.dumps(payload, default=_json_default).encode()
+    await send_response(send, status, body, b"application/json")
+
+
+async def send_event(send, payload: Dict):
+    data = json.dumps(payload, default=_json_default)
+    await send(
+        {
+            "type": "http.response.body",
+            "body": f"data: {data}\n\n".encode(),
+            "more_body": True,
+        }
+    )
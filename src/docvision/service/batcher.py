@@ -0,0 +1,135 @@
+"""Dynamic micro-batching of query embeddings."""
+
+from typing import Dict, List, Optional, Tuple
+from concurrent.futures import Future
+import logging
+import queue
+import threading
+import time
+import numpy as np
+
+from docvision.observability import instrumentation
+
+logger = logging.getLogger(__name__)
+
+# encode() settings that change how a call runs but not the vectors it
+# returns; batched calls use the batcher's own
+RUN_SETTINGS = ("batch_size", "show_progress_bar")
+
+
+class MicroBatcher:
+    """Stand-in for an embedding model that coalesces concurrent encodes.
+
+    Small ``encode`` calls (single queries) from any number of threads are
+    queued; a worker thread takes the first one, waits up to ``max_wait_ms``
+    for more, and embeds them all in one ``model.encode`` call of at most
+    ``max_batch_size`` texts. Only calls passing the same ``encode`` keyword
+    arguments (other than ``RUN_SETTINGS``) share a model call. Calls with
+    ``max_batch_size`` or more texts, such as ingestion batches, go straight
+    to the model. Every other
+    attribute is forwarded to the wrapped model, so the batcher can be passed
+    wherever a SentenceTransformer is expected.
+    """
+
+    def __init__(self, model, max_batch_size: int = 64, max_wait_ms: float = 5.0):
+        self.model = model
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        # (texts, encode options, future), or None to stop
+        self._queue: "queue.Queue[Optional[Tuple]]" = queue.Queue()
+        self._thread: Optional[threading.Thread] = None
+        self._start_lock = threading.Lock()
+
+    def __getattr__(self, name):
+        return getattr(self.model, name)
+
+    def start(self) -> "MicroBatcher":
+        with self._start_lock:
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._run, name="micro-batcher", daemon=True
+                )
+                self._thread.start()
+        return self
+
+    def stop(self):
+        with self._start_lock:
+            if self._thread is not None:
+                self._queue.put(None)
+                self._thread.join()
+                self._thread = None
+
+    def encode(self, texts: List[str], **kwargs) -> np.ndarray:
+        """Embed texts, batched with whatever other calls are in flight."""
+        if isinstance(texts, str) or len(texts) >= self.max_batch_size:
+            return self.model.encode(texts, **kwargs)
+        if not texts:
+            return np.empty((0, self.model.get_sentence_embedding_dimension()))
+
+        self.start()
+        options = {k: v for k, v in kwargs.items() if k not in RUN_SETTINGS}
+        future: Future = Future()
+        self._queue.put((list(texts), options, future))
+        return future.result()
+
+    def _run(self):
+        while True:
+            first = self._queue.get()
+            if first is None:
+                return
+            batch = [first]
+            size = len(first[0])
+            deadline = time.monotonic() + self.max_wait
+            stopping = False
+            while size < self.max_batch_size:
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    break
+                try:
+                    item = self._queue.get(timeout=timeout)
+                except queue.Empty:
+                    break
+                if item is None:
+                    stopping = True
+                    break
+                batch.append(item)
+                size += len(item[0])
+
+            self._encode_batch(batch)
+            if stopping:
+                return
+
+    def _encode_batch(self, batch: List[Tuple[List[str], Dict, Future]]):
+        """Encode queued calls, one model call per distinct set of options."""
+        groups: List[Tuple[Dict, List[Tuple]]] = []
+        for item in batch:
+            # Options may hold unhashable values, so compare them in turn
+            for options, items in groups:
+                if options == item[1]:
+                    items.append(item)
+                    break
+            else:
+                groups.append((item[1], [item]))
+        for options, items in groups:
+            self._encode_group(items, options)
+
+    def _encode_group(self, batch: List[Tuple[List[str], Dict, Future]], options):
+        texts = [text for item_texts, _, _ in batch for text in item_texts]
+        try:
+            with instrumentation.span(
+                "retrieve.embed_batch", calls=len(batch), texts=len(texts)
+            ):
+                vectors = np.asarray(
+                    self.model.encode(texts, batch_size=self.max_batch_size, **options)
+                )
+        except Exception as e:
+            for _, _, future in batch:
+                future.set_exception(e)
+            return
+
+        instrumentation.count("batcher.batches")
+        instrumentation.count("batcher.calls", len(batch))
+        start = 0
+        for item_texts, _, future in batch:
+            future.set_result(vectors[start : start + len(item_texts)])
+            start += len(item_texts)
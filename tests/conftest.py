@@ -1,4 +1,6 @@
 import os
+import pytest
+import numpy as np
 from pydantic_settings import BaseSettings
 
 # Set dummy environment variables before defining Settings
@@ -9,6 +11,8 @@ os.environ["CHUNK_SIZE"] = "1000"
 os.environ["CHUNK_OVERLAP"] = "200"
 os.environ["ELASTICSEARCH_HOST"] = "localhost:9200"
 os.environ["ELASTICSEARCH_INDEX"] = "documents"
+os.environ["EMBEDDING_CACHE_PATH"] = ""
+os.environ["EXTRACTION_CACHE_PATH"] = ""
 
 
 class Settings(BaseSettings):
@@ -27,3 +31,94 @@ settings = Settings()
 # @pytest.fixture(autouse=True)
 # def set_env():
 #     ...
+
+
+class FakeEmbeddingModel:
+    """Deterministic bag-of-words stand-in for SentenceTransformer."""
+
+    dimension = 32
+
+    def get_sentence_embedding_dimension(self):
+        return self.dimension
+
+    def encode(self, texts, **kwargs):
+        import numpy as np
+        import zlib
+
+        vectors = np.zeros((len(texts), self.dimension), dtype="float32")
+        for row, text in enumerate(texts):
+            for word in text.lower().split():
+                vectors[row, zlib.crc32(word.encode()) % self.dimension] += 1.0
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        return vectors / np.maximum(norms, 1e-12)
+
+
+def make_chunks(texts, source="doc.pdf"):
+    return [
+        {"text": text, "source": source, "page": i + 1, "chunk_id": i}
+        for i, text in enumerate(texts)
+    ]
+
+
+@pytest.fixture
+def pipeline(monkeypatch):
+    """LegalGPT wired to the fake embedding model (vector-only mode)."""
+    from docvision.core import pipeline as pipeline_module
+    from docvision.retrieval import VectorStore
+
+    monkeypatch.setattr(
+        pipeline_module,
+        "VectorStore",
+        lambda model_name, model=None, **kwargs: VectorStore(
+            model_name, model=model or FakeEmbeddingModel(), **kwargs
+        ),
+    )
+    return pipeline_module.LegalGPT()
+
+
+class FakeKeywordStore:
+    """In-memory stand-in for KeywordStore scoring by shared-term count."""
+
+    def __init__(self, chunks):
+        self.chunks = chunks
+        self.calls = []
+
+    def search(self, query, top_k=5, search_filter=None):
+        self.calls.append(("search", query))
+        return self._hydrate(*self._search(query, top_k, search_filter))
+
+    def search_many(self, queries, top_k=5, search_filter=None):
+        self.calls.append(("search_many", list(queries)))
+        return [
+            self._hydrate(*self._search(query, top_k, search_filter))
+            for query in queries
+        ]
+
+    def search_ids_many(self, queries, top_k=5, search_filter=None):
+        self.calls.append(("search_ids_many", list(queries)))
+        return [self._search(query, top_k, search_filter) for query in queries]
+
+    def _hydrate(self, ids, scores):
+        return [
+            {**self.chunks[i], "score": float(score)} for i, score in zip(ids, scores)
+        ]
+
+    def _search(self, query, top_k, search_filter):
+        """Positional IDs and scores of the best matches, best first."""
+        terms = set(query.lower().split())
+        keep = np.ones(len(self.chunks), dtype=bool)
+        if search_filter is not None:
+            from docvision.retrieval import ChunkStore
+
+            keep = search_filter.row_mask(ChunkStore.from_chunks(self.chunks))
+        scored = [
+            (len(terms & set(chunk["text"].lower().split())), i)
+            for i, chunk in enumerate(self.chunks)
+            if keep[i]
+        ]
+        ranked = sorted((s for s in scored if s[0] > 0), key=lambda s: (-s[0], s[1]))
+        ranked = ranked[:top_k]
+        return (
+            np.asarray([i for _, i in ranked], dtype=np.int64),
+            np.asarray([score for score, _ in ranked], dtype=np.float64),
+        )
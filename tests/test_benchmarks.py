@@ -0,0 +1,70 @@
+from benchmarks.load import run_load
+from benchmarks.run import bench_search, compare
+from benchmarks.synthetic import generate_chunks, generate_queries
+
+CONFIG = {
+    "model": "hashing",
+    "index_type": "flat",
+    "top_k": 10,
+    "num_queries": 50,
+    "batch_size": 16,
+    "seed": 0,
+}
+
+
+def test_synthetic_corpus_is_reproducible():
+    chunks = generate_chunks(500, seed=3)
+    assert chunks == generate_chunks(500, seed=3)
+    assert len({(c["source"], c["chunk_id"]) for c in chunks}) == 500
+
+    for query, target in generate_queries(chunks, 20):
+        terms = query.removeprefix("Which clause covers ").rstrip("?").split()
+        assert all(term in chunks[target]["text"] for term in terms)
+
+
+def test_vector_benchmark_reports_latency_and_recall():
+    report = bench_search("vector", 500, CONFIG)
+
+    assert report["queries"] == 50
+    assert report["latency"]["p50_ms"] <= report["latency"]["p99_ms"]
+    assert report["qps_batched"] > 0
+    assert report["recall@10"] >= 0.9
+
+
+def test_compare_flags_regressions():
+    case = {
+        "store": "vector",
+        "chunks": 1000,
+        "latency": {"p95_ms": 1.0, "p99_ms": 2.0},
+        "qps_batched": 1000.0,
+        "peak_rss_mb": 500.0,
+        "recall@10": 0.95,
+    }
+    slower = {**case, "latency": {"p95_ms": 1.5, "p99_ms": 2.1}, "recall@10": 0.9}
+
+    assert compare({"search": [case]}, {"search": [case]}) == []
+    assert compare({"search": [case]}, {"search": [slower]}) == [
+        "vector@1000 p95_ms: 1.0 -> 1.5",
+        "vector@1000 recall@10: 0.95 -> 0.9",
+    ]
+
+
+def test_load_harness_reports_throughput_and_tail_latency():
+    config = {
+        "hybrid": False,
+        "top_k": 3,
+        "docs": 2,
+        "pages_per_doc": 2,
+        "duration": 1.0,
+        "ingest_interval": 0.1,
+        "ingest_docs": 2,
+        "token_delay": 0.0,
+        "answer_cache": False,
+        "seed": 0,
+    }
+    report = run_load(4, config)
+
+    assert report["errors"] == 0
+    assert report["queries"] > 0 and report["throughput_qps"] > 0
+    assert report["latency"]["p50_ms"] <= report["latency"]["p99_ms"]
+    assert report["ingests"] == 2
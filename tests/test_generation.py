@@ -0,0 +1,127 @@
+import asyncio
+import time
+
+import numpy as np
+import pytest
+
+from docvision.generation import ContextPacker, LLMClient, SemanticCache
+from docvision.ingestion import TextChunker
+from docvision.generation.stub_server import StubLLMServer
+
+CHUNKS = [
+    {"text": "Notice is ninety days.", "source": "msa.pdf", "page": 3, "chunk_id": 0}
+]
+
+
+@pytest.fixture
+def stub():
+    server = StubLLMServer(token_delay=0.01).start()
+    yield server
+    server.stop()
+
+
+def test_generate_answer_against_stub(stub):
+    client = LLMClient("test-key", "stub-model", base_url=stub.base_url)
+
+    result = client.generate_answer("What is the notice period?", CHUNKS)
+
+    assert result["answer"] == stub.answer
+    assert result["sources"] == [{"document": "msa.pdf", "page": 3}]
+    assert "ninety days" in stub.requests[0]["messages"][1]["content"]
+
+
+def test_stream_answer_yields_tokens(stub):
+    client = LLMClient("test-key", "stub-model", base_url=stub.base_url)
+
+    tokens = list(client.stream_answer("What is the notice period?", CHUNKS))
+
+    assert tokens == stub.tokens()
+    assert "".join(tokens) == stub.answer
+    assert stub.requests[0]["stream"] is True
+
+
+def test_async_streams_respect_concurrency_limit(stub):
+    client = LLMClient(
+        "test-key", "stub-model", base_url=stub.base_url, max_concurrency=2
+    )
+
+    async def consume():
+        return "".join(
+            [delta async for delta in client.astream_answer("Notice period?", CHUNKS)]
+        )
+
+    async def main():
+        try:
+            return await asyncio.gather(*(consume() for _ in range(6)))
+        finally:
+            await client.aclose()
+
+    answers = asyncio.run(main())
+
+    assert answers == [stub.answer] * 6
+    assert stub.max_active <= 2
+
+
+def unit(*values):
+    vector = np.array(values, dtype="float32")
+    return vector / np.linalg.norm(vector)
+
+
+def test_semantic_cache_matches_similar_question_and_same_context():
+    cache = SemanticCache(threshold=0.9)
+    context = cache.context_key(CHUNKS, index_version=1)
+    cache.store(unit(1, 0, 0), context, {"answer": "90 days", "sources": []})
+
+    assert cache.lookup(unit(1, 0.1, 0), context)["answer"] == "90 days"
+    assert cache.lookup(unit(0, 1, 0), context) is None
+    assert cache.lookup(unit(1, 0, 0), cache.context_key(CHUNKS, 2)) is None
+    assert cache.stats()["hits"] == 1
+    assert cache.stats()["misses"] == 2
+
+
+def test_semantic_cache_expires_and_evicts():
+    cache = SemanticCache(max_entries=2, ttl=0.05)
+    contexts = [cache.context_key([{**CHUNKS[0], "page": p}], 1) for p in range(3)]
+    for context in contexts:
+        cache.store(unit(1, 0, 0), context, {"answer": "a"})
+
+    assert cache.stats()["entries"] == 2
+    assert cache.lookup(unit(1, 0, 0), contexts[0]) is None
+    time.sleep(0.06)
+    assert cache.lookup(unit(1, 0, 0), contexts[2]) is None
+
+
+def test_context_packer_merges_overlap_and_drops_duplicates():
+    text = " ".join(f"Clause {i} binds the tenant for term {i}." for i in range(12))
+    chunks = TextChunker(chunk_size=120, chunk_overlap=60).chunk_text(text, "lease.pdf")
+    assert len(chunks) > 3
+    duplicate = {**chunks[0], "source": "copy.pdf", "chunk_id": 0}
+    retrieved = [chunks[2], chunks[0], duplicate, chunks[1], chunks[3]]
+
+    packed = ContextPacker(max_tokens=10_000).pack(retrieved)
+
+    # chunks 0-3 become one passage, written without the repeated overlap
+    assert [p["chunk_ids"] for p in packed["passages"]] == [[0, 1, 2, 3]]
+    merged = packed["passages"][0]["text"]
+    assert merged.count("Clause 1 binds") == 1
+    assert merged.startswith(chunks[0]["text"])
+    assert merged.endswith(chunks[3]["text"])
+    assert packed["dropped"] == 1
+    assert packed["tokens"] == ContextPacker().count_tokens(packed["context"])
+
+
+def test_context_packer_respects_token_budget():
+    chunks = [
+        {"text": "a " * 200, "source": "long.pdf", "page": 1, "chunk_id": 0},
+        {"text": "notice is ninety days", "source": "msa.pdf", "page": 2},
+        {"text": "rent is due monthly", "source": "lease.pdf", "page": 5},
+    ]
+    packer = ContextPacker(max_tokens=40)
+
+    packed = packer.pack(chunks)
+    assert [p["source"] for p in packed["passages"]] == ["msa.pdf", "lease.pdf"]
+    assert packed["tokens"] <= 40
+
+    truncated = packer.pack(chunks[:1])
+    assert truncated["tokens"] <= 40
+    assert truncated["passages"][0]["text"].startswith("a a")
@@ -1,4 +1,11 @@
-from docvision.ingestion import TextChunker
+import re
+
+from pypdf import PageObject, PdfReader, PdfWriter
+
+from benchmarks.synthetic import write_pdf
+from docvision.ingestion import PageCache, PDFLoader, TextChunker
+from docvision.ingestion import pdf_loader
+from docvision.ingestion.pdf_loader import format_document
 
 
 def test_text_chunker():
@@ -9,3 +16,141 @@ def test_text_chunker():
     assert len(chunks) > 0
     assert all("text" in c for c in chunks)
     assert all("source" in c for c in chunks)
+
+
+class WhitespaceTokenizer:
+    """Tokenizer stand-in with the Hugging Face call signature."""
+
+    def __call__(self, texts, add_special_tokens=True, return_offsets_mapping=False):
+        if return_offsets_mapping:
+            spans = [m.span() for m in re.finditer(r"\S+", texts)]
+            return {"input_ids": list(range(len(spans))), "offset_mapping": spans}
+        return {"input_ids": [text.split() for text in texts]}
+
+
+def test_chunks_get_the_page_they_start_on():
+    pages = [
+        "Rent is due monthly. Late payments accrue interest.",
+        "The term is one year. Either party may terminate. Notice must be written.",
+    ]
+    chunker = TextChunker(chunk_size=60, chunk_overlap=0)
+    chunks = chunker.chunk_text(format_document(pages), "lease.pdf")
+
+    assert [(c["text"], c["page"]) for c in chunks] == [
+        ("Rent is due monthly. Late payments accrue interest.", 1),
+        ("The term is one year. Either party may terminate.", 2),
+        ("Notice must be written.", 2),
+    ]
+    assert all("--- Page" not in c["text"] for c in chunks)
+
+
+def test_chunks_respect_token_budget_and_overlap():
+    text = "One two three. Four five six. Seven eight nine. " + "word " * 25
+    chunker = TextChunker(
+        chunk_size=1000, chunk_overlap=20, tokenizer=WhitespaceTokenizer(), max_tokens=7
+    )
+    chunks = chunker.chunk_text(text, "doc.pdf")
+
+    assert [len(c["text"].split()) for c in chunks] == [6, 6, 7, 7, 7, 7]
+    assert chunks[1]["text"] == "Four five six. Seven eight nine."
+    assert [c["chunk_id"] for c in chunks] == list(range(len(chunks)))
+
+    store = chunker.chunk_store(text, "doc.pdf")
+    assert list(store) == chunks
+
+
+def test_pdf_loader_streams_pages_from_process_pool(tmp_path):
+    write_pdf(tmp_path / "a.pdf", ["first page", "second page"])
+    write_pdf(tmp_path / "b.pdf", ["only page"])
+    (tmp_path / "broken.pdf").write_bytes(b"not a pdf")
+
+    loader = PDFLoader(workers=2, max_pending=1)
+    paths = [tmp_path / "a.pdf", tmp_path / "broken.pdf", tmp_path / "b.pdf"]
+    records = list(loader.iter_pages(paths))
+
+    assert [(r["source"], r["page"], r["text"]) for r in records] == [
+        ("a.pdf", 1, "first page"),
+        ("a.pdf", 2, "second page"),
+        ("b.pdf", 1, "only page"),
+    ]
+
+    # One pool, not forked from the caller, serves every later call
+    pool = loader._executor
+    assert pool._mp_context.get_start_method() != "fork"
+    assert len(list(loader.iter_pages(paths[::-1]))) == 3
+    assert loader._executor is pool
+    loader.close()
+
+    single = PDFLoader(workers=2)
+    assert len(list(single.iter_pages(paths[:1]))) == 2
+    assert single._executor is None
+
+
+def test_streamed_chunks_match_batch_chunking(tmp_path):
+    write_pdf(tmp_path / "a.pdf", ["Test sentence. " * 20, "Another page."])
+    loader = PDFLoader(workers=1)
+    chunker = TextChunker(chunk_size=100, chunk_overlap=20)
+
+    documents = loader.load_directory(str(tmp_path))
+    streamed = list(chunker.iter_chunks(loader.iter_documents([tmp_path / "a.pdf"])))
+
+    assert streamed == chunker.chunk_documents(documents)
+
+
+def test_page_cache_skips_extraction_of_unchanged_files(tmp_path, monkeypatch):
+    write_pdf(tmp_path / "a.pdf", ["first page", "second page"])
+    cache = PageCache(str(tmp_path / "pages.sqlite"))
+    extracted = []
+    extract_page_records = pdf_loader.extract_page_records
+
+    def counting(file_path):
+        extracted.append(file_path)
+        return extract_page_records(file_path)
+
+    monkeypatch.setattr(pdf_loader, "extract_page_records", counting)
+    stored = []
+    put = cache.put
+    monkeypatch.setattr(
+        cache, "put", lambda key, records: stored.append(key) or put(key, records)
+    )
+    loader = PDFLoader(workers=1, cache=cache)
+    first = list(loader.iter_pages([tmp_path / "a.pdf"]))
+    again = list(loader.iter_pages([tmp_path / "a.pdf"]))
+
+    assert again == first
+    assert len(extracted) == len(stored) == 1
+    assert cache.stats()["hits"] == 1
+
+    write_pdf(tmp_path / "a.pdf", ["changed page"])
+    changed = list(loader.iter_pages([tmp_path / "a.pdf"]))
+    assert [r["text"] for r in changed] == ["changed page"]
+    assert len(extracted) == 2
+
+
+def test_pages_without_text_are_skipped_and_failures_recorded(tmp_path, monkeypatch):
+    write_pdf(tmp_path / "text.pdf", ["first page", "second page", "third page"])
+    writer = PdfWriter()
+    for page in PdfReader(tmp_path / "text.pdf").pages:
+        writer.add_page(page)
+    writer.insert_blank_page(612, 792, index=1)
+    writer.write(tmp_path / "doc.pdf")
+
+    extract_text = PageObject.extract_text
+
+    def flaky(page, *args, **kwargs):
+        text = extract_text(page, *args, **kwargs)
+        if text == "third page":
+            raise ValueError("bad font")
+        return text
+
+    monkeypatch.setattr(PageObject, "extract_text", flaky)
+    loader = PDFLoader(workers=1)
+    records = list(loader.iter_pages([tmp_path / "doc.pdf"]))
+
+    assert [(r["page"], r["text"], r["status"]) for r in records] == [
+        (1, "first page", "ok"),
+        (2, "", "empty"),
+        (3, "second page", "ok"),
+        (4, "", "failed"),
+    ]
+    assert loader.failures == {"doc.pdf": {4: "ValueError: bad font"}}
@@ -0,0 +1,87 @@
+from benchmarks.synthetic import write_pdf
+from docvision.generation import LLMClient
+from docvision.generation.stub_server import StubLLMServer
+from docvision.observability import (
+    HistogramExporter,
+    Instrumentation,
+    OpenTelemetryExporter,
+    Span,
+)
+
+
+def make_span(name, ms):
+    span = Span(name, "trace", None)
+    span.end_ns = span.start_ns + int(ms * 1e6)
+    return span
+
+
+def test_histogram_summary_and_prometheus():
+    histogram = HistogramExporter()
+    for ms in range(1, 101):
+        histogram.export(make_span("retrieve.faiss", ms))
+
+    summary = histogram.summary()["retrieve.faiss"]
+    assert summary["count"] == 100
+    assert 49 <= summary["p50_ms"] <= 52
+    assert 98 <= summary["p99_ms"] <= 100
+
+    text = histogram.render_prometheus({"queries": 3})
+    assert 'stage="retrieve.faiss",le="0.01"} 10' in text
+    assert 'stage="retrieve.faiss",le="+Inf"} 100' in text
+    assert 'docvision_events_total{event="queries"} 3' in text
+
+
+def test_spans_nest_within_request_trace():
+    instrumentation = Instrumentation()
+    with instrumentation.trace_request() as trace:
+        with instrumentation.span("outer") as outer:
+            with instrumentation.span("inner") as inner:
+                pass
+
+    assert inner.parent_id == outer.span_id
+    assert {span.trace_id for span in trace.spans} == {trace.trace_id}
+    assert list(trace.breakdown()) == ["inner", "outer"]
+
+
+def test_opentelemetry_exporter_forwards_spans():
+    class FakeOtelSpan:
+        def __init__(self, name, start_time, attributes):
+            self.name, self.start, self.attributes = name, start_time, attributes
+
+        def end(self, end_time):
+            self.end_time = end_time
+
+    class FakeTracer:
+        spans = []
+
+        def start_span(self, name, start_time, attributes):
+            self.spans.append(FakeOtelSpan(name, start_time, attributes))
+            return self.spans[-1]
+
+    instrumentation = Instrumentation()
+    tracer = FakeTracer()
+    instrumentation.add_exporter(OpenTelemetryExporter(tracer))
+    with instrumentation.span("llm.generate", model="stub"):
+        pass
+
+    (exported,) = tracer.spans
+    assert exported.name == "llm.generate"
+    assert exported.attributes["model"] == "stub"
+    assert exported.end_time >= exported.start
+
+
+def test_query_reports_stage_timings(pipeline, tmp_path):
+    write_pdf(tmp_path / "msa.pdf", ["termination needs ninety days notice"])
+    pipeline.ingest_documents(str(tmp_path))
+    stub = StubLLMServer().start()
+    try:
+        pipeline.llm_client = LLMClient("test-key", "stub", base_url=stub.base_url)
+        result = pipeline.query("termination notice", top_k=1, timings=True)
+    finally:
+        stub.stop()
+
+    timings = result["timings"]
+    for stage in ("query.retrieve", "retrieve.faiss", "llm.generate", "query.total"):
+        assert stage in timings
+    assert timings["query.total"] >= timings["query.retrieve"]
+    assert "timings" not in pipeline.query("termination notice", top_k=1)
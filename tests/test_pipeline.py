@@ -0,0 +1,374 @@
+import asyncio
+import os
+import subprocess
+import sys
+import threading
+import faiss
+import pytest
+
+from benchmarks.synthetic import write_pdf
+from docvision.config import settings
+from docvision.core import CollectionManager
+from docvision.generation import LLMClient
+from docvision.generation.stub_server import StubLLMServer
+from docvision.ingestion.pdf_loader import format_document
+from tests.conftest import FakeEmbeddingModel
+
+
+def test_sync_directory_only_reindexes_changes(pipeline, tmp_path):
+    write_pdf(tmp_path / "lease.pdf", ["rent is due monthly"])
+    write_pdf(tmp_path / "nda.pdf", ["confidential information stays private"])
+    pipeline.ingest_documents(str(tmp_path))
+    assert pipeline.vector_store.index.ntotal == 2
+    lease_ids = list(pipeline.vector_store.ids_for_sources(["lease.pdf"]))
+
+    write_pdf(tmp_path / "nda.pdf", ["termination needs thirty days notice"])
+    write_pdf(tmp_path / "msa.pdf", ["governing law is delaware"])
+    (tmp_path / "lease.pdf").rename(tmp_path / "lease.bak")
+
+    changes = pipeline.sync_directory(str(tmp_path))
+
+    assert changes == {
+        "added": ["msa.pdf"],
+        "updated": ["nda.pdf"],
+        "removed": ["lease.pdf"],
+    }
+    assert pipeline.vector_store.index.ntotal == 2
+    assert not set(lease_ids) & set(pipeline.vector_store.ids)
+    top = pipeline.vector_store.search("termination notice", top_k=1)[0]
+    assert top["source"] == "nda.pdf"
+
+
+def test_sync_directory_skips_unchanged(pipeline, tmp_path):
+    write_pdf(tmp_path / "lease.pdf", ["rent is due monthly"])
+    pipeline.ingest_documents(str(tmp_path))
+
+    assert pipeline.sync_directory(str(tmp_path)) == {
+        "added": [],
+        "updated": [],
+        "removed": [],
+    }
+
+
+def test_saved_index_remembers_documents(pipeline, tmp_path):
+    docs = tmp_path / "docs"
+    docs.mkdir()
+    write_pdf(docs / "lease.pdf", ["rent is due monthly"])
+    pipeline.ingest_documents(str(docs))
+    pipeline.save_index(str(tmp_path / "index"))
+
+    pipeline.documents = {}
+    pipeline.load_index(str(tmp_path / "index"))
+
+    assert list(pipeline.documents) == ["lease.pdf"]
+    assert pipeline.sync_directory(str(docs))["added"] == []
+
+
+def test_save_after_writing_to_a_memory_mapped_index(pipeline, tmp_path):
+    docs = tmp_path / "docs"
+    docs.mkdir()
+    write_pdf(docs / "lease.pdf", ["rent is due monthly"])
+    pipeline.ingest_documents(str(docs))
+    index = tmp_path / "index"
+    pipeline.save_index(str(index))
+
+    loaded = type(pipeline)(index_path=str(index))
+    loaded.load_index(mmap=True)
+    write_pdf(docs / "nda.pdf", ["confidential information stays private"])
+    loaded.add_documents([str(docs / "nda.pdf")])
+    loaded.save_index()
+    loaded.remove_documents(["lease.pdf"])
+    loaded.save_index()
+
+    assert loaded.vector_store.search("rent monthly", top_k=1)[0]["page"] == 1
+    reloaded = type(pipeline)(index_path=str(index))
+    reloaded.load_index(mmap=True)
+    assert list(reloaded.documents) == ["nda.pdf"]
+    assert list(reloaded.vector_store.chunks) == list(loaded.vector_store.chunks)
+    assert sorted(p.name for p in index.iterdir()) == ["CURRENT", "v2", "v3"]
+
+
+def test_reloaded_ivf_index_accepts_writes(pipeline, tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "index_type", "ivf_flat")
+    monkeypatch.setattr(settings, "ivf_nlist", 1)
+    monkeypatch.setattr(settings, "index_train_size", 40)
+    monkeypatch.setattr(settings, "chunk_size", 40)
+    monkeypatch.setattr(settings, "chunk_overlap", 0)
+    pages = [f"clause {n} of the lease sets the rent" for n in range(40)]
+    write_pdf(tmp_path / "lease.pdf", pages)
+    writer = type(pipeline)(index_path=str(tmp_path / "index"))
+    writer.add_documents([tmp_path / "lease.pdf"])
+    writer.save_index()
+
+    loaded = type(pipeline)(index_path=str(tmp_path / "index"))
+    loaded.load_index(mmap=True)
+    assert isinstance(faiss.downcast_index(loaded.vector_store.index), faiss.IndexIVF)
+    write_pdf(tmp_path / "nda.pdf", ["confidential information stays private"])
+    loaded.add_documents([tmp_path / "nda.pdf"])
+
+    assert loaded.vector_store.index.ntotal == writer.vector_store.index.ntotal + 1
+    top = loaded.search("confidential information", top_k=1)["chunks"][0]
+    assert top["source"] == "nda.pdf"
+
+
+def test_query_streams_answer(pipeline, tmp_path):
+    write_pdf(tmp_path / "msa.pdf", ["termination needs ninety days notice"])
+    pipeline.ingest_documents(str(tmp_path))
+    stub = StubLLMServer().start()
+    try:
+        pipeline.llm_client = LLMClient("test-key", "stub", base_url=stub.base_url)
+
+        result = pipeline.query("termination notice", top_k=1, stream=True)
+        assert result["sources"] == [{"document": "msa.pdf", "page": 1}]
+        assert "".join(result["answer_stream"]) == stub.answer
+
+        async def consume():
+            streamed = await pipeline.astream_query("termination notice", top_k=1)
+            parts = [delta async for delta in streamed["answer_stream"]]
+            await pipeline.llm_client.aclose()
+            return "".join(parts)
+
+        assert asyncio.run(consume()) == stub.answer
+    finally:
+        stub.stop()
+
+
+def test_answer_cache_hit_and_invalidation(pipeline, tmp_path):
+    write_pdf(tmp_path / "msa.pdf", ["termination needs ninety days notice"])
+    pipeline.ingest_documents(str(tmp_path))
+    model, encoded = pipeline.vector_store.model, []
+    encode = model.encode
+    model.encode = lambda texts, **kwargs: encoded.extend(texts) or encode(
+        texts, **kwargs
+    )
+    stub = StubLLMServer().start()
+    try:
+        pipeline.llm_client = LLMClient("test-key", "stub", base_url=stub.base_url)
+
+        first = pipeline.query("termination notice", top_k=1)
+        second = pipeline.query("Termination  notice", top_k=1)
+        assert (first["cached"], second["cached"]) == (False, True)
+        assert second["answer"] == first["answer"]
+        assert len(stub.requests) == 1
+        # Search and cache lookup share one encode per question
+        assert encoded == ["termination notice", "Termination  notice"]
+
+        write_pdf(tmp_path / "nda.pdf", ["confidential information"])
+        pipeline.sync_directory(str(tmp_path))
+        assert pipeline.query("termination notice", top_k=1)["cached"] is False
+        assert len(stub.requests) == 2
+    finally:
+        stub.stop()
+
+
+def test_queries_search_the_published_index_during_writes(
+    pipeline, tmp_path, monkeypatch
+):
+    # Every chunk reaches FAISS before the write pauses
+    monkeypatch.setattr(settings, "embedding_batch_size", 1)
+    write_pdf(tmp_path / "lease.pdf", ["rent is due monthly"])
+    write_pdf(tmp_path / "nda.pdf", ["confidential information stays private"])
+    pipeline.add_documents([tmp_path / "lease.pdf"])
+    version = pipeline.index_version
+
+    def search_during_write(fail: bool):
+        """Sources found while a write of nda.pdf is paused halfway."""
+        loading, release, errors = threading.Event(), threading.Event(), []
+
+        def iter_documents(paths, hashes=None):
+            text = "confidential information stays private"
+            yield {"content": format_document([text]), "source": "nda.pdf"}
+            loading.set()
+            release.wait(5)
+            if fail:
+                raise OSError("disk unplugged")
+
+        def write():
+            try:
+                pipeline.add_documents([tmp_path / "nda.pdf"])
+            except OSError as e:
+                errors.append(e)
+
+        pipeline.pdf_loader.iter_documents = iter_documents
+        writer = threading.Thread(target=write)
+        writer.start()
+        assert loading.wait(5)
+        sources = {c["source"] for c in pipeline.search("confidential")["chunks"]}
+        release.set()
+        writer.join()
+        assert len(errors) == fail
+        return sources
+
+    assert search_during_write(fail=True) == {"lease.pdf"}
+    # The failed write published nothing
+    assert list(pipeline.documents) == ["lease.pdf"]
+    assert pipeline.vector_store.index.ntotal == 1
+    assert pipeline.index_version == version
+
+    assert search_during_write(fail=False) == {"lease.pdf"}
+    assert sorted(pipeline.documents) == ["lease.pdf", "nda.pdf"]
+    assert pipeline.search("confidential", top_k=1)["chunks"][0]["source"] == "nda.pdf"
+    assert pipeline.index_version == version + 1
+
+
+def test_hybrid_mode_with_bm25_backend(pipeline, tmp_path, monkeypatch):
+    from docvision.config import settings
+    from docvision.retrieval import BM25Store
+
+    monkeypatch.setattr(settings, "keyword_backend", "bm25")
+    hybrid = type(pipeline)(use_hybrid=True)
+    assert isinstance(hybrid.keyword_store, BM25Store)
+
+    docs = tmp_path / "docs"
+    docs.mkdir()
+    write_pdf(docs / "lease.pdf", ["rent is due monthly"])
+    write_pdf(docs / "nda.pdf", ["confidential information stays private"])
+    hybrid.ingest_documents(str(docs))
+    chunks, method = hybrid._retrieve("confidential", top_k=1)
+    assert (method, chunks[0]["source"]) == ("hybrid", "nda.pdf")
+
+    write_pdf(docs / "nda.pdf", ["termination needs thirty days notice"])
+    hybrid.sync_directory(str(docs))
+    assert hybrid.keyword_store.search("confidential") == []
+    hybrid.save_index(str(tmp_path / "index"))
+
+    reloaded = type(pipeline)(use_hybrid=True)
+    reloaded.load_index(str(tmp_path / "index"))
+    assert reloaded.keyword_store.search("termination")[0]["source"] == "nda.pdf"
+
+
+def _make_collections(tmp_path, **kwargs):
+    manager = CollectionManager(str(tmp_path / "collections"), **kwargs)
+    for name, text in [
+        ("acme", "rent is due monthly"),
+        ("globex", "confidential information stays private"),
+    ]:
+        docs = tmp_path / name
+        docs.mkdir()
+        write_pdf(docs / f"{name}.pdf", [text])
+        manager.sync_directory(name, str(docs))
+    return manager
+
+
+def test_collections_are_isolated_and_share_the_model(tmp_path):
+    model = FakeEmbeddingModel()
+    manager = _make_collections(tmp_path, model=model)
+
+    chunks, _ = manager.get("acme")._retrieve("confidential information", top_k=5)
+    assert [chunk["source"] for chunk in chunks] == ["acme.pdf"]
+    assert manager.get("acme").vector_store.model is model
+    assert manager.get("globex").vector_store.model is model
+
+    with pytest.raises(ValueError):
+        manager.get("initech")
+    with pytest.raises(ValueError):
+        manager.get("../acme", create=True)
+
+
+def test_collections_load_lazily_and_evict_lru(tmp_path):
+    model = FakeEmbeddingModel()
+    _make_collections(tmp_path, model=model)
+
+    manager = CollectionManager(
+        str(tmp_path / "collections"), memory_budget_mb=0, model=model
+    )
+    assert (manager.names(), manager.loaded()) == (["acme", "globex"], [])
+
+    manager.get("acme")
+    manager.get("globex")
+    assert manager.loaded() == ["globex"]
+
+    chunks, _ = manager.get("acme")._retrieve("rent", top_k=1)
+    assert chunks[0]["source"] == "acme.pdf"
+    assert manager.loaded() == ["acme"]
+
+    manager.drop("acme")
+    assert manager.names() == ["globex"]
+
+
+def test_collection_loaded_from_disk_accepts_writes(tmp_path):
+    model = FakeEmbeddingModel()
+    _make_collections(tmp_path, model=model)
+    root = tmp_path / "collections"
+
+    manager = CollectionManager(str(root), model=model)
+    assert manager.sync_directory("acme", str(tmp_path / "acme"))["added"] == []
+    assert manager.remove_documents("acme", ["missing.pdf"]) == []
+    # No-op writes leave the saved index alone
+    assert (root / "acme" / "CURRENT").read_text() == "v1"
+
+    write_pdf(tmp_path / "acme" / "nda.pdf", ["termination needs notice"])
+    manager.sync_directory("acme", str(tmp_path / "acme"))
+    manager.remove_documents("acme", ["acme.pdf"])
+    assert (root / "acme" / "CURRENT").read_text() == "v3"
+
+    reopened = CollectionManager(str(root), model=model)
+    assert list(reopened.get("acme").documents) == ["nda.pdf"]
+    chunks, _ = reopened.get("acme")._retrieve("termination notice", top_k=5)
+    assert [chunk["text"] for chunk in chunks] == ["termination needs notice"]
+
+
+def _hybrid_threads():
+    return {t for t in threading.enumerate() if t.name.startswith("hybrid-search")}
+
+
+def test_evicted_collections_leave_no_workers_running(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "keyword_backend", "bm25")
+    manager = CollectionManager(
+        str(tmp_path / "collections"),
+        use_hybrid=True,
+        memory_budget_mb=0,
+        model=FakeEmbeddingModel(),
+    )
+    threads = {}
+    for name in ["acme", "globex", "initech"]:
+        docs = tmp_path / name
+        docs.mkdir()
+        write_pdf(docs / f"{name}.pdf", [f"{name} pays rent monthly"])
+        before = _hybrid_threads()
+        manager.sync_directory(name, str(docs))
+        manager.get(name).search("rent")
+        threads[name] = _hybrid_threads() - before
+        assert threads[name]
+        assert manager.get(name).pdf_loader is manager._pdf_loader
+
+    assert manager.loaded() == ["initech"]
+    for thread in threads["acme"] | threads["globex"]:
+        thread.join(timeout=5)
+        assert not thread.is_alive()
+
+    manager.close()
+    assert manager._pdf_loader._executor is None
+    for thread in threads["initech"]:
+        thread.join(timeout=5)
+        assert not thread.is_alive()
+
+
+def test_collections_search_without_llm_credentials(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "groq_api_key", "")
+    monkeypatch.setattr(settings, "llm_base_url", "")
+    manager = _make_collections(tmp_path, model=FakeEmbeddingModel())
+
+    chunks = manager.get("acme").search("rent", top_k=1)["chunks"]
+    assert chunks[0]["source"] == "acme.pdf"
+    with pytest.raises(ValueError, match="GROQ_API_KEY"):
+        manager.query("acme", "rent")
+
+
+def test_import_is_lazy():
+    heavy = ["torch", "sentence_transformers", "faiss", "elasticsearch", "groq"]
+    script = (
+        "import sys, docvision, docvision.ingestion, docvision.service\n"
+        "from docvision.config import get_settings\n"
+        "assert get_settings.cache_info().currsize == 0\n"
+        f"print([m for m in {heavy!r} if m in sys.modules])"
+    )
+    env = {k: v for k, v in os.environ.items() if k != "GROQ_API_KEY"}
+    result = subprocess.run(
+        [sys.executable, "-c", script],
+        env=env,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    assert result.stdout.strip() == "[]"
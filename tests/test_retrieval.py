@@ -0,0 +1,698 @@
+import time
+
+import faiss
+import numpy as np
+import pytest
+
+from docvision.retrieval import (
+    BM25Store,
+    ChunkStore,
+    EmbeddingCache,
+    HybridSearch,
+    KeywordStore,
+    Reranker,
+    SearchFilter,
+    VectorStore,
+    load_embedding_model,
+)
+from docvision.retrieval.bm25_store import tokenize
+from docvision.retrieval.embedding_backends import pool, validate_embedder
+from tests.conftest import FakeEmbeddingModel, FakeKeywordStore, make_chunks
+
+TEXTS = [
+    "termination requires ninety days written notice",
+    "the tenant shall pay rent monthly",
+    "governing law is the state of delaware",
+    "confidential information must not be disclosed",
+]
+
+
+def build_store():
+    store = VectorStore("fake-model", model=FakeEmbeddingModel())
+    store.index_chunks(make_chunks(TEXTS))
+    return store
+
+
+def test_chunk_store_round_trip(tmp_path):
+    chunks = make_chunks(TEXTS + ["unicode clause — §4"], source="lease.pdf")
+    store = ChunkStore.from_chunks(chunks)
+    store.save(str(tmp_path))
+
+    loaded = ChunkStore.load(str(tmp_path))
+    assert isinstance(loaded.pages, np.memmap)
+    assert list(loaded) == chunks
+
+
+def test_vector_store_save_and_mmap_load(tmp_path):
+    store = build_store()
+    store.save(str(tmp_path))
+
+    reloaded = VectorStore("fake-model", model=FakeEmbeddingModel())
+    reloaded.load(str(tmp_path))
+
+    results = reloaded.search("notice of termination", top_k=1)
+    assert results[0]["text"] == TEXTS[0]
+    assert reloaded.index.ntotal == len(TEXTS)
+
+
+def test_saving_over_a_memory_mapped_index_keeps_both_readable(tmp_path):
+    build_store().save(str(tmp_path / "vectors"))
+    vectors = VectorStore("fake-model", model=FakeEmbeddingModel())
+    vectors.load(str(tmp_path / "vectors"), mmap=True)
+    bm25 = BM25Store()
+    bm25.index_chunks(make_chunks(TEXTS), ids=[0, 1, 2, 3])
+    bm25.save(str(tmp_path / "bm25"))
+    bm25.load(str(tmp_path / "bm25"), mmap=True)
+    before = (
+        list(vectors.chunks),
+        vectors.search_many(QUERIES),
+        bm25.search_many(QUERIES),
+    )
+
+    # Another writer saves a different index over the mapped files
+    other_texts = ["late payment incurs interest"] * 10
+    other = VectorStore("fake-model", model=FakeEmbeddingModel())
+    other.index_chunks(make_chunks(other_texts, source="other.pdf"))
+    other.save(str(tmp_path / "vectors"))
+    other_bm25 = BM25Store()
+    other_bm25.index_chunks(make_chunks(other_texts), ids=range(10))
+    other_bm25.save(str(tmp_path / "bm25"))
+
+    after = (
+        list(vectors.chunks),
+        vectors.search_many(QUERIES),
+        bm25.search_many(QUERIES),
+    )
+    assert after == before
+    reloaded = VectorStore("fake-model", model=FakeEmbeddingModel())
+    reloaded.load(str(tmp_path / "vectors"), mmap=True)
+    assert list(reloaded.chunks) == list(other.chunks)
+    reloaded_bm25 = BM25Store()
+    reloaded_bm25.load(str(tmp_path / "bm25"), mmap=True)
+    assert reloaded_bm25.search_many(QUERIES) == other_bm25.search_many(QUERIES)
+
+
+def test_vector_store_load_rejects_other_model(tmp_path):
+    build_store().save(str(tmp_path))
+
+    other = VectorStore("other-model", model=FakeEmbeddingModel())
+    with pytest.raises(ValueError, match="other-model"):
+        other.load(str(tmp_path))
+
+
+class CountingModel(FakeEmbeddingModel):
+    def __init__(self):
+        self.encoded = []
+
+    def encode(self, texts, **kwargs):
+        self.encoded.extend(texts)
+        return super().encode(texts, **kwargs)
+
+
+def test_embedding_cache_only_encodes_misses(tmp_path):
+    model = CountingModel()
+    cache = EmbeddingCache(str(tmp_path / "cache.sqlite"))
+    store = VectorStore("fake-model", model=model, embedding_cache=cache)
+
+    store.index_chunks(make_chunks(TEXTS + [TEXTS[0]]))
+    assert model.encoded == TEXTS
+
+    store.add_chunks(make_chunks(["  the tenant shall\npay rent monthly ", "new text"]))
+    assert model.encoded == TEXTS + ["new text"]
+    assert cache.stats()["hits"] == 2
+    assert cache.stats()["misses"] == 5
+    results = store.search(TEXTS[1], top_k=2)
+    assert {r["text"] for r in results} == {
+        TEXTS[1],
+        "  the tenant shall\npay rent monthly ",
+    }
+
+
+def test_embedding_cache_evicts_least_recently_used(tmp_path):
+    cache = EmbeddingCache(str(tmp_path / "cache.sqlite"), max_entries=2)
+    model = FakeEmbeddingModel()
+    cache.encode("m", ["a", "b"], model.encode)
+    cache.encode("m", ["a"], model.encode)  # refresh "a"
+    cache.encode("m", ["c"], model.encode)
+
+    assert cache.stats()["entries"] == 2
+    remaining = cache.get_many([cache.make_key("m", t) for t in "abc"])
+    assert sorted(remaining) == sorted(cache.make_key("m", t) for t in "ac")
+
+
+def test_embedding_cache_counts_replaced_keys_once(tmp_path):
+    cache = EmbeddingCache(str(tmp_path / "cache.sqlite"), max_entries=2)
+    vectors = {cache.make_key("m", t): np.full(4, i) for i, t in enumerate("ab")}
+    for _ in range(3):
+        cache.put_many(vectors)
+    cache.put_many({cache.make_key("m", "a"): np.ones(4)})
+
+    assert cache.stats()["entries"] == 2
+    stored = cache.get_many(list(vectors))
+    assert len(stored) == 2
+    assert stored[cache.make_key("m", "a")].tolist() == [1.0] * 4
+
+
+def synthetic_chunks(n, seed=0):
+    rng = np.random.default_rng(seed)
+    vocabulary = [f"term{i}" for i in range(200)]
+    texts = [" ".join(rng.choice(vocabulary, size=12)) for _ in range(n)]
+    return make_chunks(texts)
+
+
+@pytest.mark.parametrize(
+    "index_type,min_recall",
+    [("flat", 1.0), ("hnsw", 0.9), ("ivf_flat", 0.6), ("ivf_pq", 0.3)],
+)
+def test_ann_index_types_report_recall(index_type, min_recall):
+    store = VectorStore(
+        "fake-model",
+        model=FakeEmbeddingModel(),
+        index_type=index_type,
+        index_params={"nlist": 16, "nprobe": 8, "pq_m": 8, "train_size": 1000},
+    )
+    store.index_chunks(synthetic_chunks(12_000))
+
+    assert store.index.ntotal == 12_000
+    assert store.evaluate_recall(top_k=10) >= min_recall
+
+    store.delete_ids(store.ids[:10])
+    assert store.index.ntotal == 11_990
+    assert all(r["chunk_id"] >= 10 for r in store.search("term1 term2", top_k=5))
+
+
+def test_ivf_delete_keeps_ids_aligned():
+    store = VectorStore(
+        "fake-model",
+        model=FakeEmbeddingModel(),
+        index_type="ivf_flat",
+        index_params={"nlist": 16, "nprobe": 16, "train_size": 1000},
+    )
+    chunks = synthetic_chunks(2000)
+    store.index_chunks(chunks)
+    store.delete_ids(store.ids[:10])
+
+    assert store.search(chunks[500]["text"], top_k=1)[0]["chunk_id"] == 500
+
+
+@pytest.mark.parametrize(
+    "index_type,vector_dtype,min_recall",
+    [
+        ("flat", "float16", 0.95),
+        ("flat", "int8", 0.9),
+        ("hnsw", "int8", 0.85),
+        ("ivf_flat", "float16", 0.6),
+    ],
+)
+def test_compact_vectors_report_recall_and_reload(
+    tmp_path, index_type, vector_dtype, min_recall
+):
+    chunks = synthetic_chunks(5000)
+    store = VectorStore(
+        "fake-model",
+        model=FakeEmbeddingModel(),
+        index_type=index_type,
+        index_params={"nlist": 16, "nprobe": 8, "train_size": 1000},
+        vector_dtype=vector_dtype,
+    )
+    store.index_chunks(chunks)
+
+    assert store.embeddings is None
+    assert store.evaluate_recall(top_k=10) >= min_recall
+    top = store.search(chunks[7]["text"], top_k=1)[0]
+    assert top["score"] == pytest.approx(1.0, abs=0.02)  # cosine
+
+    store.delete_ids(store.ids[:10])
+    store.save(str(tmp_path))
+    reloaded = VectorStore("fake-model", model=FakeEmbeddingModel())
+    reloaded.load(str(tmp_path))
+    assert reloaded.vector_dtype == vector_dtype
+    assert reloaded.stored_vectors().shape == (len(chunks) - 10, store.dimension)
+    found = reloaded.search(chunks[20]["text"], top_k=5)
+    assert 20 in [r["chunk_id"] for r in found]
+
+
+@pytest.mark.parametrize("index_type", ["flat", "hnsw"])
+def test_int8_recall_holds_as_the_store_grows(index_type):
+    chunks = synthetic_chunks(5000)
+    store = VectorStore(
+        "fake-model",
+        model=FakeEmbeddingModel(),
+        index_type=index_type,
+        index_params={"train_size": 20},
+        vector_dtype="int8",
+    )
+    # The first batch is far too small to learn value ranges from
+    store.add_chunks(chunks[:20])
+    store.add_chunks(chunks[20:])
+
+    assert store.evaluate_recall(top_k=10) >= 0.9
+
+
+@pytest.mark.parametrize(
+    "index_type,vector_dtype",
+    [
+        ("flat", "float32"),
+        ("hnsw", "float32"),
+        ("ivf_flat", "float32"),
+        ("ivf_pq", "float32"),
+        ("flat", "int8"),
+        ("hnsw", "int8"),
+        ("ivf_flat", "float16"),
+    ],
+)
+def test_memory_mapped_index_accepts_writes(tmp_path, index_type, vector_dtype):
+    chunks = synthetic_chunks(2000)
+    store = VectorStore(
+        "fake-model",
+        model=FakeEmbeddingModel(),
+        index_type=index_type,
+        index_params={"nlist": 16, "nprobe": 16, "pq_m": 8, "train_size": 1000},
+        vector_dtype=vector_dtype,
+    )
+    store.index_chunks(chunks)
+    store.save(str(tmp_path))
+
+    loaded = VectorStore("fake-model", model=FakeEmbeddingModel())
+    loaded.load(str(tmp_path), mmap=True)
+    extra = make_chunks(["late payment incurs interest"], source="extra.pdf")
+    loaded.add_chunks(extra)
+    loaded.delete_ids(loaded.ids[:10])
+
+    assert loaded.index.ntotal == len(chunks) - 9
+    found = loaded.search("late payment incurs interest", top_k=5)
+    assert "extra.pdf" in [r["source"] for r in found]
+
+
+def test_clone_copies_an_index_faiss_cannot_clone(tmp_path):
+    store = VectorStore(
+        "fake-model",
+        model=FakeEmbeddingModel(),
+        index_type="ivf_flat",
+        index_params={"nlist": 16, "nprobe": 16, "train_size": 1000},
+    )
+    store.index_chunks(synthetic_chunks(2000))
+    store.save(str(tmp_path))
+    loaded = VectorStore("fake-model", model=FakeEmbeddingModel())
+    loaded.load(str(tmp_path))
+    # Mapped IVF lists are what faiss.clone_index() rejects
+    flags = faiss.IO_FLAG_MMAP | faiss.IO_FLAG_READ_ONLY
+    loaded.index = faiss.read_index(str(tmp_path / "index.faiss"), flags)
+
+    clone = loaded.clone()
+    clone.add_chunks(make_chunks(["late payment incurs interest"]))
+
+    assert (loaded.index.ntotal, clone.index.ntotal) == (2000, 2001)
+    assert faiss.downcast_index(clone.index).nprobe == 16
+
+
+@pytest.mark.parametrize("vector_dtype,ratio", [("float16", 4), ("int8", 8)])
+def test_compact_vectors_shrink_memory(vector_dtype, ratio):
+    chunks = synthetic_chunks(2000)
+    stores = {}
+    for dtype in ("float32", vector_dtype):
+        stores[dtype] = VectorStore(
+            "fake-model", model=FakeEmbeddingModel(), vector_dtype=dtype
+        )
+        stores[dtype].index_chunks(chunks)
+
+    # Everything but the vectors is the same in both stores
+    metadata = stores["float32"].ids.nbytes * 2 + stores["float32"].chunks.nbytes
+    float32_bytes = stores["float32"].memory_bytes() - metadata
+    compact_bytes = stores[vector_dtype].memory_bytes() - metadata
+    assert float32_bytes / compact_bytes == ratio
+
+
+def test_ivf_falls_back_to_flat_on_tiny_corpus():
+    store = VectorStore(
+        "fake-model",
+        model=FakeEmbeddingModel(),
+        index_type="ivf_pq",
+        index_params={"pq_m": 8},
+    )
+    store.index_chunks(make_chunks(TEXTS))
+
+    assert isinstance(store._base_index(), faiss.IndexFlatL2)
+    assert store.index_type == "flat"
+    assert store.search(TEXTS[2], top_k=1)[0]["text"] == TEXTS[2]
+
+
+def test_ivf_is_trained_and_retrained_as_the_store_grows(tmp_path):
+    chunks = synthetic_chunks(2000)
+    store = VectorStore(
+        "fake-model",
+        model=FakeEmbeddingModel(),
+        index_type="ivf_flat",
+        index_params={"nlist": 64, "nprobe": 8, "train_size": 100},
+    )
+    store.add_chunks(chunks[:20])
+    assert (store.index_type, store.index.ntotal) == ("flat", 20)
+
+    store.add_chunks(chunks[20:200])
+    assert store.index_type == "ivf_flat"
+    assert faiss.downcast_index(store.index).nlist == 200 // 39
+
+    store.add_chunks(chunks[200:])
+    assert faiss.downcast_index(store.index).nlist == 2000 // 39
+    assert store.index.ntotal == 2000
+    assert store.evaluate_recall(top_k=10) >= 0.6
+
+    store.save(str(tmp_path))
+    reloaded = VectorStore("fake-model", model=FakeEmbeddingModel())
+    reloaded.load(str(tmp_path))
+    assert reloaded.index_type == "ivf_flat"
+    # Not yet four times the size it was trained on
+    reloaded.add_chunks(make_chunks(["late payment incurs interest"]))
+    assert faiss.downcast_index(reloaded.index).nlist == 2000 // 39
+
+
+QUERIES = ["termination notice", "rent payment", "delaware law", "disclosure"]
+
+
+def test_vector_search_many_matches_single_queries():
+    store = build_store()
+    assert store.search_many(QUERIES, top_k=3) == [
+        store.search(q, top_k=3) for q in QUERIES
+    ]
+
+
+def test_hybrid_search_many_matches_single_queries():
+    chunks = make_chunks(TEXTS)
+    vector_store = VectorStore("fake-model", model=FakeEmbeddingModel())
+    vector_store.index_chunks(chunks)
+    keyword_store = FakeKeywordStore(chunks)
+    hybrid = HybridSearch(vector_store, keyword_store, alpha=0.7)
+
+    batched = hybrid.search_many(QUERIES, top_k=3)
+
+    assert batched == [hybrid.search(q, top_k=3) for q in QUERIES]
+    assert keyword_store.calls[0] == ("search_ids_many", QUERIES)
+
+
+def test_keyword_search_many_uses_one_msearch():
+    class FakeClient:
+        def msearch(self, index, searches):
+            self.searches = searches
+            return {
+                "responses": [
+                    {"hits": {"hits": [{"_source": {"text": q}, "_score": 1.0}]}}
+                    for q in ("a", "b")
+                ]
+            }
+
+    store = KeywordStore.__new__(KeywordStore)
+    store.client, store.index_name = FakeClient(), "documents"
+
+    results = store.search_many(["a", "b"], top_k=2)
+
+    assert [r[0]["text"] for r in results] == ["a", "b"]
+    assert store.client.searches[1] == {"query": {"match": {"text": "a"}}, "size": 2}
+
+
+def test_keyword_search_ids_skip_source():
+    class FakeClient:
+        def msearch(self, index, searches):
+            self.searches = searches
+            return {"responses": [{"hits": {"hits": [{"_id": "7", "_score": 2.5}]}}]}
+
+    store = KeywordStore.__new__(KeywordStore)
+    store.client, store.index_name = FakeClient(), "documents"
+
+    [(ids, scores)] = store.search_ids_many(["a"], top_k=3)
+
+    assert ids.tolist() == [7] and scores.tolist() == [2.5]
+    assert store.client.searches[1]["_source"] is False
+
+
+def test_hybrid_fusion_matches_reference_rrf():
+    chunks = make_chunks(TEXTS)
+    vector_store = VectorStore("fake-model", model=FakeEmbeddingModel())
+    vector_store.index_chunks(chunks)
+    hybrid = HybridSearch(vector_store, FakeKeywordStore(chunks), alpha=0.7)
+
+    for query in QUERIES:
+        vec = vector_store.search(query, 6)
+        kw = hybrid.keyword_store.search(query, 6)
+        scores = {}
+        for results, weight in ((vec, 0.7), (kw, 0.3)):
+            for rank, chunk in enumerate(results, 1):
+                key = chunk["chunk_id"]
+                scores[key] = scores.get(key, 0) + weight / (60 + rank)
+        expected = sorted(scores.items(), key=lambda x: x[1], reverse=True)[:3]
+
+        results = hybrid.search(query, top_k=3)
+        assert [(r["chunk_id"], r["hybrid_score"]) for r in results] == [
+            (key, pytest.approx(score)) for key, score in expected
+        ]
+    hybrid.close()
+
+
+def test_hybrid_fusion_breaks_ties_at_the_cut_by_first_appearance():
+    hybrid = HybridSearch(None, None, alpha=0.5)
+    # Equal weights, so the IDs at each rank of the two legs tie
+    vec_ids, kw_ids = np.arange(0, 5), np.arange(100, 105)
+    ids, _ = hybrid._reciprocal_rank_fusion(vec_ids, kw_ids, top_k=3)
+
+    # 1 and 101 tie for third; 1 was seen first
+    assert ids.tolist() == [0, 100, 1]
+    hybrid.close()
+
+
+def test_keyword_search_pushes_filter_into_bool_query():
+    class FakeClient:
+        def search(self, index, query, size):
+            self.query = query
+            return {"hits": {"hits": []}}
+
+    store = KeywordStore.__new__(KeywordStore)
+    store.client, store.index_name = FakeClient(), "documents"
+
+    store.search("rent", search_filter=SearchFilter(["lease.pdf"], page_min=2))
+
+    assert store.client.query == {
+        "bool": {
+            "must": {"match": {"text": "rent"}},
+            "filter": [
+                {"terms": {"source": ["lease.pdf"]}},
+                {"range": {"page": {"gte": 2}}},
+            ],
+        }
+    }
+
+
+def multi_source_chunks(sources=("a.pdf", "b.pdf", "c.pdf"), per_source=400):
+    chunks = []
+    for source in sources:
+        for chunk in synthetic_chunks(per_source, seed=len(chunks)):
+            chunks.append(
+                {**chunk, "source": source, "page": chunk["chunk_id"] // 10 + 1}
+            )
+    return chunks
+
+
+@pytest.mark.parametrize("index_type", ["flat", "ivf_flat", "hnsw"])
+def test_vector_search_filter_covers_only_matching_vectors(index_type):
+    store = VectorStore(
+        "fake-model",
+        model=FakeEmbeddingModel(),
+        index_type=index_type,
+        index_params={"nlist": 16, "nprobe": 2, "train_size": 1000},
+    )
+    chunks = multi_source_chunks()
+    store.index_chunks(chunks)
+    # Re-ingesting b.pdf moves its chunks to the end: two runs, a.pdf and c.pdf
+    store.delete_ids(store.ids_for_sources(["b.pdf"]))
+    store.add_chunks(chunks[400:800])
+
+    search_filter = SearchFilter(["b.pdf", "c.pdf"], page_min=3, page_max=4)
+    allowed = store.filter_ids(search_filter)
+    assert len(allowed) == 2 * 20
+
+    results = store.search(chunks[0]["text"], top_k=10, search_filter=search_filter)
+    assert len(results) == 10
+    assert all(r["source"] in ("b.pdf", "c.pdf") for r in results)
+    assert all(3 <= r["page"] <= 4 for r in results)
+    assert store.search("x", search_filter=SearchFilter(["none.pdf"])) == []
+
+
+def test_filters_reach_both_hybrid_legs():
+    chunks = multi_source_chunks(per_source=50)
+    vector_store = VectorStore("fake-model", model=FakeEmbeddingModel())
+    keyword_store = BM25Store()
+    ids = vector_store.index_chunks(chunks)
+    keyword_store.index_chunks(chunks, ids)
+    hybrid = HybridSearch(vector_store, keyword_store)
+    search_filter = SearchFilter(["a.pdf"], page_max=2)
+
+    for results in [
+        keyword_store.search("term1 term2", 50, search_filter),
+        hybrid.search("term1 term2", 50, search_filter),
+        *hybrid.search_many(["term1", "term3 term4"], 50, search_filter),
+    ]:
+        assert results
+        assert {(r["source"], r["page"] <= 2) for r in results} == {("a.pdf", True)}
+    hybrid.close()
+
+    with pytest.raises(ValueError, match="page_min"):
+        SearchFilter.from_dict({"page_min": 5, "page_max": 2})
+    with pytest.raises(ValueError, match="Unknown"):
+        SearchFilter.from_dict({"date": "2024"})
+
+
+class SlowKeywordStore(FakeKeywordStore):
+    def __init__(self, chunks, delay=0.0, fail=False):
+        super().__init__(chunks)
+        self.delay, self.fail = delay, fail
+
+    def _search(self, query, top_k, search_filter):
+        time.sleep(self.delay)
+        if self.fail:
+            raise ConnectionError("elasticsearch unavailable")
+        return super()._search(query, top_k, search_filter)
+
+
+def test_hybrid_degrades_to_vector_leg_on_timeout():
+    vector_store = build_store()
+    keyword_store = SlowKeywordStore(make_chunks(TEXTS), delay=1.0)
+    hybrid = HybridSearch(vector_store, keyword_store, leg_timeout=0.2)
+
+    started = time.monotonic()
+    results = hybrid.search("termination notice", top_k=2)
+
+    assert time.monotonic() - started < 0.9
+    assert [r["text"] for r in results] == [
+        r["text"] for r in vector_store.search("termination notice", top_k=2)
+    ]
+
+
+def test_hybrid_degrades_on_leg_error_but_raises_if_both_fail():
+    vector_store = build_store()
+    hybrid = HybridSearch(vector_store, SlowKeywordStore(make_chunks(TEXTS), fail=True))
+    assert len(hybrid.search_many(QUERIES, top_k=2)) == len(QUERIES)
+
+    hybrid.vector_store = VectorStore("fake-model", model=FakeEmbeddingModel())
+    with pytest.raises(ValueError, match="Index not built"):
+        hybrid.search("termination notice")
+
+
+def reference_bm25(texts, query, k1=1.2, b=0.75):
+    docs = [tokenize(text) for text in texts]
+    avg_length = sum(map(len, docs)) / len(docs)
+    scores = np.zeros(len(docs))
+    for term in tokenize(query):
+        df = sum(term in doc for doc in docs)
+        if not df:
+            continue
+        idf = np.log(1 + (len(docs) - df + 0.5) / (df + 0.5))
+        for i, doc in enumerate(docs):
+            tf = doc.count(term)
+            norm = k1 * (1 - b + b * len(doc) / avg_length)
+            scores[i] += idf * tf * (k1 + 1) / (tf + norm)
+    return scores
+
+
+def test_bm25_matches_reference_scoring_across_segments():
+    texts = TEXTS + [
+        "notice of termination must be written",
+        "rent is due on the first day; late rent accrues interest",
+    ]
+    store = BM25Store()
+    for i in range(0, len(texts), 2):  # several segments
+        store.index_chunks(make_chunks(texts[i : i + 2]), ids=[i, i + 1])
+
+    for query in ["termination notice", "rent rent interest", "delaware"]:
+        expected = reference_bm25(texts, query)
+        rows, scores = store.score(query)
+        assert np.allclose(scores, expected[rows])
+        assert set(rows) == set(np.flatnonzero(expected))
+
+    results = store.search("late rent", top_k=2)
+    assert [r["text"] for r in results][0] == texts[5]
+    assert results[0]["score"] > results[1]["score"]
+
+
+def test_bm25_incremental_delete_and_mmap_reload(tmp_path):
+    store = BM25Store()
+    store.index_chunks(make_chunks(TEXTS), ids=[10, 11, 12, 13])
+    store.delete_chunks([10])
+
+    assert len(store) == 3
+    assert store.search("termination notice") == []
+    assert np.allclose(store.score("rent")[1], reference_bm25(TEXTS[1:], "rent")[:1])
+
+    store.save(str(tmp_path / "bm25"))
+    loaded = BM25Store()
+    loaded.load(str(tmp_path / "bm25"), mmap=True)
+    assert loaded.search_many(QUERIES) == store.search_many(QUERIES)
+
+    # Memory-mapped indexes still accept additions and deletions
+    loaded.index_chunks(make_chunks(["termination for convenience"]), ids=[14])
+    loaded.delete_chunks([11])
+    assert [r["text"] for r in loaded.search("termination rent")] == [
+        "termination for convenience"
+    ]
+
+
+class FakeCrossEncoder:
+    """Scores a pair by how many query terms the passage contains."""
+
+    def __init__(self, delay=0.0):
+        self.delay = delay
+        self.pairs = []
+
+    def predict(self, pairs, batch_size=32):
+        time.sleep(self.delay)
+        self.pairs.extend(pairs)
+        return [len(set(q.split()) & set(text.split())) for q, text in pairs]
+
+
+def test_reranker_reorders_and_caches_pair_scores():
+    model = FakeCrossEncoder()
+    reranker = Reranker(model=model, batch_size=2)
+    chunks = make_chunks(TEXTS)
+
+    top, reranked = reranker.rerank("rent monthly tenant", chunks, top_k=2)
+    assert reranked
+    assert [c["text"] for c in top][0] == TEXTS[1]
+    assert top[0]["rerank_score"] == 3.0
+    assert len(model.pairs) == len(TEXTS)
+
+    reranker.rerank("rent  monthly tenant", chunks[:3], top_k=2)
+    assert len(model.pairs) == len(TEXTS)
+
+
+def test_reranker_falls_back_to_first_stage_order_over_budget():
+    model = FakeCrossEncoder(delay=0.05)
+    reranker = Reranker(model=model, batch_size=1, time_budget=0.08)
+    chunks = make_chunks(TEXTS)
+
+    top, reranked = reranker.rerank("rent monthly tenant", chunks, top_k=3)
+    assert not reranked
+    assert top == chunks[:3]
+    # Batches scored before the budget ran out are reused next time
+    assert 0 < len(model.pairs) < len(TEXTS)
+
+
+def test_pooling_matches_sentence_transformer_mean_pooling():
+    hidden = np.arange(24, dtype=np.float32).reshape(2, 3, 4)
+    mask = np.array([[1, 1, 0], [1, 1, 1]])
+
+    vectors = pool(hidden, mask, "mean", normalize=True)
+
+    expected = np.stack([hidden[0, :2].mean(axis=0), hidden[1].mean(axis=0)])
+    expected /= np.linalg.norm(expected, axis=1, keepdims=True)
+    np.testing.assert_allclose(vectors, expected, rtol=1e-6)
+    np.testing.assert_array_equal(pool(hidden, mask, "cls", False), hidden[:, 0])
+
+
+def test_validate_embedder_reports_cosine_against_reference():
+    class Noisy(FakeEmbeddingModel):
+        def encode(self, texts, **kwargs):
+            vectors = super().encode(texts)
+            return vectors + np.random.default_rng(0).normal(0, 0.01, vectors.shape)
+
+    stats = validate_embedder(Noisy(), FakeEmbeddingModel())
+    assert 0.99 < stats["min_cosine"] <= stats["mean_cosine"] <= 1.0
+
+    with pytest.raises(ValueError):
+        load_embedding_model("all-MiniLM-L6-v2", backend="tensorrt")
@@ -0,0 +1,238 @@
+import asyncio
+import json
+import threading
+
+import httpx
+import numpy as np
+
+from benchmarks.synthetic import write_pdf
+from docvision.config import settings
+from docvision.generation import LLMClient
+from docvision.generation.stub_server import StubLLMServer
+from docvision.service import MicroBatcher, QueryService
+from tests.conftest import FakeEmbeddingModel
+
+
+class CountingModel(FakeEmbeddingModel):
+    def __init__(self):
+        self.calls = []
+        self.kwargs = []
+
+    def encode(self, texts, **kwargs):
+        self.calls.append(list(texts))
+        self.kwargs.append(kwargs)
+        return super().encode(texts, **kwargs)
+
+
+def test_micro_batcher_coalesces_concurrent_encodes():
+    model = CountingModel()
+    batcher = MicroBatcher(model, max_batch_size=64, max_wait_ms=200).start()
+    queries = [f"notice period {i}" for i in range(8)]
+    results = [None] * len(queries)
+    barrier = threading.Barrier(len(queries))
+
+    def worker(i):
+        barrier.wait()
+        results[i] = batcher.encode([queries[i]])
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    batcher.stop()
+
+    assert len(model.calls) < len(queries)
+    expected = FakeEmbeddingModel().encode(queries)
+    np.testing.assert_allclose(np.concatenate(results), expected)
+    # Large calls such as ingestion batches bypass the queue
+    batcher.encode(["x"] * 64)
+    assert len(model.calls[-1]) == 64
+
+
+def test_micro_batcher_only_combines_calls_with_the_same_options():
+    model = CountingModel()
+    batcher = MicroBatcher(model, max_batch_size=64, max_wait_ms=200).start()
+    calls = [
+        {"batch_size": 32},
+        {"show_progress_bar": True},
+        {"normalize_embeddings": False},
+        {"normalize_embeddings": False, "batch_size": 8},
+    ]
+    barrier = threading.Barrier(len(calls))
+
+    def worker(i):
+        barrier.wait()
+        batcher.encode([f"clause {i}"], **calls[i])
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    batcher.stop()
+
+    assert sorted(len(texts) for texts in model.calls) == [2, 2]
+    normalize = [kwargs.get("normalize_embeddings", True) for kwargs in model.kwargs]
+    assert sorted(normalize) == [False, True]
+
+
+def test_service_endpoints(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "uploads_path", str(tmp_path / "uploads"))
+    docs = tmp_path / "uploads" / "docs"
+    docs.mkdir(parents=True)
+    write_pdf(docs / "msa.pdf", ["termination needs ninety days notice"])
+    stub = StubLLMServer().start()
+    service = QueryService(
+        root=str(tmp_path / "collections"),
+        use_hybrid=False,
+        model=FakeEmbeddingModel(),
+        llm_client=LLMClient("test-key", "stub", base_url=stub.base_url),
+    )
+
+    async def run():
+        transport = httpx.ASGITransport(app=service)
+        async with httpx.AsyncClient(transport=transport, base_url="http://t") as c:
+            assert (await c.get("/health")).status_code == 200
+            assert (await c.get("/ready")).status_code == 503
+
+            await service.startup()
+            assert (await c.get("/ready")).json()["status"] == "ready"
+
+            ingested = await c.post(
+                "/ingest", json={"collection": "acme", "directory": str(docs)}
+            )
+            assert ingested.json()["added"] == ["msa.pdf"]
+            relative = await c.post(
+                "/ingest", json={"collection": "acme", "paths": ["docs/msa.pdf"]}
+            )
+            assert relative.json()["indexed"] == []
+            for body in [
+                {"paths": [str(tmp_path / "secret.pdf")]},
+                {"paths": ["../secret.pdf"]},
+                {"directory": str(tmp_path)},
+            ]:
+                outside = await c.post("/ingest", json={"collection": "acme", **body})
+                assert outside.status_code == 403
+            gone = await c.post(
+                "/ingest", json={"collection": "acme", "directory": "missing"}
+            )
+            assert gone.status_code == 400
+
+            found = await c.post(
+                "/search", json={"collection": "acme", "query": "termination"}
+            )
+            assert found.json()["chunks"][0]["source"] == "msa.pdf"
+            filtered = await c.post(
+                "/search",
+                json={
+                    "collection": "acme",
+                    "query": "termination",
+                    "filters": {"sources": ["nda.pdf"]},
+                },
+            )
+            assert filtered.json()["chunks"] == []
+            bad_filter = await c.post(
+                "/search", json={"query": "x", "filters": {"page_min": 0}}
+            )
+            assert bad_filter.status_code == 400
+
+            answer = await c.post(
+                "/query", json={"collection": "acme", "question": "notice?"}
+            )
+            assert answer.json()["answer"] == stub.answer
+
+            streamed = await c.post(
+                "/query",
+                json={"collection": "acme", "question": "notice?", "stream": True},
+            )
+            events = [
+                line[len("data: ") :]
+                for line in streamed.text.splitlines()
+                if line.startswith("data: ")
+            ]
+            assert events[-1] == "[DONE]"
+            deltas = [json.loads(e).get("delta", "") for e in events[1:-1]]
+            assert "".join(deltas) == stub.answer
+
+            missing = await c.post(
+                "/query", json={"collection": "nope", "question": "x"}
+            )
+            assert missing.status_code == 404
+            invalid = await c.post("/search", json={"collection": "../x", "query": "x"})
+            assert invalid.status_code == 400
+            assert (await c.post("/search", json={"query": ""})).status_code == 400
+            assert (await c.get("/query")).status_code == 405
+            assert (await c.get("/nothing")).status_code == 404
+
+            await service.collections.llm_client.aclose()
+            await service.shutdown()
+
+    try:
+        asyncio.run(run())
+    finally:
+        stub.stop()
+
+
+def test_lifespan_warms_model_in_background(tmp_path):
+    release = threading.Event()
+
+    class SlowModel(FakeEmbeddingModel):
+        def encode(self, texts, **kwargs):
+            release.wait(5)
+            return super().encode(texts, **kwargs)
+
+    service = QueryService(
+        root=str(tmp_path), use_hybrid=False, model=SlowModel(), llm_client=object()
+    )
+
+    async def run():
+        sent, messages = [], asyncio.Queue()
+        await messages.put({"type": "lifespan.startup"})
+
+        async def send(message):
+            sent.append(message)
+
+        lifespan = asyncio.create_task(
+            service({"type": "lifespan"}, messages.get, send)
+        )
+        while not sent:
+            await asyncio.sleep(0.01)
+        # Startup completes before the model is warm
+        assert sent == [{"type": "lifespan.startup.complete"}]
+        transport = httpx.ASGITransport(app=service)
+        async with httpx.AsyncClient(transport=transport, base_url="http://t") as c:
+            assert (await c.get("/ready")).json()["status"] == "starting"
+            release.set()
+            await service.startup()
+            assert (await c.get("/ready")).status_code == 200
+        await messages.put({"type": "lifespan.shutdown"})
+        await lifespan
+
+    asyncio.run(run())
+
+
+def test_service_searches_without_llm_credentials(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "uploads_path", str(tmp_path))
+    monkeypatch.setattr(settings, "groq_api_key", "")
+    monkeypatch.setattr(settings, "llm_base_url", "")
+    write_pdf(tmp_path / "msa.pdf", ["termination needs ninety days notice"])
+    service = QueryService(
+        root=str(tmp_path / "collections"),
+        use_hybrid=False,
+        model=FakeEmbeddingModel(),
+    )
+
+    async def run():
+        await service.startup()
+        transport = httpx.ASGITransport(app=service)
+        async with httpx.AsyncClient(transport=transport, base_url="http://t") as c:
+            await c.post("/ingest", json={"paths": ["msa.pdf"]})
+            found = await c.post("/search", json={"query": "termination"})
+            assert found.json()["chunks"][0]["source"] == "msa.pdf"
+            # A server configuration error, not a bad request
+            answer = await c.post("/query", json={"question": "notice?"})
+            assert answer.status_code == 500
+        await service.shutdown()
+
+    asyncio.run(run())